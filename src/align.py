@@ -0,0 +1,203 @@
+import heapq
+import itertools
+import math
+from typing import Any, Callable, Iterator, Optional
+import numpy as np
+from timeseries import TimeSeries
+import utils
+
+
+def merge(sources: dict[str, TimeSeries]) -> Iterator[tuple[int, str, Any]]:
+    """
+    Merge several sorted series into a single stream of (time (ns), source, value) tuples in time order.
+    The series are merged lazily with a heap, so only one value per source is held at a time, and ties are broken by the order of `sources`.
+    """
+
+    def events(key: str, series: TimeSeries) -> Iterator[tuple[int, str, Any]]:
+        values = series.values
+        if values is None:
+            values = itertools.repeat(None)
+        # Times are converted one at a time, rather than the whole column up front.
+        return zip(map(int, series.times_ns), itertools.repeat(key), values)
+
+    for key, series in sources.items():
+        if not series.sorted:
+            raise Exception(f'merge: source {key} is not sorted by time')
+    return heapq.merge(*(events(k, s) for k, s in sources.items()), key=lambda e: e[0])
+
+
+def grid(
+    sources: dict[str, TimeSeries],
+    stride_secs: float,
+    start_ns: Optional[int] = None,
+    end_ns: Optional[int] = None,
+) -> np.ndarray:
+    """
+    A grid of window end-times (ns) with a constant stride, shared by all of the `sources`.
+    The grid starts one stride after the earliest time of any source, and stops before the latest time of any source, as with `const_stride_secs` in `utils.rolling`. `start_ns` and `end_ns` restrict the grid to [`start_ns`, `end_ns`].
+    """
+
+    if stride_secs <= 0.0:
+        raise Exception('grid: stride_secs must be positive')
+    non_empty = [s for s in sources.values() if len(s) > 0]
+    if len(non_empty) == 0:
+        return np.empty(0, dtype=np.int64)
+    stride_ns = int(round(stride_secs * 1_000_000_000))
+    first = min(s.min for s in non_empty) + stride_ns
+    if start_ns is not None and start_ns > first:
+        first += -((first - start_ns) // stride_ns) * stride_ns
+    stop = max(s.max for s in non_empty)
+    if end_ns is not None:
+        stop = min(stop, end_ns + 1)
+    return np.arange(first, stop, stride_ns, dtype=np.int64)
+
+
+class Frame:
+    """Columns of values keyed by source, sharing one column of times (ns)."""
+
+    def __init__(self, times_ns: np.ndarray, columns: dict[str, np.ndarray]):
+        self.index = TimeSeries(times_ns)
+        self.columns = columns
+
+    @property
+    def times_ns(self) -> np.ndarray:
+        return self.index.times_ns
+
+    def times(self, unit: str = 'ns', zeroed: bool = False) -> np.ndarray:
+        """The shared times in the given unit, optionally translated to start at 0 (see `TimeSeries.times`)."""
+
+        return self.index.times(unit, zeroed)
+
+    def keys(self) -> list[str]:
+        return list(self.columns)
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.columns[key]
+
+    def __len__(self):
+        return len(self.index)
+
+    def series(self, key: str) -> TimeSeries:
+        """The column of one source, indexed by the shared times."""
+
+        series = TimeSeries(self.times_ns, self.columns[key])
+        series._sorted = True
+        return series
+
+
+def resample(
+    sources: dict[str, TimeSeries],
+    window: float,
+    fn: Callable[[list[Any]], Any] | str | dict[str, Callable[[list[Any]], Any] | str],
+    stride_secs: float,
+    rate: bool = False,
+    start_ns: Optional[int] = None,
+    end_ns: Optional[int] = None,
+) -> Frame:
+    """
+    Evaluate a rolling window over every source on one shared constant-stride grid (see `grid`), so that sources captured by different observers can be compared point by point, e.g. `frame['client'] / frame['nginx']`.
+    `sources` are sorted series keyed by a name for each source, e.g. {'client': got.series(), 'nginx': telegraf.series('nginx', 'requests')}.
+    `fn` is applied to every source, or is a dict giving the function for each source. As with `utils.rolling`, built-in reducers and functions tagged with `utils.reducer` are evaluated over every window at once, any other function is called on each window.
+    `window`, `rate`, `start_ns` and `end_ns` are as for `utils.rolling`.
+    Returns a `Frame` with a column of window values per source.
+    """
+
+    ends = grid(sources, stride_secs, start_ns, end_ns)
+    columns = {}
+    for key, series in sources.items():
+        source_fn = fn[key] if isinstance(fn, dict) else fn
+        if not series.sorted:
+            raise Exception(f'resample: source {key} is not sorted by time')
+        columns[key] = windowed(series, ends, window, source_fn, rate)
+    return Frame(ends, columns)
+
+
+def windowed(
+    series: TimeSeries,
+    ends: np.ndarray,
+    window: float,
+    fn: Callable[[list[Any]], Any] | str,
+    rate: bool = False,
+) -> np.ndarray:
+    """Evaluate a function over the values of a sorted series in the window of `window` seconds ending at each of the `ends` (ns), as with `utils.rolling`."""
+
+    trail, lead = utils.window_bounds(series.times_ns, ends, window)
+    lo, hi = (int(trail.min()), int(lead.max())) if len(ends) > 0 else (0, 0)
+    values = series.values[lo:hi]
+    spec = utils.builtin_reducer(fn)
+    column = None if spec is None else utils.numeric_column(values, spec[1])
+    if spec is not None and column is not None:
+        return utils.reduce_windows(
+            column, trail - lo, lead - lo, window, spec[0], rate
+        )
+    if isinstance(fn, str):
+        raise Exception(f'reducer: {fn} requires numeric values')
+    results = [fn(values[start:stop]) for start, stop in zip(trail - lo, lead - lo)]
+    if rate:
+        results = [r / window for r in results]
+    return np.array(results)
+
+
+def asof(
+    times_ns: Any,
+    sources: dict[str, TimeSeries],
+    tolerance_secs: Optional[float] = None,
+) -> Frame:
+    """
+    The latest value of every source at or before each of the `times_ns`, found with a binary search per time rather than by merging.
+    `tolerance_secs` only takes values at most that long before each time. Times without such a value get `nan` (numeric values are returned as floats), or `None` for other values. An empty source gives a column of `nan`.
+    Returns a `Frame` with a column per source, indexed by the `times_ns`.
+    """
+
+    times = np.asarray(times_ns, dtype=np.int64)
+    columns = {}
+    for key, series in sources.items():
+        if not series.sorted:
+            raise Exception(f'asof: source {key} is not sorted by time')
+        if len(series) == 0:
+            columns[key] = np.full(len(times), np.nan)
+            continue
+        idx = np.searchsorted(series.times_ns, times, side='right') - 1
+        found = idx >= 0
+        if tolerance_secs is not None:
+            tolerance_ns = int(round(tolerance_secs * 1_000_000_000))
+            found &= times - series.times_ns[np.maximum(idx, 0)] <= tolerance_ns
+        values = np.asarray(series.values)
+        if values.dtype.kind in 'biuf':
+            column = np.full(len(times), np.nan)
+            column[found] = values[idx[found]]
+        else:
+            column = np.full(len(times), None, dtype=object)
+            column[found] = values[idx[found]]
+        columns[key] = column
+    return Frame(times, columns)
+
+
+def join(
+    times_ns: Any,
+    sources: dict[str, TimeSeries],
+    window: float,
+    fn: Callable[[list[Any]], Any] | str | dict[str, Callable[[list[Any]], Any] | str],
+    rate: bool = False,
+    after: bool = True,
+    tolerance_secs: Optional[float] = None,
+) -> Frame:
+    """
+    Line up every source with each of the `times_ns` (e.g. the decisions of a 'blue' defender, see `blue.Blue.join`): the latest value at or before the time (see `asof`) in a column '<source>', and `fn` over the values in the `window` (seconds) following the time in a column '<source>.<fn>'.
+    `after` selects the window [t, t + window] following each time, otherwise the window [t - window, t] preceding it. `fn` and `rate` are as for `resample`, `tolerance_secs` as for `asof`.
+    Every window is found with binary searches over the sorted times of each source, and built-in reducers are evaluated with prefix sums, so the cost is O((times + values) log values).
+    The columns of an empty source are all `nan`.
+    Returns a `Frame` indexed by the `times_ns`.
+    """
+
+    times = np.asarray(times_ns, dtype=np.int64)
+    frame = asof(times, sources, tolerance_secs)
+    ends = times + math.floor(window * 1_000_000_000) if after else times
+    for key, series in sources.items():
+        source_fn = fn[key] if isinstance(fn, dict) else fn
+        frame.columns[f'{key}.{utils.fn_name(source_fn)}'] = (
+            windowed(series, ends, window, source_fn, rate)
+            if len(series) > 0
+            else np.full(len(times), np.nan)
+        )
+    return frame
@@ -0,0 +1,152 @@
+import json
+from typing import Iterator
+import numpy as np
+
+# Synthetic logs start at this time (ns since the Unix epoch), and are generated in chunks of this many lines.
+START_NS = 1_736_433_753_000_000_000
+CHUNK_LINES = 1_000_000
+
+FAILURE = (
+    ' : Request FailedAfterSend with: Unix.Unix_error(Unix.ENETUNREACH, "connect", "")'
+)
+
+
+def _chunks(lines: int) -> Iterator[int]:
+    for start in range(0, lines, CHUNK_LINES):
+        yield min(CHUNK_LINES, lines - start)
+
+
+def got_log(
+    path: str, lines: int, seed: int = 0, rate_hz: float = 1000.0, ok: float = 0.9
+) -> None:
+    """
+    Write a synthetic 'got' log of `lines` responses, received at on average `rate_hz` with exponential gaps, each successful with probability `ok`.
+    The same `seed` always writes the same log.
+    """
+
+    rng = np.random.default_rng(seed)
+    time = START_NS
+    with open(path, 'w') as f:
+        for n in _chunks(lines):
+            gaps = rng.exponential(1e9 / rate_hz, n).astype(np.int64) + 1
+            times = time + np.cumsum(gaps)
+            time = int(times[-1])
+            success = rng.random(n) < ok
+            f.writelines(
+                f'[{t}] 1\n' if s else f'[{t}] 0{FAILURE}\n'
+                for t, s in zip(times.tolist(), success.tolist())
+            )
+
+
+def _telegraf_record(name: str, fields: dict, tags: dict, timestamp: int) -> str:
+    record = {'fields': fields, 'name': name, 'tags': tags, 'timestamp': timestamp}
+    return json.dumps(record, separators=(',', ':'), sort_keys=True) + '\n'
+
+
+def telegraf_records(rng: np.random.Generator, second: int, flows: int) -> list[str]:
+    """One second of synthetic 'telegraf' records: a 'cpu', 'mem', 'disk' and 'nginx' record, and `flows` 'netflow' records."""
+
+    host = {'host': 'hilbert'}
+    user = float(rng.uniform(0, 100))
+    records = [
+        _telegraf_record(
+            'cpu',
+            {
+                'usage_idle': 100.0 - user,
+                'usage_iowait': 0,
+                'usage_nice': 0,
+                'usage_system': float(rng.uniform(0, 5)),
+                'usage_user': user,
+            },
+            {'cpu': 'cpu-total', **host},
+            second,
+        ),
+        _telegraf_record(
+            'mem',
+            {
+                'buffered': 25444352,
+                'cached': int(rng.integers(2**28, 2**29)),
+                'used_percent': float(rng.uniform(0, 100)),
+            },
+            host,
+            second,
+        ),
+        _telegraf_record(
+            'disk',
+            {'used_percent': float(rng.uniform(60, 70))},
+            {'device': 'disk/by-label/nixos', 'path': '/', **host},
+            second,
+        ),
+        _telegraf_record(
+            'nginx',
+            {
+                'accepts': int(rng.integers(0, 100)),
+                'active': int(rng.integers(0, 20)),
+                'requests': int(rng.integers(0, 1000)),
+                'waiting': int(rng.integers(0, 5)),
+            },
+            {'port': '80', 'server': 'localhost', **host},
+            second,
+        ),
+    ]
+    ips = ['169.254.80.236', '169.254.220.46', '169.254.10.1']
+    for start_ms in np.sort(rng.integers(0, 1000, flows)).tolist():
+        flow_start_ms = second * 1000 + start_ms
+        records.append(
+            _telegraf_record(
+                'netflow',
+                {
+                    'dst': '169.254.220.46',
+                    'dst_port': 443,
+                    'flow_end_ms': flow_start_ms + int(rng.integers(1, 500)),
+                    'flow_start_ms': flow_start_ms,
+                    'in_bytes': int(rng.integers(40, 2000)),
+                    'in_packets': int(rng.integers(1, 20)),
+                    'protocol': 'tcp',
+                    'src': ips[int(rng.integers(0, len(ips)))],
+                },
+                {'source': '127.0.0.1', 'version': 'IPFIX', **host},
+                second,
+            )
+        )
+    return records
+
+
+def telegraf_log(path: str, lines: int, seed: int = 0, flows_per_sec: int = 16) -> None:
+    """Write a synthetic 'telegraf' log of `lines` records, one second of records (see `telegraf_records`) after another. The same `seed` always writes the same log."""
+
+    rng = np.random.default_rng(seed)
+    second = START_NS // 1_000_000_000
+    written = 0
+    with open(path, 'w') as f:
+        while written < lines:
+            records = telegraf_records(rng, second, flows_per_sec)[: lines - written]
+            f.writelines(records)
+            written += len(records)
+            second += 1
+
+
+def blue_log(path: str, lines: int, seed: int = 0, interval_ms: float = 10.0) -> None:
+    """Write a synthetic 'blue' log of `lines` lines, alternating a state and the action taken in that state every `interval_ms`. The same `seed` always writes the same log."""
+
+    rng = np.random.default_rng(seed)
+    actions = ('ToggleGreen', 'ToggleRed', 'Wait')
+    time = START_NS
+    with open(path, 'w') as f:
+        for n in _chunks(lines):
+            states = (n + 1) // 2
+            times = time + np.arange(states, dtype=np.int64) * int(interval_ms * 1e6)
+            time = int(times[-1]) + int(interval_ms * 1e6)
+            ok_rate = rng.uniform(0, 100, states).round(2)
+            blocked = rng.random((states, 2)) < 0.5
+            reward = rng.integers(-1, 2, states)
+            action = rng.integers(0, len(actions), states)
+            out = []
+            for i, t in enumerate(times.tolist()):
+                green, red = ('true' if b else 'false' for b in blocked[i])
+                out.append(
+                    f'[{t}] {{"ok_rate":"{ok_rate[i]:.2f}","green_blocked":{green},'
+                    f'"red_blocked":{red},"reward":{reward[i]}}}\n'
+                )
+                out.append(f'[{t + 100_000}] {actions[action[i]]}\n')
+            f.writelines(out[:n])
@@ -0,0 +1,273 @@
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Optional
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+from bench import generate
+from blue import Blue
+from got import Got
+import memo
+import plot_utils
+from plot_utils import LogFile, LogFileType, Roller
+import rolling_funcs
+import sidecar
+from telegraf import Telegraf
+from timeseries import TimeSeries
+import utils
+
+SIZES = (10_000, 100_000, 1_000_000)
+WINDOW_SECS = 10.0
+STRIDE_SECS = 0.5
+
+
+@dataclass
+class Result:
+    """The time taken by one benchmark (the best of its repeats), and the peak memory allocated while running it."""
+
+    name: str
+    lines: int
+    seconds: float
+    lines_per_sec: float
+    peak_bytes: int
+
+
+def measure(name: str, lines: int, fn: Callable[[], Any], repeat: int = 3) -> Result:
+    """Time the best of `repeat` calls to `fn`, then trace one more call for its peak memory (numpy allocations included)."""
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Result(name, lines, best, lines / best if best > 0 else 0.0, peak)
+
+
+def generate_logs(directory: str, lines: int, seed: int = 0) -> dict[str, str]:
+    """Write a synthetic log of each type with `lines` lines, returning their paths. Logs already written are reused."""
+
+    paths = {}
+    for kind, write in (
+        ('got', generate.got_log),
+        ('telegraf', generate.telegraf_log),
+        ('blue', generate.blue_log),
+    ):
+        path = os.path.join(directory, f'{kind}-{lines}-{seed}.log')
+        if not os.path.exists(path):
+            write(path + '.tmp', lines, seed)
+            os.replace(path + '.tmp', path)
+        paths[kind] = path
+    return paths
+
+
+def rolling_benchmarks(
+    got: Got, telegraf: Telegraf, blue: Blue
+) -> list[tuple[str, Callable[[], Any]]]:
+    """A rolling window benchmark for each reducer in `rolling_funcs`, with variable and constant stride."""
+
+    cpu = telegraf.series('cpu', 'usage_user')
+    flows = telegraf.series('netflow', 'src', use_time='flow_start_ms')
+    ok_rate = blue.series('ok_rate')
+
+    def on_got(fn: Callable, rate: bool) -> Callable[[float], Any]:
+        return lambda stride: got.rolling(WINDOW_SECS, fn, rate, stride)
+
+    def on_series(
+        series: TimeSeries, fn: Callable, rate: bool
+    ) -> Callable[[float], Any]:
+        return lambda stride: utils.rolling(
+            series.times_ns, series.values, WINDOW_SECS, fn, rate, stride
+        )
+
+    cases = [
+        ('got count_ok', on_got(rolling_funcs.count_ok, True)),
+        ('got count_err', on_got(rolling_funcs.count_err, True)),
+        ('got proportion_ok', on_got(rolling_funcs.proportion_ok, False)),
+        ('telegraf mean', on_series(cpu, rolling_funcs.mean, False)),
+        (
+            'telegraf count_kleene_packets',
+            on_series(flows, rolling_funcs.count_kleene_packets, True),
+        ),
+        (
+            'telegraf count_hilbert_packets',
+            on_series(flows, rolling_funcs.count_hilbert_packets, True),
+        ),
+        (
+            'telegraf count_mac_packets',
+            on_series(flows, rolling_funcs.count_mac_packets, True),
+        ),
+        ('blue mean', on_series(ok_rate, rolling_funcs.mean, False)),
+    ]
+    benchmarks: list[tuple[str, Callable[[], Any]]] = []
+    for name, fn in cases:
+        for stride, label in ((-1.0, 'variable'), (STRIDE_SECS, 'const')):
+            benchmarks.append(
+                (f'rolling {name} {label}', functools.partial(fn, stride))
+            )
+    return benchmarks
+
+
+def overlay(paths: dict[str, str]) -> None:
+    """Plot every log end-to-end with `overlay_rolling`, as a notebook would."""
+
+    fig, ax = plt.subplots()
+    plot_utils.overlay_rolling(
+        ax,
+        {
+            'client': LogFile(LogFileType.GOT, paths['got']),
+            'hilbert': LogFile(
+                LogFileType.TELEGRAF,
+                paths['telegraf'],
+                {'telegraf': {'cpu': ['usage_user'], 'nginx': ['active']}},
+            ),
+            'blue': LogFile(LogFileType.BLUE, paths['blue'], {'states': ['ok_rate']}),
+        },
+        [Roller('mean', rolling_funcs.mean)],
+        WINDOW_SECS,
+        const_stride_secs=STRIDE_SECS,
+        processes=1,
+    )
+    fig.canvas.draw()
+    plt.close(fig)
+
+
+def run(sizes: list[int], directory: str, repeat: int = 3) -> list[Result]:
+    """Run every benchmark on synthetic logs of each size. Logs are parsed without the sidecar cache, and rolling windows are evaluated without memoization (see `memo`), so that repeats are not lookups."""
+
+    memo.ENABLED = False
+    results = []
+    for lines in sizes:
+        paths = generate_logs(directory, lines)
+        parses = [
+            ('parse got', lambda: Got(paths['got'])),
+            ('parse telegraf', lambda: Telegraf(paths['telegraf'])),
+            ('parse blue', lambda: Blue(paths['blue'])),
+        ]
+        for name, fn in parses:
+            results.append(measure(name, lines, fn, repeat))
+            print_result(results[-1])
+        got = Got(paths['got'])
+        telegraf = Telegraf(paths['telegraf'])
+        blue = Blue(paths['blue'])
+        for name, fn in rolling_benchmarks(got, telegraf, blue):
+            results.append(measure(name, lines, fn, repeat))
+            print_result(results[-1])
+        with sidecar_disabled():
+            results.append(measure('overlay_rolling', lines, lambda: overlay(paths), 1))
+        print_result(results[-1])
+    return results
+
+
+@contextlib.contextmanager
+def sidecar_disabled():
+    """Parse from scratch inside `overlay_rolling`, rather than from sidecars written by earlier repeats."""
+
+    enabled, sidecar.ENABLED = sidecar.ENABLED, False
+    try:
+        yield
+    finally:
+        sidecar.ENABLED = enabled
+
+
+def print_result(r: Result) -> None:
+    print(
+        f'{r.name:<48} {r.lines:>11,} lines {r.seconds:>9.4f} s '
+        f'{r.lines_per_sec:>14,.0f} lines/s {r.peak_bytes / 2**20:>9.1f} MiB'
+    )
+
+
+def commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(path: str, results: list[Result]) -> None:
+    """Save results as JSON, along with the commit and environment they were measured in."""
+
+    with open(path, 'w') as f:
+        json.dump(
+            {
+                'commit': commit(),
+                'time': time.time(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'machine': platform.machine(),
+                'results': [asdict(r) for r in results],
+            },
+            f,
+            indent=2,
+        )
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print the speedup (before / after time) of every benchmark found in both result files."""
+
+    with open(before_path) as f:
+        before = {(r['name'], r['lines']): r for r in json.load(f)['results']}
+    with open(after_path) as f:
+        after = json.load(f)['results']
+    for r in after:
+        b = before.get((r['name'], r['lines']))
+        if b is None or r['seconds'] == 0:
+            continue
+        print(
+            f'{r["name"]:<48} {r["lines"]:>11,} lines '
+            f'{b["seconds"]:>9.4f} s -> {r["seconds"]:>9.4f} s '
+            f'({b["seconds"] / r["seconds"]:.2f}x)'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark parsing and rolling windows on synthetic logs.'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument(
+        '--sizes', type=int, nargs='+', default=list(SIZES), help='lines per log'
+    )
+    run_parser.add_argument(
+        '--dir', help='directory for the synthetic logs (default: a temporary one)'
+    )
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--out', default='bench.json', help='results file')
+    compare_parser = commands.add_parser('compare', help='compare two results files')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    args = parser.parse_args()
+    matplotlib.use('Agg')
+
+    match args.command:
+        case 'run':
+            if args.dir is not None:
+                os.makedirs(args.dir, exist_ok=True)
+                results = run(args.sizes, args.dir, args.repeat)
+            else:
+                with tempfile.TemporaryDirectory() as directory:
+                    results = run(args.sizes, directory, args.repeat)
+            save(args.out, results)
+        case 'compare':
+            compare(args.before, args.after)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,16 @@
 import json
+import re
 from enum import Enum, auto
 from dataclass_wizard import fromdict
 from dataclasses import dataclass
+from typing import Any, Callable, Optional
 import matplotlib.pyplot as plt
 import numpy as np
+import align
+import instrument
+import sidecar
+import stream
+from timeseries import TimeSeries
 
 
 class Action(Enum):
@@ -15,11 +22,11 @@ class Action(Enum):
     def parse(info: str):
         match info:
             case 'ToggleGreen':
-                Action.ToggleGreen
+                return Action.ToggleGreen
             case 'ToggleRed':
-                Action.ToggleRed
+                return Action.ToggleRed
             case 'Wait':
-                Action.Wait
+                return Action.Wait
             case u:
                 raise Exception(f'Action: {u} is unimplemented')
 
@@ -35,58 +42,261 @@ class State:
         return getattr(self, key)
 
 
+# The firewall configurations, indexed by `green_blocked + 2 * red_blocked`.
+CONFIGURATIONS = ('none_blocked', 'green_blocked', 'red_blocked', 'both_blocked')
+
+# A state or action line, as written by the 'blue' program.
+STATE_LINE = re.compile(
+    rb'^\[(\d+)\] \{"ok_rate":"?([-+.\deE]+)"?,"green_blocked":(true|false),'
+    rb'"red_blocked":(true|false),"reward":(-?\d+)\}\r?$',
+    re.M,
+)
+ACTION_LINE = re.compile(rb'^\[(\d+)\] (ToggleGreen|ToggleRed|Wait)\r?$', re.M)
+NON_EMPTY_LINE = re.compile(rb'^[^\n]*\S[^\n]*$', re.M)
+
+
+def parse_lines(lines: list[str]) -> dict[str, np.ndarray]:
+    """Pure-Python parser for the lines of a 'blue' log into columns (see `parse_columns`), decoding each state with `json` and `fromdict`."""
+
+    state_times, states, action_times, actions = [], [], [], []
+    for line in lines:
+        if line.strip() == '':
+            continue
+        [time, info] = line.split(maxsplit=1, sep=' ')
+        time = int(time.replace('[', '').replace(']', ''))
+
+        if info.startswith('{'):
+            state_times.append(time)
+            states.append(fromdict(State, json.loads(info)))
+        else:
+            action_times.append(time)
+            actions.append(Action.parse(info.strip()).value)
+    return {
+        'state_times': np.array(state_times, dtype=np.int64),
+        'ok_rate': np.array([s.ok_rate for s in states], dtype=np.float64),
+        'green_blocked': np.array([s.green_blocked for s in states], dtype=np.bool_),
+        'red_blocked': np.array([s.red_blocked for s in states], dtype=np.bool_),
+        'reward': np.array([s.reward for s in states], dtype=np.int64),
+        'action_times': np.array(action_times, dtype=np.int64),
+        'action': np.array(actions, dtype=np.int8),
+    }
+
+
+def parse_columns(buf: bytes | memoryview) -> dict[str, np.ndarray]:
+    """
+    Parse the raw bytes of a 'blue' log into columns: the time (ns) and fields of every state, and the time (ns) and `Action` value of every action.
+    Lines are matched with a regular expression over the whole buffer and converted to typed columns in bulk. If any line is not in the expected format (e.g. the state's keys are reordered), the log is parsed line by line with `parse_lines` instead.
+    """
+
+    states = STATE_LINE.findall(buf)
+    actions = ACTION_LINE.findall(buf)
+    if len(states) + len(actions) != len(NON_EMPTY_LINE.findall(buf)):
+        return parse_lines(str(buf, 'utf-8').splitlines())
+
+    def column(matches: list[tuple], i: int) -> np.ndarray:
+        return np.array([m[i] for m in matches], dtype=np.bytes_)
+
+    return {
+        'state_times': column(states, 0).astype(np.int64),
+        'ok_rate': column(states, 1).astype(np.float64),
+        'green_blocked': column(states, 2) == b'true',
+        'red_blocked': column(states, 3) == b'true',
+        'reward': column(states, 4).astype(np.int64),
+        'action_times': column(actions, 0).astype(np.int64),
+        'action': np.array(
+            [Action[str(m[1], 'utf-8')].value for m in actions], dtype=np.int8
+        ),
+    }
+
+
+def parse_file(log_file_path: str) -> dict[str, np.ndarray]:
+    """Parse a 'blue' log file into columns (see `parse_columns`), along with the byte offset following the last line."""
+
+    tail = stream.Tail(log_file_path)
+    columns = parse_tail(tail, True)
+    return {**columns, 'offset': np.array(tail.offset)}
+
+
+def parse_tail(tail: stream.Tail, final: bool) -> dict[str, np.ndarray]:
+    """
+    Read (see `stream.Tail.read`) and parse the lines appended to a 'blue' log file since the last read into columns (see `parse_columns`).
+    With `final`, a trailing line without a newline that fails to parse is assumed to still be being written, and is left for a later read.
+    """
+
+    with instrument.stage('read'):
+        buf = tail.read(final)
+        instrument.samples(len(buf))
+    with instrument.stage('parse'):
+        try:
+            columns = parse_columns(buf)
+        except Exception:
+            complete = tail.unfinished(buf) if final else None
+            if complete is None:
+                raise
+            columns = parse_columns(complete)
+        instrument.samples(len(columns['state_times']) + len(columns['action_times']))
+    return columns
+
+
 class Blue:
-    def __init__(self, log_file_path: str):
-        actions = []
-        states = []
-        with open(log_file_path) as f:
-            for line in f.readlines():
-                [time, info] = line.split(maxsplit=1, sep=' ')
-                time = int(time.replace('[', '').replace(']', ''))
-
-                if info.startswith('{'):
-                    states.append((time, fromdict(State, json.loads(info))))
-                else:
-                    actions.append((time, Action.parse(info.strip('\n'))))
-        self.actions, self.states = actions, states
+    # Increment when the columns returned by `parse_columns` change, to rebuild cached sidecars.
+    PARSER_VERSION = 3
 
-    def stats(self, sorted=False, end_ns=None):
-        if not end_ns:
-            end_ns = (
-                round((self.states[-1][0] - self.states[0][0]) / 2) + self.states[0][0]
+    def __init__(self, log_file_path: str, cache: bool = False):
+        """
+        Load a 'blue' log file into typed columns, lines appended to the file later are loaded by `refresh`.
+        `cache` loads the parsed columns from an on-disk sidecar (see `sidecar`), which is written the first time the file is parsed. `False` by default.
+        """
+
+        self._tail = stream.Tail(log_file_path)
+        self._columns = parse_columns(b'')
+        self._cumulative_reward: Optional[np.ndarray] = None
+        if cache:
+            columns = sidecar.load(
+                log_file_path, 'blue', Blue.PARSER_VERSION, parse_file
             )
-        exploration = [state for (time, state) in self.states if time < end_ns]
-        cumulative_reward = {
-            'none_blocked': 0,
-            'both_blocked': 0,
-            'green_blocked': 0,
-            'red_blocked': 0,
+            self._tail.offset = int(columns.pop('offset'))
+            self._extend(columns)
+        else:
+            self._load(final=True)
+
+    def refresh(self) -> int:
+        """Load the complete (newline terminated) lines appended to the log file since it was last read. Returns the number of new states and actions."""
+
+        return self._load(final=False)
+
+    def _load(self, final: bool) -> int:
+        columns = parse_tail(self._tail, final)
+        self._extend(columns)
+        return len(columns['state_times']) + len(columns['action_times'])
+
+    def _extend(self, columns: dict[str, np.ndarray]) -> None:
+        self._columns = {
+            k: np.concatenate((v, columns[k])) for k, v in self._columns.items()
         }
-        for state in exploration:
-            if state['green_blocked']:
-                if state['red_blocked']:
-                    cumulative_reward.update(
-                        both_blocked=cumulative_reward.get('both_blocked')
-                        + state['reward']
-                    )
-                else:
-                    cumulative_reward.update(
-                        green_blocked=cumulative_reward.get('green_blocked')
-                        + state['reward']
-                    )
-            else:
-                if state['red_blocked']:
-                    cumulative_reward.update(
-                        red_blocked=cumulative_reward.get('red_blocked')
-                        + state['reward']
-                    )
-                else:
-                    cumulative_reward.update(
-                        none_blocked=cumulative_reward.get('none_blocked')
-                        + state['reward']
-                    )
-
-        items = list(cumulative_reward.items())
+        self._cumulative_reward = None
+
+    def state_times(self) -> np.ndarray:
+        """The time (ns) of every state."""
+
+        return self._columns['state_times']
+
+    def state(self, feature: str) -> np.ndarray:
+        """A column of every state, one of 'ok_rate', 'green_blocked', 'red_blocked' or 'reward'."""
+
+        if feature not in State.__dataclass_fields__:
+            raise Exception(f'State feature: {feature} is unimplemented')
+        return self._columns[feature]
+
+    def series(self, feature: str) -> TimeSeries:
+        """A column of every state (see `state`), indexed by time."""
+
+        return TimeSeries(self.state_times(), self.state(feature))
+
+    def action_times(self) -> np.ndarray:
+        """The time (ns) of every action."""
+
+        return self._columns['action_times']
+
+    def action_codes(self) -> np.ndarray:
+        """The `Action` value of every action."""
+
+        return self._columns['action']
+
+    def action_series(self) -> TimeSeries:
+        """The `Action` value of every action, indexed by time."""
+
+        return TimeSeries(self.action_times(), self.action_codes())
+
+    def join(
+        self,
+        sources: dict[str, TimeSeries],
+        window: float,
+        fn: Callable[[list[Any]], Any]
+        | str
+        | dict[str, Callable[[list[Any]], Any] | str],
+        rate: bool = False,
+        after: bool = True,
+        tolerance_secs: Optional[float] = None,
+        on: str = 'actions',
+    ) -> align.Frame:
+        """
+        Line up every action (or state, with `on='states'`) with what the other sources saw at that moment and over the following `window` seconds (see `align.join`), e.g. {'client': got.series(), 'nginx': telegraf.series('nginx', 'active')} to judge each decision of the defender.
+        Returns a `align.Frame` indexed by the time of every action, with an 'action' column (of `Action` values) or a column per state feature, followed by the joined columns.
+        """
+
+        match on:
+            case 'actions':
+                times = self.action_times()
+                own = {'action': self.action_codes()}
+            case 'states':
+                times = self.state_times()
+                own = {f: self.state(f) for f in State.__dataclass_fields__}
+            case u:
+                raise Exception(f'Blue.join on: {u} is unimplemented')
+        frame = align.join(times, sources, window, fn, rate, after, tolerance_secs)
+        frame.columns = {**own, **frame.columns}
+        return frame
+
+    def configurations(self) -> np.ndarray:
+        """The index into `CONFIGURATIONS` of the firewall configuration of every state."""
+
+        return self.state('green_blocked') + 2 * self.state('red_blocked').astype(
+            np.int64
+        )
+
+    @property
+    def states(self) -> list[tuple[int, State]]:
+        """A (time, `State`) tuple for every state."""
+
+        return list(
+            zip(
+                self.state_times().tolist(),
+                map(
+                    State,
+                    self.state('ok_rate').tolist(),
+                    self.state('green_blocked').tolist(),
+                    self.state('red_blocked').tolist(),
+                    self.state('reward').tolist(),
+                ),
+            )
+        )
+
+    @property
+    def actions(self) -> list[tuple[int, Action]]:
+        """A (time, `Action`) tuple for every action."""
+
+        return list(
+            zip(self.action_times().tolist(), map(Action, self.action_codes().tolist()))
+        )
+
+    def cumulative_reward(self, end_ns: Any) -> np.ndarray:
+        """
+        The reward accumulated by each firewall configuration (ordered as `CONFIGURATIONS`) over the states before `end_ns`.
+        `end_ns` may be an array of end-times, e.g. to follow the cumulative reward through a run, in which case a row is returned per end-time.
+        """
+
+        if self._cumulative_reward is None:
+            # Prefix sums of the reward of each configuration, one row per state.
+            n = len(self.state_times())
+            rewards = np.zeros((n + 1, len(CONFIGURATIONS)), dtype=np.int64)
+            rewards[np.arange(1, n + 1), self.configurations()] = self.state('reward')
+            self._cumulative_reward = np.cumsum(rewards, axis=0)
+        return self._cumulative_reward[
+            np.searchsorted(self.state_times(), end_ns, side='left')
+        ]
+
+    def stats(self, sorted=False, end_ns=None):
+        times = self.state_times()
+        if not end_ns:
+            end_ns = round((times[-1] - times[0]) / 2) + times[0]
+        cumulative_reward = dict(
+            zip(CONFIGURATIONS, self.cumulative_reward(end_ns).tolist())
+        )
+        items = [
+            (k, cumulative_reward[k])
+            for k in ('none_blocked', 'both_blocked', 'green_blocked', 'red_blocked')
+        ]
         if sorted:
             items.sort(key=lambda x: x[1], reverse=True)
         return items
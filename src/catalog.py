@@ -0,0 +1,241 @@
+import json
+import os
+import re
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+import numpy as np
+import stream
+import sidecar
+import telegraf
+from logfiles import LogFile, LogFileType
+
+# A 'got' line starts with the receive time and success flag, and a 'blue' line with a time and then a state or an action.
+GOT_LINE = re.compile(rb'^\[(\d+)\] [01]')
+BLUE_LINE = re.compile(rb'^\[(\d+)\] (?:\{"ok_rate"|ToggleGreen|ToggleRed|Wait)')
+TELEGRAF_TIMESTAMP = re.compile(rb'"timestamp":\s*(\d+(?:\.\d+)?)')
+TELEGRAF_NAME = re.compile(rb'"name":\s*"([^"]+)"')
+BLANK_LINE = re.compile(rb'^[ \t\r]*\n', re.M)
+
+# Increment when the information extracted by `scan` changes, to re-scan every log.
+SCAN_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    path TEXT PRIMARY KEY,
+    experiment TEXT NOT NULL,
+    host TEXT NOT NULL,
+    log_type TEXT,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    first_ns INTEGER,
+    last_ns INTEGER,
+    streams TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logs_by_host ON logs (host, first_ns, last_ns);
+"""
+
+
+@dataclass
+class Entry:
+    """A log file found by a `Catalog`, with the time span (ns) of its lines. `streams` are the names of the streams of a 'telegraf' log."""
+
+    path: str
+    experiment: str
+    host: str
+    log_type: Optional[LogFileType]
+    lines: int
+    first_ns: Optional[int]
+    last_ns: Optional[int]
+    streams: list[str]
+
+    def log_file(self, kwargs: Optional[dict] = None) -> LogFile:
+        """A `LogFile` for plotting this log with `plot_utils.overlay_rolling`."""
+
+        if self.log_type is None:
+            raise Exception(f'Catalog: the type of log: {self.path} is unknown')
+        return LogFile(self.log_type, self.path, kwargs)
+
+
+def log_type(first_line: bytes) -> Optional[LogFileType]:
+    """Detect the type of a log from its first line, `None` if it is not a known type."""
+
+    if first_line.startswith(b'{') and TELEGRAF_NAME.search(first_line):
+        return LogFileType.TELEGRAF
+    if BLUE_LINE.match(first_line):
+        return LogFileType.BLUE
+    if GOT_LINE.match(first_line):
+        return LogFileType.GOT
+    return None
+
+
+def line_time_ns(kind: LogFileType, line: bytes) -> Optional[int]:
+    """The time (ns) of a line of a log of the given type."""
+
+    if kind == LogFileType.TELEGRAF:
+        m = TELEGRAF_TIMESTAMP.search(line)
+        return None if m is None else int(telegraf_times_ns([m.group(1)])[0])
+    m = re.match(rb'^\[(\d+)\]', line)
+    return None if m is None else int(m.group(1))
+
+
+def telegraf_times_ns(timestamps: list[bytes]) -> np.ndarray:
+    """The times (ns) of the matches of `TELEGRAF_TIMESTAMP`, converted as `Telegraf` converts the timestamps it loads."""
+
+    return telegraf.timestamps_ns([json.loads(t) for t in timestamps])
+
+
+def scan(path: str) -> dict:
+    """Extract the type, line count, time span and 'telegraf' stream names of a log file in a single pass over its lines, without parsing them."""
+
+    buf = bytes(stream.Tail(path).read(final=True))
+    if not buf.endswith(b'\n'):
+        buf += b'\n'
+    first = re.search(rb'^[^\n]*\S[^\n]*', buf, re.M)
+    kind = None if first is None else log_type(first.group())
+    info: dict[str, Any] = {
+        'log_type': None if kind is None else kind.name,
+        'lines': buf.count(b'\n') - len(BLANK_LINE.findall(buf)),
+        'first_ns': None,
+        'last_ns': None,
+        'streams': [],
+    }
+    if first is None or kind is None:
+        return info
+    info['first_ns'] = line_time_ns(kind, first.group())
+    info['last_ns'] = line_time_ns(kind, buf.rstrip().rsplit(b'\n', 1)[-1])
+    if kind == LogFileType.TELEGRAF:
+        names = {m.decode() for m in TELEGRAF_NAME.findall(buf)}
+        info['streams'] = sorted(names)
+        # Records of different streams are not strictly in time order.
+        times = telegraf_times_ns(TELEGRAF_TIMESTAMP.findall(buf))
+        if len(times) > 0:
+            info['first_ns'] = int(times.min())
+            info['last_ns'] = int(times.max())
+    return info
+
+
+class Catalog:
+    def __init__(self, root: str, db_path: Optional[str] = None):
+        """
+        An index of the log files in an experiments tree (`<root>/<experiment>/logs/[<host>/]...`), persisted in SQLite.
+        `db_path` defaults to 'catalog.sqlite' in the sidecar cache directory (see `sidecar`).
+        Call `update` to (re-)scan the log files that are new or have changed since they were last indexed.
+        """
+
+        self.root = os.path.abspath(root)
+        if db_path is None:
+            os.makedirs(sidecar.CACHE_DIR, exist_ok=True)
+            db_path = os.path.join(sidecar.CACHE_DIR, 'catalog.sqlite')
+        self._db = sqlite3.connect(db_path)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def log_paths(self) -> Iterator[tuple[str, str, str]]:
+        """The (path, experiment, host) of every file below a 'logs' directory of an experiment."""
+
+        for experiment in sorted(os.listdir(self.root)):
+            logs = os.path.join(self.root, experiment, 'logs')
+            for directory, _, files in os.walk(logs):
+                relative = os.path.relpath(directory, logs)
+                host = '' if relative == '.' else relative.split(os.sep)[0]
+                for name in sorted(files):
+                    yield os.path.join(directory, name), experiment, host
+
+    def update(self) -> int:
+        """Scan the log files that are new or have changed (by size and mtime) since they were last indexed, and forget the log files that no longer exist. Returns the number of log files scanned."""
+
+        known = {
+            path: (size, mtime_ns, version)
+            for path, size, mtime_ns, version in self._db.execute(
+                'SELECT path, size, mtime_ns, version FROM logs'
+            )
+        }
+        scanned = 0
+        with self._db:
+            for path, experiment, host in self.log_paths():
+                stat = os.stat(path)
+                current = (stat.st_size, stat.st_mtime_ns, SCAN_VERSION)
+                if known.pop(path, None) == current:
+                    continue
+                info = scan(path)
+                self._db.execute(
+                    'INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (
+                        path,
+                        experiment,
+                        host,
+                        info['log_type'],
+                        *current,
+                        info['lines'],
+                        info['first_ns'],
+                        info['last_ns'],
+                        json.dumps(info['streams']),
+                    ),
+                )
+                scanned += 1
+            self._db.executemany(
+                'DELETE FROM logs WHERE path = ?', [(path,) for path in known]
+            )
+        return scanned
+
+    def query(
+        self,
+        host: Optional[str] = None,
+        log_type: Optional[LogFileType] = None,
+        experiment: Optional[str] = None,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        stream: Optional[str] = None,
+    ) -> list[Entry]:
+        """
+        The indexed log files of a known type, optionally only those on a `host` (e.g. 'kleene'), of a `log_type`, from an `experiment` (e.g. '250311_blue_dos'), with lines overlapping [`start_ns`, `end_ns`], or with a 'telegraf' `stream` (e.g. 'netflow').
+        Ordered by their first time.
+        """
+
+        where: list[str] = ['log_type IS NOT NULL']
+        params: list[str | int] = []
+        for column, value in (
+            ('host', host),
+            ('log_type', None if log_type is None else log_type.name),
+            ('experiment', experiment),
+        ):
+            if value is not None:
+                where.append(f'{column} = ?')
+                params.append(value)
+        if start_ns is not None:
+            where.append('last_ns >= ?')
+            params.append(start_ns)
+        if end_ns is not None:
+            where.append('first_ns <= ?')
+            params.append(end_ns)
+        rows = self._db.execute(
+            'SELECT path, experiment, host, log_type, lines, first_ns, last_ns, streams '
+            f'FROM logs WHERE {" AND ".join(where)} ORDER BY first_ns, path',
+            params,
+        )
+        entries = [
+            Entry(
+                path,
+                experiment,
+                host,
+                LogFileType[kind],
+                lines,
+                first_ns,
+                last_ns,
+                json.loads(streams),
+            )
+            for path, experiment, host, kind, lines, first_ns, last_ns, streams in rows
+        ]
+        if stream is not None:
+            entries = [e for e in entries if stream in e.streams]
+        return entries
+
+    def log_files(self, kwargs: Optional[dict] = None, **query: Any) -> list[LogFile]:
+        """`LogFile`s for the log files matching a `query` (which takes the same arguments), each with the plotting `kwargs`."""
+
+        return [entry.log_file(kwargs) for entry in self.query(**query)]
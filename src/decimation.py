@@ -0,0 +1,88 @@
+from typing import Any
+import numpy as np
+import utils
+
+# Decimation methods, applied by `decimate`.
+# 'minmax' keeps the first and last point, and the minimum and maximum point of each bucket of x, so every peak and trough is drawn. 'lttb' keeps the point of each bucket forming the largest triangle with its neighbours (Largest-Triangle-Three-Buckets), which better preserves the shape of the line.
+METHODS = ('minmax', 'lttb')
+
+
+def min_max(x: Any, y: Any, buckets: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a line with sorted `x` to at most `2 * buckets + 2` points, splitting `x` into `buckets` buckets of equal width and keeping the minimum and maximum point of each (`nan` values are ignored).
+    Returns the kept points in order, or the line unchanged if it is already small enough.
+    """
+
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n <= 2 * buckets + 2:
+        return x, y
+    edges = np.linspace(x[0], x[-1], buckets + 1)[:-1]
+    # The index of the first point of each non-empty bucket.
+    starts = np.unique(np.searchsorted(x, edges, side='left'))
+    starts = starts[starts < n]
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+    index = np.arange(n)
+    kept = [np.array([0, n - 1])]
+    for reduce in (np.fmin, np.fmax):
+        extreme = reduce.reduceat(y, starts)
+        # The first point of each bucket attaining the extreme, or the bucket's first point if all of its values are `nan`.
+        first = np.minimum.reduceat(np.where(y == extreme[bucket], index, n), starts)
+        kept.append(np.where(first == n, starts, first))
+    keep = np.unique(np.concatenate(kept))
+    return x[keep], y[keep]
+
+
+def lttb(x: Any, y: Any, points: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a line with sorted `x` to `points` points with Largest-Triangle-Three-Buckets, keeping the first and last point and one point from each of `points - 2` buckets of equal count (`nan` values are only kept from buckets containing nothing else).
+    The areas of a bucket's triangles are computed at once, so the cost is a pass over the points plus a step per bucket.
+    Returns the kept points in order, or the line unchanged if it is already small enough.
+    """
+
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if points < 3 or n <= points:
+        return x, y
+    xf = x.astype(np.float64)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    # The mean point of each bucket, ignoring `nan` values, followed by the last point.
+    finite = ~np.isnan(y)
+    counts = np.add.reduceat(finite, edges[:-1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.add.reduceat(np.where(finite, xf, 0.0), edges[:-1]) / counts
+        mean_y = np.add.reduceat(np.where(finite, y, 0.0), edges[:-1]) / counts
+    mean_x = np.append(mean_x, xf[-1])
+    mean_y = np.append(mean_y, y[-1])
+
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the area of the triangles between the last kept point, each point in this bucket, and the mean of the next bucket.
+        area = np.abs(
+            (xf[a] - mean_x[i + 1]) * (y[lo:hi] - y[a])
+            - (xf[a] - xf[lo:hi]) * (mean_y[i + 1] - y[a])
+        )
+        area[np.isnan(area)] = -1.0
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def decimate(x: Any, y: Any, method: str, width: int) -> tuple[np.ndarray, np.ndarray]:
+    """Reduce a line to a number of points proportional to the `width` (pixels) it is drawn at, with one of `METHODS`. The methods need sorted `x`, so a line with unsorted `x` (e.g. netflow flow start times) is first sorted by `x`."""
+
+    if not utils.is_sorted(x):
+        order = np.argsort(x, kind='stable')
+        x, y = np.asarray(x)[order], np.asarray(y)[order]
+    match method:
+        case 'minmax':
+            return min_max(x, y, width)
+        case 'lttb':
+            return lttb(x, y, 2 * width)
+        case u:
+            raise Exception(f'decimation method: {u} is unimplemented')
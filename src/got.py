@@ -1,12 +1,23 @@
-from typing import Callable, Any
+from typing import Callable, Any, Iterable, Iterator, Optional
+import numpy as np
+import instrument
+import memo
+import parsers
+from pyramid import BASE_SECS, Pyramid
+import sidecar
+import spectral
+import stream
+from timeseries import TimeSeries
 import utils
 
 
 class Response:
-    def __init__(self, recv: int, success: bool):
+    def __init__(self, recv: int, success: bool, reason: str = ''):
         # response receive time in ns.
         self.recv = recv
         self.success = success
+        # the text following the success flag, e.g. the reason for a failure.
+        self.reason = reason
 
     @staticmethod
     def parse(line: str):
@@ -14,59 +25,565 @@ class Response:
         time = int(time.replace('[', '').replace(']', ''))
 
         success = bool(int(info[0]))
-        return Response(time, success)
+        return Response(time, success, parsers.reason_text(info[1:]))
+
+
+def parse_lines(lines: Iterable[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Pure-Python parser for the lines of a 'got' log, one `Response.parse` per line."""
+
+    times = []
+    success = []
+    for line in lines:
+        if line.strip() == '':
+            continue
+        response = Response.parse(line)
+        times.append(response.recv)
+        success.append(response.success)
+    return np.array(times, dtype=np.int64), np.array(success, dtype=np.bool_)
+
+
+def parse_bytes(
+    buf: bytes | memoryview, engine: str = 'mmap'
+) -> tuple[np.ndarray, np.ndarray]:
+    """Parse the raw bytes of complete lines of a 'got' log with the chosen engine (see `Got`)."""
+
+    match engine:
+        case 'mmap':
+            try:
+                return parsers.got_bytes(buf)
+            except parsers.ParseError:
+                return parse_lines(str(buf, 'utf-8').splitlines())
+        case 'python':
+            return parse_lines(str(buf, 'utf-8').splitlines())
+        case u:
+            raise Exception(f'Got parse engine: {u} is unimplemented')
+
+
+def parse_reasons(
+    buf: bytes | memoryview, engine: str = 'mmap'
+) -> tuple[np.ndarray, list[str]]:
+    """Parse the text following the success flag (e.g. the failure reason) of complete lines of a 'got' log with the chosen engine, as codes into the distinct texts (see `parsers.got_reasons`)."""
+
+    match engine:
+        case 'mmap':
+            try:
+                return parsers.got_reasons(buf)
+            except parsers.ParseError:
+                pass
+        case 'python':
+            pass
+        case u:
+            raise Exception(f'Got parse engine: {u} is unimplemented')
+    reasons = {'': 0}
+    codes = [
+        reasons.setdefault(Response.parse(line).reason, len(reasons))
+        for line in str(buf, 'utf-8').splitlines()
+        if line.strip() != ''
+    ]
+    return np.array(codes, dtype=np.int32), list(reasons)
+
+
+def parse_columns(log_file_pth: str, engine: str = 'mmap') -> dict[str, np.ndarray]:
+    """Parse a 'got' log file into columns, along with the byte offset following the last line."""
+
+    tail = stream.Tail(log_file_pth)
+    times, success, reason, reasons = parse_tail(tail, True, engine)
+    return {
+        'times': times,
+        'success': success,
+        'reason': reason,
+        'reasons': np.array(reasons, dtype=np.str_),
+        'offset': np.array(tail.offset),
+    }
+
+
+def parse_tail(
+    tail: stream.Tail, final: bool, engine: str = 'mmap'
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]:
+    """
+    Read (see `stream.Tail.read`) and parse the lines appended to a 'got' log file since the last read, into the times, success mask and reason codes of the new responses and the distinct reasons.
+    With `final`, a trailing line without a newline that fails to parse is assumed to still be being written, and is left for a later read.
+    """
+
+    with instrument.stage('read'):
+        buf = tail.read(final)
+        instrument.samples(len(buf))
+    with instrument.stage('parse'):
+        try:
+            times, success = parse_bytes(buf, engine)
+            reason, reasons = parse_reasons(buf, engine)
+        except Exception:
+            complete = tail.unfinished(buf) if final else None
+            if complete is None:
+                raise
+            times, success = parse_bytes(complete, engine)
+            reason, reasons = parse_reasons(complete, engine)
+        instrument.samples(len(times))
+    return times, success, reason, reasons
+
+
+# Size of the chunks read by `read_chunks` (bytes).
+CHUNK_BYTES = 64 * 2**20
+
+
+def read_chunks(
+    log_file_pth: str, chunk_bytes: int = CHUNK_BYTES, engine: str = 'mmap'
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """
+    Parse a 'got' log file a chunk of about `chunk_bytes` at a time, without holding more than one chunk in memory.
+    Lines split by a chunk boundary are carried over to the next chunk, and a trailing line without a newline is parsed last, as with `Got`.
+    Yields the receive times (ns) and success mask of the responses in each chunk.
+    """
+
+    carry = b''
+    with open(log_file_pth, 'rb') as f:
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                if carry.strip():
+                    yield parse_bytes(carry, engine)
+                return
+            buf = carry + data
+            end = buf.rfind(b'\n') + 1
+            carry = buf[end:]
+            if end > 0:
+                yield parse_bytes(memoryview(buf)[:end], engine)
+
+
+def rolling_chunks(
+    log_file_pth: str,
+    window: float,
+    fn: Callable[[list[Response]], Any] | str,
+    rate: bool = False,
+    const_stride_secs: float = -1.0,
+    zeroed_times: bool = False,
+    chunk_bytes: int = CHUNK_BYTES,
+    engine: str = 'mmap',
+) -> Iterator[tuple[np.ndarray, Any]]:
+    """
+    Evaluate a function on a rolling window over a 'got' log file of any size, reading it in chunks (see `read_chunks`) and carrying the window across chunk boundaries with `stream.RollingWindow`.
+    Memory is bounded by the chunk size plus one window of responses, rather than by the length of the log. The windows, and the values returned, match `Got.rolling` on the whole log.
+    Functions tagged with `utils.quantile` (e.g. `rolling_funcs.p95`) are evaluated over the inter-arrival gaps (s) between responses, matching `Got.rolling_gap_quantiles`. The other arguments are as for `Got.rolling`.
+    Yields the end-times (ns) and values of the windows completed by each chunk.
+    """
+
+    gaps = hasattr(fn, 'quantile')
+    roller = stream.RollingWindow(window, fn, rate, const_stride_secs, zeroed_times)
+    previous: Optional[int] = None
+    values: Any
+    for times, success in read_chunks(log_file_pth, chunk_bytes, engine):
+        if len(times) == 0:
+            continue
+        if gaps:
+            # The gap before the first response of a chunk is from the last response of the previous chunk.
+            with_previous = times if previous is None else np.insert(times, 0, previous)
+            previous = int(times[-1])
+            times, values = (
+                with_previous[1:],
+                utils.time_units_transform('s', np.diff(with_previous)),
+            )
+        elif utils.builtin_reducer(fn) is not None:
+            values = success
+        else:
+            values = list(map(Response, times.tolist(), success.tolist()))
+        ends, results = roller.push(times, values)
+        if len(ends) > 0:
+            yield ends, results
+
+
+def rolling_chunked(
+    log_file_pth: str,
+    window: float,
+    fn: Callable[[list[Response]], Any] | str,
+    rate: bool = False,
+    const_stride_secs: float = -1.0,
+    zeroed_times: bool = False,
+    chunk_bytes: int = CHUNK_BYTES,
+    engine: str = 'mmap',
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Evaluate a function on a rolling window over a 'got' log file too large to load with `Got`, holding only the aggregated series in memory (see `rolling_chunks`, which takes the same arguments).
+    Returns a tuple containing 1. an array of the end-time of every window (ns), and 2. an array of the value for each window.
+    """
+
+    ends, results = [np.empty(0, dtype=np.int64)], [np.empty(0)]
+    for chunk_ends, chunk_results in rolling_chunks(
+        log_file_pth,
+        window,
+        fn,
+        rate,
+        const_stride_secs,
+        zeroed_times,
+        chunk_bytes,
+        engine,
+    ):
+        ends.append(chunk_ends)
+        results.append(np.asarray(chunk_results))
+    return np.concatenate(ends), np.concatenate(results)
 
 
 class Got:
-    def __init__(self, log_file_pth: str):
-        with open(log_file_pth) as f:
-            lines = f.readlines()
-        self._lines = lines
-        self.responses = list(map(Response.parse, lines))
+    # Increment when the columns returned by `parse_columns` change, to rebuild cached sidecars.
+    PARSER_VERSION = 3
+
+    def __init__(self, log_file_pth: str, engine: str = 'mmap', cache: bool = False):
+        """
+        Load a 'got' log file.
+        `engine` selects the parser: 'mmap' (default) memory-maps the file and parses it in bulk, falling back to 'python' if the file is not in the expected format. 'python' parses line by line with `Response.parse`.
+        `cache` loads the parsed columns from an on-disk sidecar (see `sidecar`), which is written the first time the file is parsed. `False` by default.
+        Lines appended to the file later, e.g. while an experiment is still running, are loaded by `refresh`.
+        """
+
+        if engine not in ('mmap', 'python'):
+            raise Exception(f'Got parse engine: {engine} is unimplemented')
+        self._engine = engine
+        self._tail = stream.Tail(log_file_pth)
+        # The log is held as typed columns, one entry per response, in buffers with spare capacity to append to on `refresh`.
+        # Receive times (ns).
+        self._times_buf = np.empty(0, dtype=np.int64)
+        self._success_buf = np.empty(0, dtype=np.bool_)
+        self._reason_buf = np.empty(0, dtype=np.int32)
+        self._times = self._times_buf
+        self._success = self._success_buf
+        self._reason = self._reason_buf
+        # The distinct texts following the success flag (e.g. failure reasons), indexed by the codes in `_reason`.
+        self._reasons: dict[str, int] = {'': 0}
+        self._responses: list[Response] = []
+        self._pyramids: dict[tuple[float, Any], Pyramid] = {}
+        if cache:
+            columns = sidecar.load(
+                log_file_pth,
+                f'got-{engine}',
+                Got.PARSER_VERSION,
+                lambda path: parse_columns(path, engine),
+            )
+            self._tail.offset = int(columns['offset'])
+            self._append(
+                columns['times'],
+                columns['success'],
+                columns['reason'],
+                columns['reasons'].tolist(),
+            )
+        else:
+            self._load(final=True)
+
+    def refresh(self) -> int:
+        """Load the complete (newline terminated) lines appended to the log file since it was last read. The cost is proportional to the new lines only. Returns the number of new responses."""
+
+        return self._load(final=False)
+
+    def _load(self, final: bool) -> int:
+        times, success, reason, reasons = parse_tail(self._tail, final, self._engine)
+        self._append(times, success, reason, reasons)
+        return len(times)
+
+    def _append(
+        self,
+        times: np.ndarray,
+        success: np.ndarray,
+        reason: np.ndarray,
+        reasons: list[str],
+    ) -> None:
+        # Re-code the new reasons into the reasons already seen.
+        mapping = np.array(
+            [self._reasons.setdefault(r, len(self._reasons)) for r in reasons],
+            dtype=np.int32,
+        )
+        reason = mapping[reason]
+        n, new_n = len(self._times), len(self._times) + len(times)
+        if n == 0:
+            self._times_buf, self._success_buf = times, success
+            self._reason_buf = reason
+        else:
+            if new_n > len(self._times_buf):
+                # Grow geometrically so that appending is amortised O(1) per response.
+                capacity = max(2 * len(self._times_buf), new_n)
+                self._times_buf = np.resize(self._times_buf, capacity)
+                self._success_buf = np.resize(self._success_buf, capacity)
+                self._reason_buf = np.resize(self._reason_buf, capacity)
+            self._times_buf[n:new_n] = times
+            self._success_buf[n:new_n] = success
+            self._reason_buf[n:new_n] = reason
+        self._times = self._times_buf[:new_n]
+        self._success = self._success_buf[:new_n]
+        self._reason = self._reason_buf[:new_n]
+        self._series = TimeSeries(self._times, self._success)
+        if len(times) > 0:
+            self._pyramids.clear()
 
     def __len__(self):
-        return len(self.responses)
+        return len(self._times)
+
+    @property
+    def responses(self) -> list[Response]:
+        """`Response` objects for every line of the log, only built when first requested."""
 
-    def times_ns(self, zeroed=False) -> list[int]:
-        times = list(map(lambda x: x.recv, self.responses))
-        if zeroed:
-            return utils.zero_translation(times)
-        return times
+        n = len(self._responses)
+        if n < len(self):
+            reasons = self.reasons()
+            self._responses.extend(
+                map(
+                    Response,
+                    self._times[n:].tolist(),
+                    self._success[n:].tolist(),
+                    (reasons[c] for c in self._reason[n:].tolist()),
+                )
+            )
+        return self._responses
 
-    def times_s(self, zeroed=False) -> list[float]:
-        times = utils.time_units_transform('s', self.times_ns(zeroed=False))
-        if zeroed:
-            return utils.zero_translation(times)
-        return times
+    def series(self) -> TimeSeries:
+        """The success of every response, indexed by receive time."""
+
+        return self._series
+
+    def times_ns(self, zeroed: bool = False) -> np.ndarray:
+        return self._series.times('ns', zeroed)
+
+    def times_s(self, zeroed: bool = False) -> np.ndarray:
+        return self._series.times('s', zeroed)
 
     def rolling(
         self,
         window: float,
-        fn: Callable[[list[Response]], Any],
-        rate=False,
-        const_stride_secs=-1.0,
-        zeroed_times=False,
-    ) -> tuple[list[int], list[Any]]:
+        fn: Callable[[list[Response]], Any] | str,
+        rate: bool = False,
+        const_stride_secs: float = -1.0,
+        zeroed_times: bool = False,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
         """
         Evaluate the function on a rolling window.
         `window` is measured in seconds.
+        `fn` is called with each window of `Response`s, or is the name of a built-in reducer (one of `utils.REDUCERS`) which is applied to the success mask. Built-in reducers, and functions tagged with `utils.reducer` (such as those in `rolling_funcs`), are evaluated over every window at once.
         `rate` normalises the value returned by the function by the window length (in seconds) to create a rate with units 's^(-1)'. `False` by default.
         `const_stride_secs` sets the window stride to a constant value (seconds), rather that evaluating a window at each data point (variable stride). `-1.0` by default, which uses variable stride.
         `zeroed_times` subtracts `min(times)` from all times to translate the time axis to start at `0.0`. `False` by default, which allows 'syncing' data that was captured by multiple observers.
-        Returns a tuple containing 1. a list containing the end-time of every window (ns), and 2. a list containing the values return from `fn` for each window.
+        `start_ns` and `end_ns` only evaluate the windows with an end-time in [`start_ns`, `end_ns`]. `None` by default, which evaluates every window.
+        Returns a tuple containing 1. an array of the end-time of every window (ns), and 2. an array of the values returned from `fn` for each window.
         """
         times = self.times_ns()
-        values = self.responses
+        fingerprint = None
+        values: Any
+        if utils.builtin_reducer(fn) is not None:
+            values = self.success()
+        elif hasattr(fn, 'quantile'):
+            raise Exception(
+                'Got.rolling: quantiles of responses are undefined, see rolling_gap_quantiles'
+            )
+        else:
+            values = self.responses
+            fingerprint = self.fingerprint()
 
         return utils.rolling(
-            times, values, window, fn, rate, const_stride_secs, zeroed_times
+            times,
+            values,
+            window,
+            fn,
+            rate,
+            const_stride_secs,
+            zeroed_times,
+            start_ns,
+            end_ns,
+            fingerprint,
+            self._series.sorted,
+        )
+
+    def fingerprint(self) -> Optional[str]:
+        """A digest of the contents of the loaded responses (see `memo.fingerprint`), which identifies them when memoizing rolling windows."""
+
+        return memo.fingerprint(self._times, self._success, self._reason)
+
+    def rolling_many(
+        self,
+        windows: list[float],
+        fns: list[Callable[[list[Response]], Any] | str],
+        rates: Optional[list[bool]] = None,
+        const_stride_secs: float = -1.0,
+        zeroed_times: bool = False,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+    ) -> list[list[tuple[np.ndarray, Any]]]:
+        """Evaluate every function on a rolling window of every size in `windows`, in one pass with `utils.rolling_many`. The functions are as for `rolling`, the other arguments as for `utils.rolling_many`."""
+
+        if any(hasattr(fn, 'quantile') for fn in fns):
+            raise Exception(
+                'Got.rolling_many: quantiles of responses are undefined, see rolling_gap_quantiles'
+            )
+        # The `Response`s are only built if a function is called with them.
+        values: Any
+        if all(utils.builtin_reducer(fn) is not None for fn in fns):
+            values = self.success()
+        else:
+            values = self.responses
+        return utils.rolling_many(
+            self.times_ns(),
+            values,
+            windows,
+            fns,
+            rates,
+            const_stride_secs,
+            zeroed_times,
+            start_ns,
+            end_ns,
+            self.success(),
+            self.fingerprint(),
+            self._series.sorted,
+        )
+
+    def pyramid(
+        self,
+        base_secs: float = BASE_SECS,
+        transform: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    ) -> Pyramid:
+        """A `Pyramid` of aggregates of the (transformed) success mask, to answer rolling windows with a constant stride from whole buckets. Built when first needed and kept until the next `refresh` that loads new responses."""
+
+        key = (base_secs, transform)
+        if key not in self._pyramids:
+            self._pyramids[key] = Pyramid(self._series, base_secs, transform)
+        return self._pyramids[key]
+
+    def periodicity(
+        self,
+        segment_secs: float = 60.0,
+        step_secs: Optional[float] = None,
+        bin_secs: float = spectral.BIN_SECS,
+        failures: bool = True,
+        min_period_secs: Optional[float] = None,
+        max_period_secs: Optional[float] = None,
+        peaks: int = 3,
+    ) -> spectral.Periodicity:
+        """
+        The dominant periods, and their strength, of the failures (or with `failures=False`, the successes) binned onto a grid of `bin_secs`, over segments of `segment_secs` starting every `step_secs` (see `spectral.Detector`), e.g. to find the period of a shrew attack.
+        To follow a growing log, push the responses loaded by each `refresh` to a `spectral.Detector` instead.
+        """
+
+        detector = spectral.Detector(
+            segment_secs,
+            step_secs,
+            bin_secs,
+            'sum',
+            np.logical_not if failures else None,
+            min_period_secs,
+            max_period_secs,
+            peaks,
+        )
+        times, success = self._times, self._success
+        if not self._series.sorted:
+            order = np.argsort(times, kind='stable')
+            times, success = times[order], success[order]
+        return detector.push(times, success)
+
+    def gaps(self, unit: str = 's') -> TimeSeries:
+        """The inter-arrival gap between every response and the one before it, in the given unit (see `utils.time_units_transform`), indexed by the receive time of the later response."""
+
+        times = self.times_ns()
+        return TimeSeries(times[1:], utils.time_units_transform(unit, np.diff(times)))
+
+    def rolling_gap_quantiles(
+        self,
+        window: float,
+        qs: list[float],
+        const_stride_secs: float = -1.0,
+        zeroed_times: bool = False,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        unit: str = 's',
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate quantiles (e.g. [0.5, 0.95, 0.99]) of the inter-arrival gaps (see `gaps`) ending in a rolling window, with `utils.rolling_quantiles`. The other arguments are as for `rolling`.
+        Returns a tuple containing 1. an array of the end-time of every window (ns), and 2. an array with a row for every window and a column for every quantile.
+        """
+
+        gaps = self.gaps(unit)
+        return utils.rolling_quantiles(
+            gaps.times_ns,
+            gaps.values,
+            window,
+            qs,
+            const_stride_secs,
+            zeroed_times,
+            start_ns,
+            end_ns,
         )
 
-    def success(self) -> list[bool]:
-        return list(map(lambda x: x.success, self.responses))
+    def rolling_gap_histograms(
+        self,
+        window: float,
+        bins: Any,
+        const_stride_secs: float = -1.0,
+        zeroed_times: bool = False,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        unit: str = 's',
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Count the inter-arrival gaps (see `gaps`) ending in a rolling window in each of the histogram `bins` (bin edges in `unit`), with `utils.rolling_histograms`. The other arguments are as for `rolling`. Approximate quantiles can be read off the counts with `utils.histogram_quantiles`.
+        Returns a tuple containing 1. an array of the end-time of every window (ns), and 2. an array with a row for every window and a column of counts for every bin.
+        """
+
+        gaps = self.gaps(unit)
+        return utils.rolling_histograms(
+            gaps.times_ns,
+            gaps.values,
+            window,
+            bins,
+            const_stride_secs,
+            zeroed_times,
+            start_ns,
+            end_ns,
+        )
+
+    def success(self) -> np.ndarray:
+        """A boolean mask, `True` for every successful response."""
+
+        return self._success
+
+    def reasons(self) -> list[str]:
+        """The distinct texts following the success flag, e.g. failure reasons such as 'Request FailedAfterSend with: Unix.Unix_error(Unix.ENETUNREACH, ...)'. The first is the empty text of responses without one."""
+
+        return list(self._reasons)
+
+    def reason_codes(self) -> np.ndarray:
+        """The index into `reasons` of the text following the success flag of every response."""
+
+        return self._reason
+
+    def rolling_reasons(
+        self,
+        window: float,
+        rate: bool = False,
+        const_stride_secs: float = -1.0,
+        zeroed_times: bool = False,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        top: Optional[int] = utils.TOP_CODES,
+    ) -> tuple[np.ndarray, np.ndarray, list[str]]:
+        """
+        Count the responses with each reason (see `reasons`) in a rolling window, for every reason in a single pass with `utils.rolling_counts`. Only the `top` most frequent reasons get a column, and any others are counted together in a last column 'other' (see `utils.top_codes`). The other arguments are as for `rolling`.
+        Returns a tuple containing 1. an array of the end-time of every window (ns), 2. an array with a row for every window and a column of counts (or rates) for every reason, and 3. the reason of each column.
+        """
+
+        all_reasons = self.reasons()
+        codes, kept = utils.top_codes(self._reason, len(all_reasons), top)
+        reasons = [all_reasons[i] for i in kept.tolist()]
+        if len(kept) < len(all_reasons):
+            reasons.append('other')
+        ends, counts = utils.rolling_counts(
+            self.times_ns(),
+            codes,
+            len(reasons),
+            window,
+            rate,
+            const_stride_secs,
+            zeroed_times,
+            start_ns,
+            end_ns,
+        )
+        return ends, counts, reasons
 
     def num_ok(self) -> int:
-        return self.success().count(True)
+        return int(np.count_nonzero(self._success))
 
     def num_err(self) -> int:
-        return self.success().count(False)
+        return len(self) - self.num_ok()
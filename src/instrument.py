@@ -0,0 +1,202 @@
+import atexit
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, ContextManager, Iterator, Optional
+
+# Set the 'GOT_PROFILE' environment variable to '1' (or 'memory', to also trace allocations) to record every stage of the process, and print the report on exit.
+# 'GOT_PROFILE_TRACE' additionally writes the stages on exit as folded stacks (see `Recorder.write_folded`) to the given path.
+ENV = 'GOT_PROFILE'
+TRACE_ENV = 'GOT_PROFILE_TRACE'
+
+
+@dataclass
+class Stage:
+    """The totals over every call of one stage, at one path of nested stages (e.g. ('overlay', 'log got.txt', 'roller ok', 'rolling count'))."""
+
+    path: tuple[str, ...]
+    calls: int = 0
+    wall_s: float = 0.0
+    # Excluding the nested stages.
+    self_s: float = 0.0
+    cpu_s: float = 0.0
+    samples: int = 0
+    # The largest peak of allocated memory above the start of a call, only recorded with `memory`.
+    peak_bytes: int = 0
+
+
+class _Frame:
+    __slots__ = ('stage', 'wall', 'cpu', 'current', 'peak', 'children')
+
+    def __init__(self, stage: Stage, current: int):
+        self.stage = stage
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.current = current
+        # The highest peak of the nested stages, which reset the peak.
+        self.peak = 0
+        self.children = 0.0
+
+
+class Recorder:
+    def __init__(self, memory=False):
+        """
+        Record the wall time, CPU time, samples and (with `memory`) the peak allocated memory of every stage, keyed by the path of the stages it is nested in.
+        `memory` traces allocations with `tracemalloc`, which slows Python allocations down considerably. `False` by default.
+        """
+
+        self.memory = memory
+        self.stages: dict[tuple[str, ...], Stage] = {}
+        self._stack: list[_Frame] = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[Stage]:
+        path = (self._stack[-1].stage.path if self._stack else ()) + (name,)
+        stage = self.stages.get(path)
+        if stage is None:
+            stage = self.stages[path] = Stage(path)
+        current = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+        frame = _Frame(stage, current)
+        self._stack.append(frame)
+        try:
+            yield stage
+        finally:
+            self._stack.pop()
+            wall = time.perf_counter() - frame.wall
+            stage.calls += 1
+            stage.wall_s += wall
+            stage.self_s += wall - frame.children
+            stage.cpu_s += time.process_time() - frame.cpu
+            if self._stack:
+                self._stack[-1].children += wall
+            if self.memory:
+                peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+                stage.peak_bytes = max(stage.peak_bytes, peak - frame.current)
+                if self._stack:
+                    self._stack[-1].peak = max(self._stack[-1].peak, peak)
+
+    def samples(self, n: int) -> None:
+        if self._stack:
+            self._stack[-1].stage.samples += n
+
+    def add(self, name: str, wall_s: float, samples: int = 0) -> None:
+        """Add a call of a stage nested in the current one, which was timed by the caller (e.g. the total time of a function called once per window)."""
+
+        path = (self._stack[-1].stage.path if self._stack else ()) + (name,)
+        stage = self.stages.get(path)
+        if stage is None:
+            stage = self.stages[path] = Stage(path)
+        stage.calls += 1
+        stage.wall_s += wall_s
+        stage.self_s += wall_s
+        stage.samples += samples
+        if self._stack:
+            self._stack[-1].children += wall_s
+
+    def report(self) -> list[Stage]:
+        """Every stage, with the nested stages following the stage they are nested in."""
+
+        return [self.stages[path] for path in sorted(self.stages)]
+
+    def table(self) -> str:
+        """The report as an indented table, one line per stage."""
+
+        lines = [
+            f'{"stage":<48} {"calls":>7} {"wall s":>9} {"self s":>9} {"cpu s":>9} {"samples":>11} {"peak MiB":>9}'
+        ]
+        for s in self.report():
+            name = '  ' * (len(s.path) - 1) + s.path[-1]
+            lines.append(
+                f'{name[:48]:<48} {s.calls:>7} {s.wall_s:>9.4f} {s.self_s:>9.4f} {s.cpu_s:>9.4f} {s.samples:>11} {s.peak_bytes / 2**20:>9.1f}'
+            )
+        return '\n'.join(lines)
+
+    def save(self, path: str) -> None:
+        """Write the report as JSON."""
+
+        with open(path, 'w') as f:
+            json.dump([asdict(s) for s in self.report()], f, indent=2)
+
+    def write_folded(self, path: str) -> None:
+        """Write the self time (us) of every stage as folded stacks ('overlay;log got.txt;rolling count 1234' per line), the input format of flamegraph.pl, speedscope and inferno."""
+
+        with open(path, 'w') as f:
+            for s in self.report():
+                frames = ';'.join(p.replace(';', ',') for p in s.path)
+                f.write(f'{frames} {round(s.self_s * 1_000_000)}\n')
+
+
+# The recorder of the `profile` in progress, if any. Stages are only recorded while one is active.
+_active: Optional[Recorder] = None
+_NULL = contextlib.nullcontext()
+
+
+def stage(name: str) -> ContextManager[Any]:
+    """A context manager timing a stage nested in the current one, e.g. `with instrument.stage('parse'):`. A shared no-op when no `profile` is active."""
+
+    if _active is None:
+        return _NULL
+    return _active.stage(name)
+
+
+def samples(n: int) -> None:
+    """Add `n` to the samples (e.g. lines parsed, or values rolled) of the current stage."""
+
+    if _active is not None:
+        _active.samples(n)
+
+
+def add(name: str, wall_s: float, samples: int = 0) -> None:
+    """See `Recorder.add`."""
+
+    if _active is not None:
+        _active.add(name, wall_s, samples)
+
+
+def active() -> bool:
+    return _active is not None
+
+
+@contextlib.contextmanager
+def profile(memory: bool = False) -> Iterator[Recorder]:
+    """
+    Record the stages run within the context (see `Recorder`), e.g. `with instrument.profile() as p: overlay_rolling(...)`, then `print(p.table())`.
+    Log files loaded in worker processes (see `plot_utils.load_log_files`) are recorded as a whole.
+    """
+
+    global _active
+    previous = _active
+    recorder = Recorder(memory)
+    tracing = memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    _active = recorder
+    try:
+        yield recorder
+    finally:
+        _active = previous
+        if tracing:
+            tracemalloc.stop()
+
+
+def _report_on_exit(recorder: Recorder) -> None:
+    print(recorder.table(), file=sys.stderr)
+    trace = os.environ.get(TRACE_ENV)
+    if trace:
+        recorder.write_folded(trace)
+
+
+if os.environ.get(ENV, '0') != '0':
+    _active = Recorder(memory=os.environ[ENV] == 'memory')
+    if _active.memory:
+        tracemalloc.start()
+    atexit.register(_report_on_exit, _active)
@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Any, Optional
+
+
+class LogFileType(Enum):
+    """Either a 'got' log file created by the 'getting' HTTP load generator, a 'telegraf' log file created by the telegraf system metrics pipeline, or a 'blue' log file created by the 'blue' cyber defence program."""
+
+    GOT = auto()
+    TELEGRAF = auto()
+    BLUE = auto()
+
+
+@dataclass
+class LogFile:
+    """The path to a log file, and matplotlib kwargs to be applied when plotting this data."""
+
+    log_type: LogFileType
+    path: str
+    kwargs: Optional[dict[str, Any]] = None
@@ -0,0 +1,280 @@
+import contextlib
+import hashlib
+import os
+import types
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+import numpy as np
+import sidecar
+
+# Rolling results are kept in memory up to this many bytes, evicting the least recently used beyond it.
+BUDGET_BYTES = int(os.environ.get('GOT_MEMO_BYTES', 2**28))
+# Set the 'GOT_MEMO' environment variable to '1' to memoize rolling windows, rather than always evaluating them from scratch.
+ENABLED = os.environ.get('GOT_MEMO', '0') != '0'
+# Set the 'GOT_MEMO_DISK' environment variable to '1' to also keep numeric results as sidecars (see `sidecar`), across kernel restarts.
+DISK = os.environ.get('GOT_MEMO_DISK', '0') != '0'
+
+
+class LRU:
+    def __init__(self, budget_bytes: int):
+        """A map of results, evicting the least recently used beyond `budget_bytes` (as estimated by `nbytes`)."""
+
+        self.budget_bytes = budget_bytes
+        self.bytes = 0
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: str, value: Any) -> None:
+        size = nbytes(value)
+        if size > self.budget_bytes:
+            return
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.budget_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+
+def nbytes(value: Any) -> int:
+    """An estimate of the memory held by a result: the bytes of its arrays, and 8 bytes per item of its lists."""
+
+    match value:
+        case np.ndarray():
+            return value.nbytes
+        case tuple() | list() if len(value) > 0 and isinstance(
+            value[0], (tuple, list, np.ndarray)
+        ):
+            return sum(nbytes(v) for v in value)
+        case tuple() | list():
+            return 8 * len(value)
+        case _:
+            return 8
+
+
+CACHE = LRU(BUDGET_BYTES)
+
+# The fingerprint of every array hashed so far, by `id`, until the array is garbage collected.
+_fingerprints: dict[int, tuple[weakref.ref, str]] = {}
+
+
+def _array_fingerprint(array: np.ndarray) -> str:
+    entry = _fingerprints.get(id(array))
+    if entry is not None and entry[0]() is array:
+        return entry[1]
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str((array.dtype.str, array.shape)).encode())
+    h.update(np.ascontiguousarray(array).data)
+    digest = h.hexdigest()
+    key = id(array)
+    _fingerprints[key] = (
+        weakref.ref(array, lambda _: _fingerprints.pop(key, None)),
+        digest,
+    )
+    return digest
+
+
+def fingerprint(*columns: Any) -> Optional[str]:
+    """
+    A digest of the contents of numeric (or string) columns, e.g. the times and values of a series, or `None` if any column is not an array of a fixed-size type (e.g. a list of `got.Response`s).
+    The digest of each array is computed once and remembered until it is garbage collected, so arrays must not be modified in place once fingerprinted (as with the views returned by `TimeSeries`).
+    """
+
+    parts = []
+    for column in columns:
+        if not isinstance(column, np.ndarray) or column.dtype.kind == 'O':
+            return None
+        parts.append(_array_fingerprint(column))
+    return '-'.join(parts)
+
+
+def fn_key(fn: Callable[[list[Any]], Any] | str) -> Optional[str]:
+    """
+    A stable name for a rolling function: the name of a built-in reducer, the quantile of a function tagged with `utils.quantile`, or the module, name and a digest of the code (including the names it refers to, and any nested code), defaults, `utils.reducer` transform and the current values of the globals it reads, of any other function.
+    `None` for anything that can't be identified safely, so whose results are not memoized: functions with a closure or with defaults other than plain constants, bound methods and other callable objects, and functions reading globals other than plain constants, modules, classes and such functions.
+    """
+
+    if isinstance(fn, str):
+        return fn
+    q = getattr(fn, 'quantile', None)
+    if q is not None:
+        return f'quantile({q!r})'
+    return _function_key(fn, set())
+
+
+def _function_key(fn: Any, seen: set[int]) -> Optional[str]:
+    code = getattr(fn, '__code__', None)
+    if (
+        code is None
+        or getattr(fn, '__self__', None) is not None
+        or getattr(fn, '__closure__', None) is not None
+    ):
+        return None
+    defaults = (getattr(fn, '__defaults__', None), getattr(fn, '__kwdefaults__', None))
+    if not _constant(defaults):
+        return None
+    h = hashlib.blake2b(repr(defaults).encode(), digest_size=8)
+    _hash_code(h, code)
+    seen = seen | {id(fn)}
+    # Names that are not globals are attributes or builtins.
+    for name in sorted(_names(code) & fn.__globals__.keys()):
+        value = _global_key(fn.__globals__[name], seen)
+        if value is None:
+            return None
+        h.update(f'{name}={value}'.encode())
+    spec = getattr(fn, 'reducer', None)
+    if spec is not None:
+        transform = 'None' if spec[1] is None else _global_key(spec[1], seen)
+        if transform is None:
+            return None
+        h.update(f'reducer={spec[0]}:{transform}'.encode())
+    return f'{fn.__module__}.{fn.__qualname__}:{h.hexdigest()}'
+
+
+def _global_key(value: Any, seen: set[int]) -> Optional[str]:
+    """A stable name for the value of a global read by a rolling function (or for its transform), `None` if it can't be identified safely."""
+
+    match value:
+        case types.ModuleType():
+            return value.__name__
+        case type():
+            return f'{value.__module__}.{value.__qualname__}'
+        case types.BuiltinFunctionType() | np.ufunc():
+            return f'{getattr(value, "__module__", None)}.{value.__name__}'
+        case types.FunctionType() if id(value) in seen:
+            # A recursive function, already being identified.
+            return value.__qualname__
+        case types.FunctionType():
+            return _function_key(value, seen)
+        case _ if _constant(value):
+            return repr(value)
+        case _:
+            return None
+
+
+def _constant(value: Any) -> bool:
+    """Whether `value` is made of plain constants, whose `repr` identifies it."""
+
+    match value:
+        case None | bool() | int() | float() | complex() | str() | bytes():
+            return True
+        case tuple() | list():
+            return all(_constant(v) for v in value)
+        case dict():
+            return all(_constant(k) and _constant(v) for k, v in value.items())
+        case _:
+            return False
+
+
+def _hash_code(h, code):
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            _hash_code(h, const)
+        else:
+            h.update(repr(const).encode())
+
+
+def _names(code: types.CodeType) -> set[str]:
+    """The names referred to by some code and any nested code."""
+
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            names |= _names(const)
+    return names
+
+
+def key(data: Optional[str], fn: Optional[str], *params: Any) -> Optional[str]:
+    """The key of the result of a function (see `fn_key`) over data (see `fingerprint`) with the given parameters (e.g. of the window), or `None` if either is unknown or memoization is disabled."""
+
+    if not ENABLED or data is None or fn is None:
+        return None
+    return hashlib.blake2b(
+        repr((data, fn, params)).encode(), digest_size=16
+    ).hexdigest()
+
+
+def _disk_path(k: str) -> str:
+    return os.path.join(sidecar.CACHE_DIR, f'rolling-{k}.npz')
+
+
+def _load(k: str) -> Optional[tuple[np.ndarray, np.ndarray]]:
+    path = _disk_path(k)
+    with contextlib.suppress(FileNotFoundError):
+        # Mark as recently used, for eviction with the sidecars.
+        os.utime(path)
+        with np.load(path) as npz:
+            return (npz['ends'], npz['values'])
+    return None
+
+
+def _save(k: str, result: tuple[Any, Any]) -> None:
+    values = np.asarray(result[1])
+    if values.dtype.kind not in 'biuf':
+        return
+    os.makedirs(sidecar.CACHE_DIR, exist_ok=True)
+    path = _disk_path(k)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, ends=np.asarray(result[0]), values=values)
+    os.replace(tmp, path)
+    sidecar.evict()
+
+
+def lookup(k: Optional[str]) -> Optional[Any]:
+    """The result for the key `k` (see `key`) from memory, or from disk with `DISK`, `None` if it is not known."""
+
+    if k is None:
+        return None
+    result = CACHE.get(k)
+    if result is None and DISK:
+        result = _load(k)
+        if result is not None:
+            CACHE.put(k, result)
+    return result
+
+
+def store(k: Optional[str], result: Any) -> None:
+    """Keep the result for the key `k` in memory, and on disk with `DISK`."""
+
+    if k is None:
+        return
+    CACHE.put(k, result)
+    if DISK:
+        _save(k, result)
+
+
+def cached(k: Optional[str], compute: Callable[[], Any]) -> Any:
+    """
+    The result for the key `k` (see `lookup`), or else the result of `compute`, which is then kept for next time (see `store`). A `None` key always computes.
+    Results are shared, so must not be modified. Results read back from disk hold arrays in place of lists.
+    """
+
+    result = lookup(k)
+    if result is None:
+        result = compute()
+        store(k, result)
+    return result
+
+
+def clear():
+    """Forget every result kept in memory."""
+
+    CACHE.clear()
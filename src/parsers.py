@@ -0,0 +1,126 @@
+import mmap
+import os
+import numpy as np
+
+NEWLINE = ord('\n')
+OPEN = ord('[')
+CLOSE = ord(']')
+SPACE = ord(' ')
+ZERO = ord('0')
+ONE = ord('1')
+# Receive times are ns since the Unix epoch, which stay within 19 digits until the year 2286.
+MAX_DIGITS = 19
+# 19 digit timestamps are checked against the int64 range, rather than wrapping.
+MAX_TIME = np.iinfo(np.int64).max
+
+
+class ParseError(Exception):
+    """Raised by the bulk parsers when the raw bytes are not in the expected format."""
+
+
+def got_file(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """Memory-map a 'got' log file and parse it with `got_bytes`."""
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return got_bytes(b'')
+        # The map is released when it is garbage collected, rather than closed here, so that
+        # a `ParseError` traceback still holding a view of the map does not fail to close it.
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return got_bytes(mm)
+
+
+def _lines(data: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The start and end (exclusive of the newline) of every non-blank line."""
+
+    ends = np.flatnonzero(data == NEWLINE)
+    if len(data) > 0 and data[-1] != NEWLINE:
+        ends = np.append(ends, len(data))
+    starts = np.empty_like(ends)
+    if len(ends) > 0:
+        starts[0] = 0
+        starts[1:] = ends[:-1] + 1
+    non_blank = ends > starts
+    return starts[non_blank], ends[non_blank]
+
+
+def _closes(data: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """The position of the ']' closing the timestamp of every (non-blank) line, checking that a success flag follows it."""
+
+    if not np.all(data[starts] == OPEN):
+        raise ParseError("expected every line to start with '['")
+    # The first ']' at or after the start of each line closes its timestamp.
+    closes = np.flatnonzero(data == CLOSE)
+    idx = np.searchsorted(closes, starts)
+    if idx[-1] >= len(closes):
+        raise ParseError("expected a ']' on every line")
+    close = closes[idx]
+    # The flag is preceded by a single space, so needs 2 more bytes on the same line.
+    if not np.all(close + 2 < ends):
+        raise ParseError('expected a success flag after the timestamp')
+    return close
+
+
+def got_bytes(buf: bytes | memoryview | mmap.mmap) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parse the raw bytes of a 'got' log in bulk.
+    Every line has the form `[<recv time ns>] <0|1>` followed by optional free text (e.g. `: Request FailedAfterSend with: ...`), which is ignored. Blank lines are skipped.
+    Returns a tuple containing 1. the receive times (ns) as an int64 array, and 2. the success flags as a bool array.
+    Raises a `ParseError` if any line does not match the format.
+    """
+
+    data = np.frombuffer(buf, dtype=np.uint8)
+    starts, ends = _lines(data)
+    if len(starts) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.bool_)
+    close = _closes(data, starts, ends)
+    widths = close - starts - 1
+    if widths.min() < 1 or widths.max() > MAX_DIGITS:
+        raise ParseError('unexpected timestamp width')
+
+    # Accumulate the timestamps one digit column at a time across all lines.
+    times = np.zeros(len(starts), dtype=np.int64)
+    for k in range(widths.max()):
+        active = k < widths
+        digits = data[np.where(active, starts + 1 + k, starts)].astype(np.int64) - ZERO
+        if np.any(active & ((digits < 0) | (digits > 9))):
+            raise ParseError('expected a decimal timestamp')
+        if k == MAX_DIGITS - 1:
+            high, low = divmod(MAX_TIME, 10)
+            if np.any(active & ((times > high) | ((times == high) & (digits > low)))):
+                raise ParseError('timestamp out of range')
+        times = np.where(active, times * 10 + digits, times)
+
+    if not np.all(data[close + 1] == SPACE):
+        raise ParseError("expected a space after ']'")
+    flags = data[close + 2]
+    if not np.all((flags == ZERO) | (flags == ONE)):
+        raise ParseError('expected a success flag of 0 or 1')
+    return times, flags == ONE
+
+
+def got_reasons(buf: bytes | memoryview) -> tuple[np.ndarray, list[str]]:
+    """
+    Parse the free text following the success flag of every line of a 'got' log in bulk, e.g. the failure reason 'Request FailedAfterSend with: ...', without the ' : ' separator. Blank lines are skipped, as in `got_bytes`.
+    Only the lines with text are decoded, so the cost beyond finding the lines is proportional to the number of failures.
+    Returns a tuple containing 1. the int32 index of every line's text into 2. the distinct texts in order of first appearance, where index 0 is the empty text.
+    Raises a `ParseError` if any line does not match the format.
+    """
+
+    data = np.frombuffer(buf, dtype=np.uint8)
+    starts, ends = _lines(data)
+    codes = np.zeros(len(starts), dtype=np.int32)
+    reasons = {'': 0}
+    if len(starts) == 0:
+        return codes, list(reasons)
+    text = _closes(data, starts, ends) + 3
+    for i in np.flatnonzero(text < ends).tolist():
+        reason = reason_text(data[text[i] : ends[i]].tobytes().decode())
+        codes[i] = reasons.setdefault(reason, len(reasons))
+    return codes, list(reasons)
+
+
+def reason_text(info: str) -> str:
+    """The text following the success flag of a 'got' line, without the ' : ' separator or surrounding whitespace."""
+
+    return info.strip().removeprefix(':').strip()
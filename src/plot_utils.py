@@ -1,38 +1,46 @@
-from typing import Callable, Any, Optional
+from typing import Callable, Any, Iterable, Optional
+from concurrent.futures import ProcessPoolExecutor
+import os
 import matplotlib.pyplot as plt
-from got import Got, Response
-from blue import Blue
-from eyes import Eyes, Cpu, Mem, Disk, Nginx, Netflow
+from got import Got
+from blue import Action, Blue
+from telegraf import Telegraf
+from timeseries import TimeSeries
 from dataclasses import dataclass, replace
+import decimation
+import instrument
+import numpy as np
 import utils
-from enum import Enum, auto
+from logfiles import LogFile, LogFileType
 
-
-class LogFileType(Enum):
-    """Either a 'got' log file created by the 'getting' HTTP load generator, a 'telegraf' log file created by the telegraf system metrics pipeline, or a 'blue' log file created by the 'blue' cyber defence program."""
-
-    GOT = auto()
-    TELEGRAF = auto()
-    BLUE = auto()
+# By default, log files are only loaded in a process pool when together they are at least this large. Below it, starting the pool and sending the loaded columns back costs more than loading the files one after another.
+POOL_BYTES = 64 * 2**20
 
 
 @dataclass
-class LogFile:
-    """The path to a log file, and matplotlib kwargs to be applied when plotting this data."""
+class Roller:
+    """A function callable on a window of data (list[Any]), or the name of a built-in reducer in `utils.REDUCERS`, with associated meta-data. kwargs are passed on to matplotlib when plotting a rolling window with this Roller. `decimate` overrides the decimation method (one of `decimation.METHODS`) of the overlay."""
 
-    log_type: LogFileType
-    path: str
+    name: str
+    fn: Callable[[list[Any]], Any] | str
+    rate: bool = False
     kwargs: Optional[dict[str, Any]] = None
+    decimate: Optional[str] = None
 
 
 @dataclass
-class Roller:
-    """A function callable on a window of data (list[Any]), with associated meta-data. kwargs are passed on to matplotlib when plotting a rolling window with this Roller."""
+class Overlay:
+    """The arguments to one `overlay_rolling` call, for plotting many overlays at once with `overlay_rolling_many`."""
 
-    name: str
-    fn: Callable[[list[Any]], Any]
-    rate: bool = False
-    kwargs: Optional[dict[str, Any]] = None
+    ax: Any
+    log_files: dict
+    rollers: list[Roller]
+    window_secs: float
+    zeroed_times: bool = False
+    const_stride_secs: float = -1.0
+    times_units: str = 's'
+    time_range: Optional[tuple[float, float]] = None
+    decimate: Optional[str] = None
 
 
 @dataclass
@@ -42,7 +50,7 @@ class Fig:
     y: str
 
 
-def fig(figs: list[Fig], subplots: Optional[tuple[int, int]] = None):
+def fig(figs: list[Fig], subplots: Optional[tuple[int, int]] = None) -> Any:
     """Convenience function to create an anotated matplotlib figure with one or many subplots."""
 
     if subplots is not None:
@@ -63,73 +71,311 @@ def fig(figs: list[Fig], subplots: Optional[tuple[int, int]] = None):
         return fig, axes[0]
 
 
+def load_log_file(
+    log_type: LogFileType,
+    path: str | Got | Telegraf | Blue,
+    streams: Optional[dict[str, list[str]]] = None,
+) -> Any:
+    """Load a log file of the given type, through the on-disk sidecar cache. An already loaded log is returned as is. `streams` projects a 'telegraf' log onto the streams and fields to load (see `Telegraf`)."""
+
+    if not isinstance(path, str):
+        return path
+    with instrument.stage(f'load {os.path.basename(path)}'):
+        match log_type:
+            case LogFileType.GOT:
+                return Got(path, cache=True)
+            case LogFileType.TELEGRAF:
+                return Telegraf(path, cache=True, streams=streams)
+            case LogFileType.BLUE:
+                return Blue(path, cache=True)
+            case u:
+                raise Exception(f'LogFileType: {u} is unimplemented')
+
+
+def telegraf_projection(spec: dict[str, list[Any]]) -> dict[str, list[str]]:
+    """The streams and fields used by a `plot_telegraf_rollers` 'telegraf' spec, including the fields named by any 'use_time' specifiers."""
+
+    streams: dict[str, list[str]] = {}
+    for stream_id, stream in spec.items():
+        fields = streams.setdefault(stream_id, [])
+        for field in stream:
+            if isinstance(field, str):
+                fields.append(field)
+            else:
+                fields.append(list(field.keys())[0])
+                kw = list(field.values())[0]
+                if 'use_time' in kw:
+                    fields.append(kw['use_time'])
+    return {k: sorted(set(v)) for k, v in streams.items()}
+
+
+def load_log_files(
+    log_files: Iterable[LogFile], processes: Optional[int] = None
+) -> dict[tuple[LogFileType, str], Got | Telegraf | Blue]:
+    """
+    Load every distinct log file once, possibly in parallel across a process pool. 'telegraf' log files are projected onto the union of the streams and fields plotted from them.
+    `processes` limits the size of the pool (`1` loads the files in this process). By default the files are loaded in this process unless together they are at least `POOL_BYTES`, then with one process per distinct file up to the number of CPUs.
+    Returns the loaded logs keyed by `log_key`.
+    """
+
+    distinct: dict[tuple[LogFileType, str], LogFile] = {}
+    projections: dict[tuple[LogFileType, str], dict[str, list[str]]] = {}
+    for lf in log_files:
+        key = log_key(lf)
+        distinct.setdefault(key, lf)
+        if lf.log_type == LogFileType.TELEGRAF and lf.kwargs is not None:
+            projection = projections.setdefault(key, {})
+            for stream_id, fields in telegraf_projection(lf.kwargs['telegraf']).items():
+                projection[stream_id] = sorted(
+                    set(projection.get(stream_id, [])) | set(fields)
+                )
+    types = [lf.log_type for lf in distinct.values()]
+    paths = [lf.path for lf in distinct.values()]
+    if processes is None:
+        large = sum(os.path.getsize(p) for p in paths) >= POOL_BYTES
+        processes = min(len(distinct), os.cpu_count() or 1) if large else 1
+    streams = [projections.get(key) for key in distinct]
+    if processes <= 1 or len(distinct) <= 1:
+        loaded = list(map(load_log_file, types, paths, streams))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            loaded = list(pool.map(load_log_file, types, paths, streams))
+    return dict(zip(distinct.keys(), loaded))
+
+
+def log_key(lf: LogFile) -> tuple[LogFileType, str]:
+    """Identifies the data loaded from a log file, so that log files sharing a path are only loaded once."""
+
+    return (lf.log_type, os.path.realpath(lf.path))
+
+
+def range_ns(
+    time_range: Optional[tuple[float, float]], times_units: str
+) -> tuple[Optional[int], Optional[int]]:
+    """A (start, end) time range in `times_units` in nano-seconds, as expected by `rolling`."""
+
+    if time_range is None:
+        return None, None
+    start, end = time_range
+    return utils.to_ns(times_units, start), utils.to_ns(times_units, end)
+
+
+def plot_line(
+    ax: Any, x: Any, y: Any, decimate: Optional[str] = None, **kwargs: Any
+) -> Any:
+    """Plot a line with `ax.plot`, first reducing it to a number of points proportional to the width of the axes in pixels with the `decimate` method (one of `decimation.METHODS`, or `None` to plot every point)."""
+
+    if decimate is not None:
+        with instrument.stage('decimate'):
+            width = max(1, int(ax.get_window_extent().width))
+            x, y = decimation.decimate(x, y, decimate, width)
+    with instrument.stage(f'plot {kwargs.get("label", "")}'.rstrip()):
+        instrument.samples(len(x))
+        return ax.plot(x, y, **kwargs)
+
+
+def check_count(roller: Roller) -> None:
+    """Rollers grouped by value (e.g. by failure reason) count the values in each group, so must use the 'count' reducer."""
+
+    if roller.fn != 'count':
+        raise Exception(
+            f"Roller: {roller.name} must use the 'count' reducer to be grouped by value"
+        )
+
+
+def plot_counts(
+    ax: Any,
+    times: Any,
+    counts: np.ndarray,
+    labels: list[str],
+    decimate: Optional[str] = None,
+    **kwargs: Any,
+) -> None:
+    """Plot a line for each column of counts (e.g. from `utils.rolling_counts`) that is non-zero in some window."""
+
+    for j in np.flatnonzero(counts.any(axis=0)):
+        plot_line(ax, times, counts[:, j], decimate, label=labels[j], **kwargs)
+
+
+def rolling_rollers(
+    source: Got | TimeSeries,
+    rollers: list[Roller],
+    windows: list[float],
+    const_stride_secs: float = -1.0,
+    zeroed_times: bool = False,
+    start_ns: Optional[int] = None,
+    end_ns: Optional[int] = None,
+) -> list[list[tuple[Any, Any]]]:
+    """Evaluate every Roller on a rolling window of every size in `windows` (seconds) over one series, or over the responses of a 'got' log, in a single pass (see `utils.rolling_many`), e.g. to sweep the window size used for smoothing. Returns the (end-times, values) for every Roller and window size, indexed as `[roller][window]`."""
+
+    fns = [r.fn for r in rollers]
+    rates = [r.rate for r in rollers]
+    args = (windows, fns, rates, const_stride_secs, zeroed_times, start_ns, end_ns)
+    if isinstance(source, Got):
+        return source.rolling_many(*args)
+    return utils.rolling_many(
+        source.times_ns, source.values, *args, sorted=source.sorted
+    )
+
+
 def plot_got_rollers(
-    ax,
-    path: str,
+    ax: Any,
+    path: str | Got,
     rollers: list[Roller],
     window_secs: float,
-    zeroed_times=False,
-    const_stride_secs=-1.0,
-    times_units='s',
-    **kwargs,
-):
-    got = Got(path)
-    for roller in rollers:
-        times, y = got.rolling(
-            rate=roller.rate,
-            window=window_secs,
-            fn=roller.fn,
-            zeroed_times=zeroed_times,
-            const_stride_secs=const_stride_secs,
-        )
+    zeroed_times: bool = False,
+    const_stride_secs: float = -1.0,
+    times_units: str = 's',
+    time_range: Optional[tuple[float, float]] = None,
+    decimate: Optional[str] = None,
+    **kwargs: Any,
+) -> None:
+    got = load_log_file(LogFileType.GOT, path)
+    start_ns, end_ns = range_ns(time_range, times_units)
+    # an optional 'gaps' specifier evaluates the rollers over the inter-arrival gaps (s) between responses, e.g. with `rolling_funcs.p95`
+    gaps = got.gaps() if kwargs.pop('gaps', False) else None
+    # an optional 'reasons' specifier plots a line per failure reason, counting the responses with that reason
+    by_reason = kwargs.pop('reasons', False)
+    # an optional 'pyramid' specifier answers built-in reducers with a constant stride from the aggregates of `got.pyramid`, or exactly when the window or stride cut through its buckets
+    use_pyramid = kwargs.pop('pyramid', False) and const_stride_secs > 0.0
+    pyramid = [
+        use_pyramid and gaps is None and utils.builtin_reducer(r.fn) is not None
+        for r in rollers
+    ]
+    # every other roller is evaluated in a single pass over the responses (or gaps)
+    fused = [i for i in range(len(rollers)) if not (by_reason or pyramid[i])]
+    rolled = rolling_rollers(
+        got if gaps is None else gaps,
+        [rollers[i] for i in fused],
+        [window_secs],
+        const_stride_secs,
+        zeroed_times,
+        start_ns,
+        end_ns,
+    )
+    fused_rolled = {i: r[0] for i, r in zip(fused, rolled)}
+    for i, roller in enumerate(rollers):
+        if by_reason:
+            check_count(roller)
+            times, counts, reasons = got.rolling_reasons(
+                window_secs,
+                roller.rate,
+                const_stride_secs,
+                zeroed_times,
+                start_ns,
+                end_ns,
+            )
+            # the first reason is the empty text of successful responses
+            plot_counts(
+                ax,
+                utils.time_units_transform(times_units, times),
+                counts[:, 1:],
+                [f'{roller.name} {r}' for r in reasons[1:]],
+                roller.decimate or decimate,
+                **{**kwargs, **(roller.kwargs or {})},
+            )
+            continue
+        spec = utils.builtin_reducer(roller.fn) if pyramid[i] else None
+        if spec is not None:
+            times, y = got.pyramid(transform=spec[1]).rolling(
+                window_secs,
+                roller.fn,
+                roller.rate,
+                const_stride_secs,
+                zeroed_times,
+                start_ns,
+                end_ns,
+            )
+        else:
+            times, y = fused_rolled[i]
         times = utils.time_units_transform(times_units, times)
         if roller.kwargs is not None:
             merged = {**kwargs, **roller.kwargs}
         else:
             merged = kwargs
-        ax.plot(times, y, label=roller.name, **merged)
+        plot_line(
+            ax, times, y, roller.decimate or decimate, label=roller.name, **merged
+        )
 
 
 def plot_telegraf_rollers(
-    ax,
-    path: str,
+    ax: Any,
+    path: str | Telegraf,
     rollers: list[Roller],
     window_secs: float,
-    zeroed_times=False,
-    const_stride_secs=-1.0,
-    times_units='s',
-    **kwargs,
-):
+    zeroed_times: bool = False,
+    const_stride_secs: float = -1.0,
+    times_units: str = 's',
+    time_range: Optional[tuple[float, float]] = None,
+    decimate: Optional[str] = None,
+    **kwargs: Any,
+) -> None:
     # telegraf will be dict[str, list[str | dict[str,Any]]]
     streams = kwargs.pop('telegraf')
-    with open(path, 'r') as f:
-        eyes = Eyes(f.readlines())
+    telegraf = load_log_file(LogFileType.TELEGRAF, path, telegraf_projection(streams))
+    start_ns, end_ns = range_ns(time_range, times_units)
     for stream_id, stream in streams.items():
         # a stream_id is e.g. 'cpu', and the stream is a list of fields, e.g ['usage_system', {'usage_user': plotting_kw}]
         for field in stream:
             kw = {}
             if not isinstance(field, str):
-                kw = list(field.values())[0]
+                kw = dict(list(field.values())[0])
                 field = list(field.keys())[0]
-            # telegraf timestamps are in seconds, convert to nano-seconds as expected by `rolling`
-            times = list(map(lambda x: int(1e9 * x.timestamp), eyes[stream_id]))
+            # an optional 'tags' specifier selects the records of one set of tags, e.g. {'path': '/'} for a 'disk' field
+            tags = kw.pop('tags', None)
             # for netflow data, use the `flow_start_ms` field instead of the logging timestamp
+            timing_key = None
             if stream_id == 'netflow':
                 # expect a 'use_time' specifier
                 timing_key = kw.pop('use_time')
-                times = list(map(lambda x: int(1e6 * x[timing_key]), eyes[stream_id]))
-            values = list(map(lambda x: x[field], eyes[stream_id]))
-            # apply rolling window
-            for roller in rollers:
-                window_end_times, rolling_vals = utils.rolling(
-                    times,
-                    values,
-                    window=window_secs,
-                    fn=roller.fn,
-                    rate=roller.rate,
-                    const_stride_secs=const_stride_secs,
-                    zeroed_times=zeroed_times,
+            # an optional 'by_value' specifier plots a line per value of a string field, e.g. packets per 'src' IP
+            if kw.pop('by_value', False):
+                for roller in rollers:
+                    check_count(roller)
+                    window_end_times, counts, values = telegraf.rolling_counts(
+                        stream_id,
+                        field,
+                        window_secs,
+                        roller.rate,
+                        const_stride_secs,
+                        zeroed_times,
+                        tags,
+                        timing_key,
+                        start_ns,
+                        end_ns,
+                    )
+                    plot_counts(
+                        ax,
+                        utils.time_units_transform(times_units, window_end_times),
+                        counts,
+                        [f'{roller.name} {stream_id} {field}={v}' for v in values],
+                        roller.decimate or decimate,
+                        **{**kwargs, **(roller.kwargs or {}), **kw},
+                    )
+                continue
+            # an optional 'counter' specifier plots the per-second rate of a counter field (e.g. nginx 'requests'), True or {'max_gap_secs': ...}
+            counter = kw.pop('counter', None)
+            if counter:
+                series = telegraf.counter_rate(
+                    stream_id,
+                    field,
+                    tags,
+                    None if counter is True else counter.get('max_gap_secs'),
                 )
+            else:
+                # telegraf timestamps are converted to nano-seconds as expected by `rolling`
+                series = telegraf.series(stream_id, field, tags, timing_key)
+            # apply every rolling window in a single pass
+            rolled = rolling_rollers(
+                series,
+                rollers,
+                [window_secs],
+                const_stride_secs,
+                zeroed_times,
+                start_ns,
+                end_ns,
+            )
+            for roller, [(window_end_times, rolling_vals)] in zip(rollers, rolled):
                 window_end_times = utils.time_units_transform(
                     times_units, window_end_times
                 )
@@ -138,43 +384,64 @@ def plot_telegraf_rollers(
                     merged = {**merged, **roller.kwargs}
                 if len(kw.items()) > 0:
                     merged = {**merged, **kw}
-                ax.plot(
+                plot_line(
+                    ax,
                     window_end_times,
                     rolling_vals,
+                    roller.decimate or decimate,
                     label=f'{roller.name} {stream_id} {field}',
                     **merged,
                 )
 
 
 def plot_blue_rollers(
-    ax,
-    path: str,
+    ax: Any,
+    path: str | Blue,
     rollers: list[Roller],
     window_secs: float,
-    zeroed_times=False,
-    const_stride_secs=-1.0,
-    times_units='s',
-    **kwargs,
-):
-    blue = Blue(path)
-    if 'states' in kwargs:
-        times, states = tuple(map(list, zip(*blue.states)))
-        for feature in kwargs.pop('states'):
+    zeroed_times: bool = False,
+    const_stride_secs: float = -1.0,
+    times_units: str = 's',
+    time_range: Optional[tuple[float, float]] = None,
+    decimate: Optional[str] = None,
+    **kwargs: Any,
+) -> None:
+    blue = load_log_file(LogFileType.BLUE, path)
+    start_ns, end_ns = range_ns(time_range, times_units)
+    # an optional 'actions' specifier marks every action, e.g. True for every action, or ['ToggleGreen', {'ToggleRed': {'color': 'r'}}]
+    actions = kwargs.pop('actions', None)
+    states = kwargs.pop('states', None)
+    if states is None and not actions:
+        raise Exception("Blue: expected a 'states' or 'actions' specifier")
+    if actions:
+        plot_actions(
+            ax,
+            blue,
+            [a.name for a in Action] if actions is True else actions,
+            zeroed_times,
+            const_stride_secs,
+            times_units,
+            start_ns,
+            end_ns,
+            **kwargs,
+        )
+    if states is not None:
+        for feature in states:
             kw = {}
             if not isinstance(feature, str):
-                kw = list(feature.values())[0]
+                kw = dict(list(feature.values())[0])
                 feature = list(feature.keys())[0]
-            values = list(map(lambda x: x[feature], states))
-            for roller in rollers:
-                window_end_times, rolling_vals = utils.rolling(
-                    times,
-                    values,
-                    window=window_secs,
-                    fn=roller.fn,
-                    rate=roller.rate,
-                    const_stride_secs=const_stride_secs,
-                    zeroed_times=zeroed_times,
-                )
+            series = blue.series(feature)
+            rolled = rolling_rollers(
+                series,
+                rollers,
+                [window_secs],
+                const_stride_secs,
+                zeroed_times,
+                start_ns,
+                end_ns,
+            )
+            for roller, [(window_end_times, rolling_vals)] in zip(rollers, rolled):
                 window_end_times = utils.time_units_transform(
                     times_units, window_end_times
                 )
@@ -183,78 +450,145 @@ def plot_blue_rollers(
                     merged = {**merged, **roller.kwargs}
                 if len(kw.items()) > 0:
                     merged = {**merged, **kw}
-                ax.plot(
+                plot_line(
+                    ax,
                     window_end_times,
                     rolling_vals,
+                    roller.decimate or decimate,
                     label=f'{roller.name} {feature}',
                     **merged,
                 )
-    else:
-        raise Exception('todo: support plotting actions')
+
+
+def plot_actions(
+    ax: Any,
+    blue: Blue,
+    actions: list[str | dict[str, dict[str, Any]]],
+    zeroed_times: bool = False,
+    const_stride_secs: float = -1.0,
+    times_units: str = 's',
+    start_ns: Optional[int] = None,
+    end_ns: Optional[int] = None,
+    **kwargs: Any,
+) -> None:
+    """Mark the time of every action of a 'blue' log along the bottom of the axes, one row of markers per kind of action (e.g. 'ToggleGreen'), each optionally with its own plotting kwargs. `zeroed_times` translates the times as for the rolling windows over the states of the same log."""
+
+    times = blue.action_times()
+    codes = blue.action_codes()
+    lo = 0 if start_ns is None else np.searchsorted(times, start_ns, 'left')
+    hi = len(times) if end_ns is None else np.searchsorted(times, end_ns, 'right')
+    times, codes = times[lo:hi], codes[lo:hi]
+    if zeroed_times:
+        origin = blue.state_times() if len(blue.state_times()) > 0 else times
+        if len(origin) > 0:
+            times = times - utils.window_origin(origin, const_stride_secs)
+    times = utils.time_units_transform(times_units, times)
+    for row, action in enumerate(actions):
+        kw = {}
+        if not isinstance(action, str):
+            kw = dict(list(action.values())[0])
+            action = list(action.keys())[0]
+        selected = times[codes == Action[action].value]
+        plot_kwargs = {
+            'linestyle': 'none',
+            'marker': '|',
+            'markersize': 10,
+            **kwargs,
+            **kw,
+        }
+        # rows are placed in axes coordinates, so they stay in view on any y scale
+        ax.plot(
+            selected,
+            np.full(len(selected), 0.03 + 0.04 * row),
+            transform=ax.get_xaxis_transform(),
+            label=action,
+            **plot_kwargs,
+        )
 
 
 def overlay_rolling(
-    ax,
+    ax: Any,
     log_files: dict,
     rollers: list[Roller],
     window_secs: float,
-    zeroed_times=False,
-    const_stride_secs=-1.0,
-    times_units='s',
-):
-    """Plot a set of rolling window data series onto an existing axis by specifying the log files containing the data, and the Roller functions to evaulate over each window."""
-
-    for id, lf in log_files.items():
-        _rollers = [replace(roller, name=f'{id}: {roller.name}') for roller in rollers]
-        kwargs = {}
-        if lf.kwargs is not None:
-            kwargs = lf.kwargs
-
-        match lf.log_type:
-            case LogFileType.GOT:
-                plot_got_rollers(
-                    ax,
-                    lf.path,
-                    _rollers,
-                    window_secs,
-                    zeroed_times,
-                    const_stride_secs,
-                    times_units,
-                    **kwargs,
-                )
-            case LogFileType.TELEGRAF:
-                plot_telegraf_rollers(
-                    ax,
-                    lf.path,
-                    _rollers,
-                    window_secs,
-                    zeroed_times,
-                    const_stride_secs,
-                    times_units,
-                    **kwargs,
-                )
-            case LogFileType.BLUE:
-                plot_blue_rollers(
-                    ax,
-                    lf.path,
+    zeroed_times: bool = False,
+    const_stride_secs: float = -1.0,
+    times_units: str = 's',
+    time_range: Optional[tuple[float, float]] = None,
+    decimate: Optional[str] = None,
+    processes: Optional[int] = None,
+) -> None:
+    """Plot a set of rolling window data series onto an existing axis by specifying the log files containing the data, and the Roller functions to evaulate over each window. Each distinct log file is loaded once, in parallel when they are large (see `load_log_files`). `time_range` (in `times_units`) only plots the windows ending within the range, e.g. to zoom into an attack within a long log. `decimate` reduces every line to a number of points proportional to the width of the axes before plotting, keeping its peaks and troughs (one of `decimation.METHODS`, see `plot_line`), unless overridden per Roller. `None` by default, which plots every window."""
+
+    overlay_rolling_many(
+        [
+            Overlay(
+                ax,
+                log_files,
+                rollers,
+                window_secs,
+                zeroed_times,
+                const_stride_secs,
+                times_units,
+                time_range,
+                decimate,
+            )
+        ],
+        processes,
+    )
+
+
+def overlay_rolling_many(
+    overlays: list[Overlay], processes: Optional[int] = None
+) -> None:
+    """Plot many overlays (see `overlay_rolling`), possibly onto different axes. Each distinct log file across all of the overlays is loaded once, in parallel when they are large (see `load_log_files`), and shared by every overlay and roller that uses it."""
+
+    with instrument.stage('load'):
+        loaded = load_log_files(
+            [lf for o in overlays for lf in o.log_files.values()], processes
+        )
+    for o in overlays:
+        for id, lf in o.log_files.items():
+            _rollers = [
+                replace(roller, name=f'{id}: {roller.name}') for roller in o.rollers
+            ]
+            kwargs = {}
+            if lf.kwargs is not None:
+                kwargs = lf.kwargs
+            log = loaded[log_key(lf)]
+
+            match lf.log_type:
+                case LogFileType.GOT:
+                    plot_fn: Callable[..., None] = plot_got_rollers
+                case LogFileType.TELEGRAF:
+                    plot_fn = plot_telegraf_rollers
+                case LogFileType.BLUE:
+                    plot_fn = plot_blue_rollers
+                case u:
+                    raise Exception(f'LogFileType: {u} is unimplemented')
+            with instrument.stage(f'log {id}'):
+                plot_fn(
+                    o.ax,
+                    log,
                     _rollers,
-                    window_secs,
-                    zeroed_times,
-                    const_stride_secs,
-                    times_units,
+                    o.window_secs,
+                    o.zeroed_times,
+                    o.const_stride_secs,
+                    o.times_units,
+                    o.time_range,
+                    o.decimate,
                     **kwargs,
                 )
-            case u:
-                raise Exception(f'LogFileType: {u} is unimplemented')
 
 
-def show_combined_legends(axes: list[Any], **kwargs):
+def show_combined_legends(axes: list[Any], **kwargs: Any) -> None:
     lines = []
-    [lines.extend(ax.get_lines()) for ax in axes]
+    for ax in axes:
+        lines.extend(ax.get_lines())
     axes[0].legend(handles=lines, **kwargs)
 
 
-def add_y_axes(parent_ax: Any, new_axes: list[tuple[str, str]]):
+def add_y_axes(parent_ax: Any, new_axes: list[tuple[str, str]]) -> list[Any]:
     """Add one or many extra y axes to an existing matplotlib Axes object, specifying a color for the new axis. An extended wrapper for matplotlib.Axes.twinx().
 
     Parameters
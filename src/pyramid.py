@@ -0,0 +1,318 @@
+import math
+from typing import Any, Callable, Optional
+import numpy as np
+from timeseries import TimeSeries
+import utils
+
+# Width of the finest buckets (s). A power of two fraction of a second, so that the coarser levels line up with strides such as 0.5 s, 1 s or 2 s.
+BASE_SECS = 2**-7
+# Reducers answered by a `Pyramid`, in addition to `utils.REDUCERS`.
+EXTREMES = ('min', 'max')
+
+
+class Level:
+    """The count, sum, number of non-zero values, minimum and maximum of the values in each occupied bucket of one level of a `Pyramid`. `keys` are the (sorted) indices of the occupied buckets, so a sparse series costs memory in proportion to its values rather than its time span."""
+
+    def __init__(self, keys, count, total, nonzero, lo, hi):
+        self.keys = keys
+        self.count = count
+        self.total = total
+        self.nonzero = nonzero
+        self.min = lo
+        self.max = hi
+        self._prefix: dict[str, np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.count)
+
+    @property
+    def buckets(self) -> int:
+        """The number of buckets spanned by this level, occupied or not."""
+
+        return int(self.keys[-1]) + 1 if len(self.keys) > 0 else 0
+
+    def coarser(self) -> 'Level':
+        """The level with buckets twice as wide, each combining a pair of buckets of this level."""
+
+        parents = self.keys // 2
+        starts = np.flatnonzero(np.diff(parents, prepend=-1))
+        if len(starts) == len(self.keys):
+            # No two occupied buckets share a parent, so the columns are shared rather than copied.
+            return Level(
+                parents, self.count, self.total, self.nonzero, self.min, self.max
+            )
+        return Level(
+            parents[starts],
+            np.add.reduceat(self.count, starts),
+            np.add.reduceat(self.total, starts),
+            np.add.reduceat(self.nonzero, starts),
+            np.minimum.reduceat(self.min, starts),
+            np.maximum.reduceat(self.max, starts),
+        )
+
+    def position(self, buckets: np.ndarray) -> np.ndarray:
+        """The number of occupied buckets before each of the `buckets`, i.e. their index into the prefix sums."""
+
+        return np.searchsorted(self.keys, buckets, side='left')
+
+    def at(self, name: str, buckets: np.ndarray, fill: float) -> np.ndarray:
+        """The 'min' or 'max' column at each of the `buckets`, with `fill` for the empty ones."""
+
+        column = getattr(self, name)
+        if len(column) == 0:
+            return np.full(len(buckets), fill)
+        idx = np.minimum(self.position(buckets), len(column) - 1)
+        return np.where(self.keys[idx] == buckets, column[idx], fill)
+
+    def prefix(self, name: str) -> np.ndarray:
+        """Prefix sums of the 'count', 'total' or 'nonzero' column, computed when first needed."""
+
+        if name not in self._prefix:
+            column = getattr(self, name)
+            prefix = np.zeros(len(column) + 1, dtype=column.dtype)
+            np.cumsum(column, out=prefix[1:])
+            self._prefix[name] = prefix
+        return self._prefix[name]
+
+
+class Pyramid:
+    def __init__(
+        self,
+        series: TimeSeries,
+        base_secs: float = BASE_SECS,
+        transform: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    ):
+        """
+        Bin a series into buckets of `base_secs` once, then build a power-of-two pyramid of coarser levels (each bucket combining two of the level below), so that rolling windows with a constant stride and zoomed plots can be answered from aggregates rather than the raw values.
+        Only occupied buckets are stored, so the memory grows with the number of values rather than with the time span they cover.
+        `series` must be sorted, with numeric (or boolean) values. `transform` is applied to the values first, e.g. `np.logical_not` to count failures from a success mask (see `utils.reducer`).
+        """
+
+        if not series.sorted:
+            raise Exception('Pyramid: the series must be sorted by time')
+        values = np.asarray(series.values)
+        if transform is not None:
+            values = transform(values)
+        values = values.astype(np.float64)
+        self.transform = transform
+        # The transformed values are kept to answer exactly the windows that do not line up with the buckets.
+        self._times = series.times_ns
+        self._values = values
+        self.base_ns = int(round(base_secs * 1_000_000_000))
+        self.origin = series.origin if len(series) > 0 else 0
+        self.last = series.max if len(series) > 0 else 0
+        times = series.times_ns
+        buckets = (times - self.origin) // self.base_ns
+        # The first value of each occupied bucket, to reduce the sorted values bucket by bucket.
+        starts = np.flatnonzero(np.diff(buckets, prepend=-1))
+        if len(starts) > 0:
+            columns = (
+                np.add.reduceat(np.ones(len(values), dtype=np.int64), starts),
+                np.add.reduceat(values, starts),
+                np.add.reduceat((values != 0).astype(np.int64), starts),
+                np.minimum.reduceat(values, starts),
+                np.maximum.reduceat(values, starts),
+            )
+        else:
+            columns = (
+                np.zeros(0, dtype=np.int64),
+                np.zeros(0),
+                np.zeros(0, dtype=np.int64),
+                np.zeros(0),
+                np.zeros(0),
+            )
+        self.levels = [Level(buckets[starts], *columns)]
+        while len(self.levels[-1]) > 1:
+            self.levels.append(self.levels[-1].coarser())
+
+    def bucket_ns(self, level: int) -> int:
+        return self.base_ns << level
+
+    def aligned(self, window: float, const_stride_secs: float) -> bool:
+        """Whether the `window` and the stride are both whole numbers of base buckets."""
+
+        window_ns = math.floor(window * 1_000_000_000)
+        stride_ns = int(round(const_stride_secs * 1_000_000_000))
+        return window_ns % self.base_ns == 0 and stride_ns % self.base_ns == 0
+
+    def level_for(self, window: float, const_stride_secs: float) -> int:
+        """The coarsest level whose buckets evenly divide both the `window` and the stride, or the finest level if none do."""
+
+        window_ns = math.floor(window * 1_000_000_000)
+        stride_ns = int(round(const_stride_secs * 1_000_000_000))
+        level = 0
+        for k in range(1, len(self.levels)):
+            bucket = self.bucket_ns(k)
+            if window_ns % bucket != 0 or stride_ns % bucket != 0:
+                break
+            level = k
+        return level
+
+    def rolling(
+        self,
+        window: float,
+        fn: Callable[[list[Any]], Any] | str,
+        rate: bool = False,
+        const_stride_secs: float = 1.0,
+        zeroed_times: bool = False,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate a reducer on a rolling window with a constant stride, from the coarsest level of the pyramid that lines up with the window and stride (see `level_for`). The cost is proportional to the number of windows (times the logarithm of the occupied buckets), not to the number of values.
+        `fn` is one of `utils.REDUCERS` or `EXTREMES`, or a function tagged with `utils.reducer` whose transform is the transform of the pyramid. The other arguments are as for `utils.rolling`, on the same grid of window end-times.
+        Each window is answered from the whole buckets it covers, so only values falling exactly on a window's end-time are counted differently from `utils.rolling`. A window or stride that is not a multiple of the base bucket width (see `aligned`) would cut through buckets, so such windows are evaluated exactly from the values with `utils.rolling` instead.
+        Returns a tuple containing 1. an array of the end-time of every window (ns), and 2. an array of the reduced value for each window.
+        """
+
+        if const_stride_secs <= 0.0:
+            raise Exception('Pyramid: rolling requires a constant stride')
+        if isinstance(fn, str) and fn in EXTREMES:
+            name = fn
+        else:
+            spec = utils.builtin_reducer(fn)
+            if spec is None or spec[1] is not self.transform:
+                raise Exception(f'Pyramid: {fn} is not answered by this pyramid')
+            name = spec[0]
+
+        if not self.aligned(window, const_stride_secs):
+            return self._exact(
+                window, name, rate, const_stride_secs, zeroed_times, start_ns, end_ns
+            )
+
+        # The grid of end-times only depends on the first and last times.
+        span = np.array([self.origin, self.last], dtype=np.int64)
+        ends = utils.window_edges(span, window, const_stride_secs, start_ns, end_ns)[0]
+
+        k = self.level_for(window, const_stride_secs)
+        level, bucket = self.levels[k], self.bucket_ns(k)
+        win_ns = math.floor(window * 1_000_000_000)
+        # The whole buckets inside each window.
+        lead = np.clip((ends - self.origin) // bucket, 0, level.buckets)
+        trail = np.clip(-((self.origin - ends + win_ns) // bucket), 0, level.buckets)
+        trail = np.minimum(trail, lead)
+        first, last = level.position(trail), level.position(lead)
+
+        def windowed(column: str) -> np.ndarray:
+            prefix = level.prefix(column)
+            return prefix[last] - prefix[first]
+
+        counts = windowed('count')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            match name:
+                case 'count':
+                    result = counts.astype(np.float64)
+                case 'rate':
+                    result = counts / window
+                case 'sum':
+                    result = windowed('total')
+                case 'mean':
+                    result = windowed('total') / counts
+                case 'proportion':
+                    result = windowed('nonzero') / counts
+                case 'min' | 'max':
+                    result = self._extreme(k, trail, lead, name)
+                case u:
+                    raise Exception(f'reducer: {u} is unimplemented')
+        if rate:
+            result = result / window
+
+        if zeroed_times and len(ends) > 0:
+            ends = ends - utils.window_origin(span, const_stride_secs)
+        return (ends, result)
+
+    def _exact(
+        self,
+        window: float,
+        name: str,
+        rate: bool,
+        const_stride_secs: float,
+        zeroed_times: bool,
+        start_ns: Optional[int],
+        end_ns: Optional[int],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Evaluate the reducer `name` over the transformed values with `utils.rolling`, for windows that do not line up with the buckets."""
+
+        if len(self._times) == 0:
+            return (np.empty(0, dtype=np.int64), np.empty(0))
+        fn: Callable[[list[Any]], Any] | str = name
+        if name in EXTREMES:
+            fn = _min if name == 'min' else _max
+        ends, result = utils.rolling(
+            self._times,
+            self._values,
+            window,
+            fn,
+            rate,
+            const_stride_secs,
+            zeroed_times,
+            start_ns,
+            end_ns,
+            sorted=True,
+        )
+        return (np.asarray(ends, dtype=np.int64), np.asarray(result, dtype=np.float64))
+
+    def _extreme(
+        self, k: int, trail: np.ndarray, lead: np.ndarray, name: str
+    ) -> np.ndarray:
+        """The minimum or maximum over the buckets [trail, lead) of level `k`, combining O(log n) aligned buckets from the coarser levels for every window at once (`nan` for empty windows)."""
+
+        reduce = np.minimum if name == 'min' else np.maximum
+        result = np.full(len(trail), np.inf if name == 'min' else -np.inf)
+        lo, hi = trail.copy(), lead.copy()
+        fill = np.inf if name == 'min' else -np.inf
+        for level in self.levels[k:]:
+            take = (lo < hi) & (lo % 2 == 1)
+            result[take] = reduce(result[take], level.at(name, lo[take], fill))
+            lo[take] += 1
+            take = (lo < hi) & (hi % 2 == 1)
+            hi[take] -= 1
+            result[take] = reduce(result[take], level.at(name, hi[take], fill))
+            lo, hi = lo // 2, hi // 2
+        result[np.isinf(result)] = np.nan
+        return result
+
+    def envelope(
+        self,
+        points: int,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Summarise [`start_ns`, `end_ns`] (the whole series by default) with the finest level giving at most `points` buckets, e.g. to draw a zoomed plot whose cost depends on its width in pixels rather than on the number of values.
+        Returns the start-time (ns), 'count', 'mean', 'min' and 'max' of every bucket in the range (`nan` for empty buckets).
+        """
+
+        start_ns = self.origin if start_ns is None else max(start_ns, self.origin)
+        end_ns = self.last if end_ns is None else min(end_ns, self.last)
+        span = max(end_ns - start_ns, 1)
+        k = 0
+        while k + 1 < len(self.levels) and span / self.bucket_ns(k) > points:
+            k += 1
+        level, bucket = self.levels[k], self.bucket_ns(k)
+        lo = max((start_ns - self.origin) // bucket, 0)
+        hi = max(min((end_ns - self.origin) // bucket + 1, level.buckets), lo)
+        # Scatter the occupied buckets in the range onto every bucket in the range.
+        first, last = level.position(np.array([lo, hi]))
+        occupied = level.keys[first:last] - lo
+        count = np.zeros(hi - lo, dtype=np.int64)
+        count[occupied] = level.count[first:last]
+        mean, lows, highs = (np.full(hi - lo, np.nan) for _ in range(3))
+        mean[occupied] = level.total[first:last] / level.count[first:last]
+        lows[occupied] = level.min[first:last]
+        highs[occupied] = level.max[first:last]
+        return {
+            'times': self.origin + np.arange(lo, hi, dtype=np.int64) * bucket,
+            'count': count,
+            'mean': mean,
+            'min': lows,
+            'max': highs,
+        }
+
+
+def _min(values: list[Any]) -> Any:
+    return float(np.min(values)) if len(values) > 0 else np.nan
+
+
+def _max(values: list[Any]) -> Any:
+    return float(np.max(values)) if len(values) > 0 else np.nan
@@ -0,0 +1,219 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
+import matplotlib
+import numpy as np
+
+# Render without a display, before pyplot is imported (by `plot_utils`).
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt  # noqa: E402
+import plot_utils  # noqa: E402
+from plot_utils import Fig, LogFile, LogFileType, Overlay, Roller  # noqa: E402
+import rolling_funcs  # noqa: E402
+import sidecar  # noqa: E402
+import utils  # noqa: E402
+
+# Increment when the rendering of a spec changes, to re-render every cached figure.
+RENDER_VERSION = 1
+# Rendered figures are cached in this directory, named by the digest of their spec and inputs (see `figure_key`).
+FIGURES_DIR = sidecar.FIGURES_DIR
+
+
+def roller(spec: dict) -> Roller:
+    """
+    A `Roller` from its spec, e.g. {"name": "OK rate", "fn": "count_ok", "rate": true, "kwargs": {"linestyle": "--"}}.
+    `fn` is the name of a built-in reducer (one of `utils.REDUCERS`) or of a function in `rolling_funcs`.
+    """
+
+    name = spec['fn']
+    if name in utils.REDUCERS:
+        fn = name
+    elif callable(getattr(rolling_funcs, name, None)):
+        fn = getattr(rolling_funcs, name)
+    else:
+        raise Exception(
+            f'Roller: {name} is not a reducer or a function in rolling_funcs'
+        )
+    return Roller(
+        spec['name'],
+        fn,
+        spec.get('rate', False),
+        spec.get('kwargs'),
+        spec.get('decimate'),
+    )
+
+
+def log_file(spec: dict, directory: str) -> LogFile:
+    """A `LogFile` from its spec, e.g. {"type": "got", "path": "logs/kleene/x.txt", "kwargs": {"color": "g"}}, with a `path` relative to `directory`."""
+
+    return LogFile(
+        LogFileType[spec['type'].upper()],
+        os.path.join(directory, spec['path']),
+        spec.get('kwargs'),
+    )
+
+
+def input_paths(figure: dict, directory: str) -> list[str]:
+    """The log files plotted by a figure spec."""
+
+    return sorted(
+        {
+            log_file(lf, directory).path
+            for overlay in figure['overlays']
+            for lf in overlay['log_files'].values()
+        }
+    )
+
+
+def figure_key(figure: dict, directory: str) -> str:
+    """The digest of a figure spec, the path, size and mtime of every log file it plots, and the source of every `rolling_funcs` function it plots, which names its cached outputs."""
+
+    inputs = []
+    for path in input_paths(figure, directory):
+        stat = os.stat(path)
+        inputs.append((os.path.realpath(path), stat.st_size, stat.st_mtime_ns))
+    fns = [roller(r).fn for overlay in figure['overlays'] for r in overlay['rollers']]
+    sources = sorted({inspect.getsource(fn) for fn in fns if callable(fn)})
+    content = json.dumps([RENDER_VERSION, figure, inputs, sources], sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()[:32]
+
+
+def draw(figure: dict, directory: str) -> Any:
+    """
+    Draw a figure spec onto a new matplotlib figure, returning it.
+    A spec has the keys:
+    'figs': the `Fig` (title, x, y) of each subplot.
+    'subplots': the (rows, columns) of subplots. A single subplot by default.
+    'size': the (width, height) in inches. (15, 8) by default, as `plot_utils.fig`.
+    'y_axes': extra y axes added with `plot_utils.add_y_axes`, each {"parent": <axes index>, "label": ..., "color": ...}, numbered after the subplots.
+    'overlays': the arguments of each `plot_utils.overlay_rolling`, with 'ax' the index of the axes to plot onto (0 by default), 'log_files' a dict of log file specs (see `log_file`) and 'rollers' a list of roller specs (see `roller`).
+    'legend': kwargs of `plot_utils.show_combined_legends` over every axes, if present.
+    """
+
+    figs = [Fig(f['title'], f['x'], f['y']) for f in figure['figs']]
+    subplots = figure.get('subplots')
+    fig, axes = plot_utils.fig(figs, None if subplots is None else tuple(subplots))
+    axes = list(np.ravel(axes))
+    if 'size' in figure:
+        fig.set_size_inches(*figure['size'])
+    for extra in figure.get('y_axes', []):
+        axes.extend(
+            plot_utils.add_y_axes(
+                axes[extra.get('parent', 0)], [(extra['label'], extra['color'])]
+            )
+        )
+    plot_utils.overlay_rolling_many(
+        [
+            Overlay(
+                axes[o.get('ax', 0)],
+                {k: log_file(lf, directory) for k, lf in o['log_files'].items()},
+                [roller(r) for r in o['rollers']],
+                o['window_secs'],
+                o.get('zeroed_times', False),
+                o.get('const_stride_secs', -1.0),
+                o.get('times_units', 's'),
+                None if o.get('time_range') is None else tuple(o['time_range']),
+                o.get('decimate'),
+            )
+            for o in figure['overlays']
+        ],
+        # Figures are already rendered in parallel.
+        processes=1,
+    )
+    if 'legend' in figure:
+        plot_utils.show_combined_legends(axes, **figure['legend'])
+    return fig
+
+
+def render(figure: dict, directory: str, key: str) -> list[str]:
+    """Render a figure spec to every format of its 'outputs' in the cache. Returns the paths of the cached outputs."""
+
+    fig = draw(figure, directory)
+    os.makedirs(FIGURES_DIR, exist_ok=True)
+    cached = []
+    try:
+        for output in figure['outputs']:
+            path = cached_path(key, output)
+            tmp = f'{path}.{os.getpid()}.tmp{os.path.splitext(output)[1]}'
+            fig.savefig(tmp, bbox_inches='tight')
+            os.replace(tmp, path)
+            cached.append(path)
+    finally:
+        plt.close(fig)
+    return cached
+
+
+def cached_path(key: str, output: str) -> str:
+    return os.path.join(FIGURES_DIR, key + os.path.splitext(output)[1])
+
+
+def build(
+    spec_paths: list[str], processes: Optional[int] = None, force: bool = False
+) -> dict[str, bool]:
+    """
+    Render every figure of the spec files (JSON, {"figures": [...]}, see `draw`) whose spec or input log files have changed since it was last rendered, in one pass across a process pool, and copy the outputs (e.g. PNG, PDF) into place.
+    The 'outputs' of a figure, and the paths of its log files, are relative to its spec file.
+    `force` re-renders every figure. `processes` limits the size of the pool, by default one process per figure up to the number of CPUs.
+    Returns whether each output was rendered (rather than found in the cache), keyed by its path.
+    """
+
+    jobs = []
+    for spec_path in spec_paths:
+        directory = os.path.dirname(os.path.abspath(spec_path))
+        with open(spec_path) as f:
+            for figure in json.load(f)['figures']:
+                jobs.append((figure, directory, figure_key(figure, directory)))
+    stale = [
+        job
+        for job in jobs
+        if force
+        or not all(os.path.exists(cached_path(job[2], o)) for o in job[0]['outputs'])
+    ]
+    if processes is None:
+        processes = min(len(stale), os.cpu_count() or 1)
+    if stale:
+        if processes <= 1 or len(stale) == 1:
+            list(map(render, *zip(*stale)))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                list(pool.map(render, *zip(*stale)))
+
+    fresh = {key for _, _, key in stale}
+    rendered = {}
+    for figure, directory, key in jobs:
+        for output in figure['outputs']:
+            path = os.path.join(directory, output)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if key not in fresh:
+                # Mark as recently used, for eviction with the sidecars.
+                os.utime(cached_path(key, output))
+            shutil.copyfile(cached_path(key, output), path)
+            rendered[path] = key in fresh
+    sidecar.evict()
+    return rendered
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description='Render the figures of spec files headlessly, re-rendering only those whose spec or log files changed.'
+    )
+    parser.add_argument('specs', nargs='+', help='figure spec files (JSON)')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='re-render every figure')
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    rendered = build(args.specs, args.processes, args.force)
+    for path, fresh in rendered.items():
+        print(f'{"rendered" if fresh else "cached":<9} {path}')
+    print(f'{len(rendered)} outputs in {time.perf_counter() - start:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,43 +1,71 @@
 from got import Response
-from typing import Any
+from typing import Any, Callable
+import numpy as np
+import utils
 
 KLEENE_IP = '169.254.80.236'
 HILBERT_IP = ''
 MAC_IP = ''
 
 
+# Each function is tagged with the built-in reducer it is equivalent to, applied to the numeric column of the window (the success mask for a `Got` log), so that `utils.rolling` can evaluate it over every window at once.
+
+
+@utils.reducer('sum', np.logical_not)
 def count_err(window: list[Response]) -> float:
     count = list(map(lambda x: x.success, window)).count(False)
     return float(count)
 
 
+@utils.reducer('sum')
 def count_ok(window: list[Response]) -> float:
     count = list(map(lambda x: x.success, window)).count(True)
     return float(count)
 
 
+@utils.reducer('proportion')
 def proportion_ok(window: list[Response]) -> float:
     count = list(map(lambda x: x.success, window)).count(True)
     return float(count) / float(len(window))
 
 
+@utils.reducer('mean')
 def mean(window: list[Any]) -> float:
     return sum(window) / len(window)
 
 
+@utils.reducer('sum', lambda ips: ips == KLEENE_IP)
 def count_kleene_packets(window: list[Any]) -> int:
     return list(map(lambda x: x == KLEENE_IP, window)).count(True)
 
 
+@utils.reducer('sum', lambda ips: ips == HILBERT_IP)
 def count_hilbert_packets(window: list[Any]) -> int:
     return list(map(lambda x: x == HILBERT_IP, window)).count(True)
 
 
+@utils.reducer('sum', lambda ips: ips == MAC_IP)
 def count_mac_packets(window: list[Any]) -> int:
     return list(map(lambda x: x == MAC_IP, window)).count(True)
 
 
-def time_units_transform(unit: str, times_ns: list[int]):
+def quantile(q: float) -> Callable[[list[Any]], float]:
+    """A window function computing the `q`-quantile of the window (e.g. of the gaps between responses, see `Got.gaps`)."""
+
+    @utils.quantile(q)
+    def fn(window: list[Any]) -> float:
+        return float(np.quantile(window, q)) if len(window) > 0 else float('nan')
+
+    fn.__name__ = f'p{q * 100:g}'
+    return fn
+
+
+p50 = quantile(0.5)
+p95 = quantile(0.95)
+p99 = quantile(0.99)
+
+
+def time_units_transform(unit: str, times_ns: list[int]) -> list[float]:
     match unit:
         case 's':
             return list(map(lambda x: x / 1_000_000_000, times_ns))
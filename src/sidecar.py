@@ -0,0 +1,103 @@
+import contextlib
+import hashlib
+import os
+from typing import Any, Callable
+import numpy as np
+import instrument
+
+# Parsed log files are cached as columnar '.npz' sidecars in this directory.
+CACHE_DIR = os.environ.get(
+    'GOT_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'got')
+)
+# Rendered figures are cached in this subdirectory (see `render`), and evicted along with the sidecars.
+FIGURES_DIR = os.path.join(CACHE_DIR, 'figures')
+# Disk budget for all sidecars (bytes). The least recently used sidecars are evicted beyond it.
+BUDGET_BYTES = int(os.environ.get('GOT_CACHE_BYTES', 2**30))
+# Set the 'GOT_CACHE' environment variable to '0' to always parse from scratch.
+ENABLED = os.environ.get('GOT_CACHE', '1') != '0'
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256('\0'.join(map(str, parts)).encode()).hexdigest()[:32]
+
+
+def sidecar_path(path: str, kind: str, version: int) -> str:
+    """The path of the sidecar for the current contents of a log file, keyed on the file's path, size and mtime, and the parser's kind and version."""
+
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    name = _digest(path, kind)
+    contents = _digest(stat.st_size, stat.st_mtime_ns, version)
+    return os.path.join(CACHE_DIR, f'{name}-{contents}.npz')
+
+
+def load(
+    path: str, kind: str, version: int, parse: Callable[[str], dict[str, np.ndarray]]
+) -> dict[str, np.ndarray]:
+    """
+    Load the columns parsed from a log file from its sidecar, or parse the log file with `parse` and write the sidecar for next time.
+    `kind` names the parser (e.g. 'got'), and `version` must be incremented whenever the parser's output changes, so that stale sidecars are rebuilt.
+    """
+
+    if not ENABLED:
+        return parse(path)
+    sidecar = sidecar_path(path, kind, version)
+    with contextlib.suppress(FileNotFoundError):
+        # Mark as recently used, for eviction.
+        os.utime(sidecar)
+        with instrument.stage('sidecar'), np.load(sidecar) as npz:
+            return dict(npz)
+
+    columns: dict[str, Any] = parse(path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Sidecars for previous contents of the same log file are stale, but not those being written by other processes.
+    prefix = os.path.basename(sidecar).split('-')[0]
+    for entry in os.scandir(CACHE_DIR):
+        if entry.name.startswith(prefix + '-') and not entry.name.endswith('.tmp'):
+            _remove(entry.path)
+    tmp = f'{sidecar}.{os.getpid()}.tmp'
+    with instrument.stage('sidecar write'):
+        with open(tmp, 'wb') as f:
+            np.savez(f, **columns)
+        # If another process removed the sidecar being written, it is only written next time.
+        with contextlib.suppress(FileNotFoundError):
+            os.replace(tmp, sidecar)
+        evict()
+    return columns
+
+
+def evict(budget_bytes: int = BUDGET_BYTES) -> None:
+    """Remove the least recently used sidecars and rendered figures until they fit within the disk budget."""
+
+    entries = []
+    for directory in (CACHE_DIR, FIGURES_DIR):
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            # Only sidecars at the top level (not e.g. the catalog), and no files still being written.
+            if directory == CACHE_DIR:
+                cached = entry.name.endswith('.npz')
+            else:
+                cached = '.tmp' not in entry.name
+            if cached:
+                # Files may be removed concurrently, by other processes writing to the cache.
+                with contextlib.suppress(FileNotFoundError):
+                    entries.append((entry.path, entry.stat()))
+    entries.sort(key=lambda e: e[1].st_mtime_ns)
+    total = sum(stat.st_size for _, stat in entries)
+    for path, stat in entries:
+        if total <= budget_bytes:
+            break
+        total -= stat.st_size
+        _remove(path)
+
+
+def _remove(path: str) -> None:
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def clear():
+    """Remove every sidecar and rendered figure."""
+
+    evict(budget_bytes=0)
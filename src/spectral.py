@@ -0,0 +1,271 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+import numpy as np
+import instrument
+from timeseries import TimeSeries
+
+# Width of the bins of the grid (s).
+BIN_SECS = 0.001
+# Segments are transformed in batches of at most this many (zero-padded) bins, bounding the memory of the FFTs.
+CHUNK_BINS = 2**22
+# Autocorrelation peaks within this fraction of the highest are taken to be multiples of one period.
+HARMONIC_TOLERANCE = 0.1
+# How samples are binned, see `Detector`.
+BINNINGS = ('count', 'sum', 'hold')
+
+
+@dataclass
+class Periodicity:
+    """The periodicity of every segment of a series, see `Detector`."""
+
+    # The end-time of each segment (ns).
+    times: np.ndarray
+    # The dominant periods (s) of each segment, at the highest peaks of its power spectrum, strongest first (`nan` where there are fewer peaks).
+    periods: np.ndarray
+    # The fraction of the power of each segment (about its mean) at each of its `periods`.
+    power: np.ndarray
+    # The period (s) at which each segment best matches itself, at the highest peak of its autocorrelation (`nan` if none).
+    period: np.ndarray
+    # The autocorrelation at `period`, near 1 for a strictly periodic segment and near 0 for noise.
+    strength: np.ndarray
+
+    def __len__(self):
+        return len(self.times)
+
+    @staticmethod
+    def concat(parts: list['Periodicity'], peaks: int) -> 'Periodicity':
+        if len(parts) == 0:
+            return Periodicity(
+                np.empty(0, dtype=np.int64),
+                np.empty((0, peaks)),
+                np.empty((0, peaks)),
+                np.empty(0),
+                np.empty(0),
+            )
+        return Periodicity(
+            *(np.concatenate([getattr(p, f) for p in parts]) for f in FIELDS)
+        )
+
+
+FIELDS = ('times', 'periods', 'power', 'period', 'strength')
+
+
+class Detector:
+    def __init__(
+        self,
+        segment_secs: float = 60.0,
+        step_secs: Optional[float] = None,
+        bin_secs: float = BIN_SECS,
+        binning: str = 'count',
+        transform: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        min_period_secs: Optional[float] = None,
+        max_period_secs: Optional[float] = None,
+        peaks: int = 3,
+    ):
+        """
+        Detect periodic patterns, e.g. the bursts of a low-rate (shrew) attack, incrementally as samples are pushed in time order, like a short-time spectrogram.
+        Samples are binned onto a grid of `bin_secs` from the first sample, and the power spectrum and autocorrelation of every segment of `segment_secs` (starting every `step_secs`, half a segment by default) come from one zero-padded FFT of its bins.
+        `binning` is 'count' (the samples in each bin, e.g. responses), 'sum' (of the values in each bin, e.g. failures with `transform=np.logical_not` on a success mask), or 'hold' (the mean of each bin, holding the previous value through empty bins, for gauges sampled less often than `bin_secs`, e.g. telegraf fields). `transform` is applied to the values first.
+        Periods between `min_period_secs` (4 bins by default) and `max_period_secs` (half a segment by default) are reported, the `peaks` strongest of each segment.
+        Only the bins of the segments still to be evaluated are kept between pushes.
+        """
+
+        if binning not in BINNINGS:
+            raise Exception(f'Detector: {binning} is not one of {BINNINGS}')
+        if step_secs is None:
+            step_secs = segment_secs / 2
+        self.bin_secs = bin_secs
+        self.binning = binning
+        self.transform = transform
+        self.peaks = peaks
+        self._bin_ns = int(round(bin_secs * 1_000_000_000))
+        self._segment = int(round(segment_secs / bin_secs))
+        self._step = int(round(step_secs / bin_secs))
+        if self._segment < 8 or self._step < 1:
+            raise Exception('Detector: a segment must span at least 8 bins')
+        min_lag = (
+            4 if min_period_secs is None else math.ceil(min_period_secs / bin_secs)
+        )
+        max_lag = (
+            self._segment // 2
+            if max_period_secs is None
+            else math.floor(max_period_secs / bin_secs)
+        )
+        # Lags (bins) of the autocorrelation searched for peaks, with a neighbour on either side.
+        self._lags = (max(min_lag, 1), min(max_lag, self._segment - 2))
+        if self._lags[0] > self._lags[1]:
+            raise Exception('Detector: no periods between the minimum and maximum')
+        # The segments are zero-padded to twice their length, so the autocorrelation is not circular.
+        self._nfft = 2 * self._segment
+        freqs = np.fft.rfftfreq(self._nfft, bin_secs)
+        self._freqs = freqs
+        self._band = (
+            max(int(np.searchsorted(freqs, 1 / (self._lags[1] * bin_secs))), 1),
+            min(
+                int(np.searchsorted(freqs, 1 / (self._lags[0] * bin_secs), 'right'))
+                - 1,
+                len(freqs) - 2,
+            ),
+        )
+        self._origin: Optional[int] = None
+        # The grid index of the first retained bin, and of the start of the next segment.
+        self._first = 0
+        self._next = 0
+        self._sums = np.zeros(0)
+        self._counts = np.zeros(0)
+        # With 'hold', the value held into the first retained bin.
+        self._held = 0.0
+
+    def push(self, times: Any, values: Any = None) -> Periodicity:
+        """
+        Add new samples (no earlier than any pushed before) and evaluate every segment completed by them, i.e. ending no later than the latest sample. `values` are not needed with 'count'.
+        Returns the `Periodicity` of the new segments.
+        """
+
+        times = np.asarray(times, dtype=np.int64)
+        if len(times) == 0:
+            return Periodicity.concat([], self.peaks)
+        with instrument.stage('periodicity'):
+            instrument.samples(len(times))
+            if self._origin is None:
+                self._origin = int(times[0])
+            origin = self._origin
+            bins = (times - origin) // self._bin_ns - self._first
+            if bins.min() < 0:
+                raise Exception('Detector: samples must be pushed in time order')
+            latest = int(bins.max())
+            self._grow(latest + 1)
+            if self.binning != 'count':
+                values = np.asarray(values)
+                if self.transform is not None:
+                    values = self.transform(values)
+                self._sums += np.bincount(
+                    bins, values.astype(np.float64), len(self._sums)
+                )
+            counts = np.bincount(bins, minlength=len(self._counts))
+            self._counts += counts
+            if self.binning == 'count':
+                self._sums += counts
+
+            # The segments ending by the bin of the latest sample.
+            latest += self._first
+            start = self._next * self._step
+            if latest < start + self._segment:
+                return Periodicity.concat([], self.peaks)
+            n = (latest - start - self._segment) // self._step + 1
+            signal = self._signal(start + (n - 1) * self._step + self._segment)
+            segments = np.lib.stride_tricks.sliding_window_view(signal, self._segment)[
+                :: self._step
+            ][:n]
+            batch = max(CHUNK_BINS // self._nfft, 1)
+            parts = [
+                self._analyse(segments[i : i + batch], self._next + i, origin)
+                for i in range(0, n, batch)
+            ]
+            self._next += n
+            self._drop(self._next * self._step)
+        return Periodicity.concat(parts, self.peaks)
+
+    def _grow(self, n: int) -> None:
+        if n > len(self._sums):
+            extra = n - len(self._sums)
+            self._sums = np.concatenate((self._sums, np.zeros(extra)))
+            self._counts = np.concatenate((self._counts, np.zeros(extra)))
+
+    def _signal(self, end: int) -> np.ndarray:
+        """The binned values from the start of the next segment up to the grid index `end`."""
+
+        lo, hi = self._next * self._step - self._first, end - self._first
+        if self.binning != 'hold':
+            return self._sums[lo:hi]
+        # Hold the last value through empty bins, from the value held into the first retained bin.
+        sums, counts = self._sums[:hi], self._counts[:hi]
+        filled = counts > 0
+        held = np.where(filled, np.arange(hi), -1)
+        np.maximum.accumulate(held, out=held)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+        return np.where(held >= 0, means[np.maximum(held, 0)], self._held)[lo:]
+
+    def _drop(self, first: int) -> None:
+        """Forget the bins before the grid index `first`."""
+
+        drop = first - self._first
+        if self.binning == 'hold':
+            filled = np.flatnonzero(self._counts[:drop])
+            if len(filled) > 0:
+                last = filled[-1]
+                self._held = self._sums[last] / self._counts[last]
+        self._sums = self._sums[drop:]
+        self._counts = self._counts[drop:]
+        self._first = first
+
+    def _analyse(self, segments: np.ndarray, index: int, origin: int) -> Periodicity:
+        """The `Periodicity` of consecutive segments (rows of bins), the first being the segment `index` of the grid starting at `origin` (ns)."""
+
+        segments = segments - segments.mean(axis=1, keepdims=True)
+        spectrum = np.fft.rfft(segments, self._nfft, axis=1)
+        power = spectrum.real**2 + spectrum.imag**2
+        # The (biased) autocorrelation is the inverse transform of the power spectrum.
+        acf = np.fft.irfft(power, self._nfft, axis=1)[:, : self._segment]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            acf /= acf[:, :1]
+            total = power[:, 1:].sum(axis=1, keepdims=True)
+
+            lo, hi = self._band
+            band = _local_maxima(power[:, lo - 1 : hi + 2], 0.0)
+            top = np.argsort(-band, axis=1, kind='stable')[:, : self.peaks]
+            peak = np.take_along_axis(band, top, axis=1)
+            periods = np.where(peak > 0, 1 / self._freqs[lo + top], np.nan)
+            fractions = np.where(peak > 0, peak / total, np.nan)
+            if periods.shape[1] < self.peaks:
+                pad = ((0, 0), (0, self.peaks - periods.shape[1]))
+                periods = np.pad(periods, pad, constant_values=np.nan)
+                fractions = np.pad(fractions, pad, constant_values=np.nan)
+
+            lo, hi = self._lags
+            lags = _local_maxima(acf[:, lo - 1 : hi + 2], -np.inf)
+            # The autocorrelation falls to 0 between the lobes around lag 0 and each multiple of the period, and noise makes small peaks within every lobe.
+            below = acf[:, lo : hi + 1] <= 0
+            offsets = np.arange(hi - lo + 1)
+            # So only search beyond the lobe around lag 0.
+            crossing = np.where(
+                below.any(axis=1), np.argmax(below, axis=1), len(offsets)
+            )
+            if lo > 1:
+                crossing[(acf[:, 1:lo] <= 0).any(axis=1)] = 0
+            lags[offsets < crossing[:, None]] = -np.inf
+            highest = lags.max(axis=1, keepdims=True)
+            # Multiples of the period correlate almost as well, so take the lobe of the shortest lag nearly as high as the highest, and the highest peak in that lobe.
+            first = np.argmax(
+                lags >= highest - HARMONIC_TOLERANCE * np.abs(highest), axis=1
+            )
+            after = below & (offsets >= first[:, None])
+            end = np.where(after.any(axis=1), np.argmax(after, axis=1), len(offsets))
+            lobe = (offsets >= first[:, None]) & (offsets < end[:, None])
+            best = np.argmax(np.where(lobe, lags, -np.inf), axis=1)
+            strength = lags[np.arange(len(lags)), best]
+            found = np.isfinite(strength)
+            period = np.where(found, (lo + best) * self.bin_secs, np.nan)
+            strength = np.where(found, strength, np.nan)
+
+        ends = np.arange(index, index + len(segments), dtype=np.int64)
+        times = (origin + (ends * self._step + self._segment) * self._bin_ns).astype(
+            np.int64
+        )
+        return Periodicity(times, periods, fractions, period, strength)
+
+
+def _local_maxima(rows: np.ndarray, fill: float) -> np.ndarray:
+    """The columns of `rows` but the first and last, with `fill` in place of any that is not a peak (greater than the previous column, and no less than the next)."""
+
+    mid = rows[:, 1:-1]
+    peak = (mid > rows[:, :-2]) & (mid >= rows[:, 2:]) & np.isfinite(mid)
+    return np.where(peak, mid, fill)
+
+
+def periodicity(series: TimeSeries, **kwargs: Any) -> Periodicity:
+    """The `Periodicity` of every complete segment of a sorted series, e.g. `Telegraf.series(...)` with `binning='hold'`. Takes the arguments of `Detector`."""
+
+    return Detector(**kwargs).push(series.times_ns, series.values)
@@ -0,0 +1,153 @@
+import mmap
+import os
+import math
+from typing import Any, Callable, Optional
+import numpy as np
+import utils
+
+NEWLINE = ord('\n')
+
+
+class Tail:
+    """Follow a (growing) log file from a byte offset, returning only the complete lines appended since the last read."""
+
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        # Byte offset of the first line not yet read.
+        self.offset = offset
+
+    def read(self, final: bool = False) -> memoryview:
+        """
+        Read the complete lines (terminated by a newline) appended to the file since the last read, and advance the offset past them.
+        A trailing line without a newline is assumed to still be being written, and is returned by a later read once it is complete. With `final` the file is assumed to be complete (e.g. a one-shot load of a finished log), so a trailing line without a newline is returned too.
+        If an earlier `final` read returned a line without a newline that has since been continued, the rest of that line is skipped.
+        """
+
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < self.offset:
+                raise Exception(f'log file: {self.path} was truncated')
+            if size == self.offset:
+                return memoryview(b'')
+            # Mapping the whole file is cheap, only the pages after the offset are touched.
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start = self.offset
+        if start > 0 and mm[start - 1] != NEWLINE:
+            start = mm.find(b'\n', start) + 1
+            if start == 0:
+                if not final:
+                    return memoryview(b'')
+                start = size
+        end = size if final else mm.rfind(b'\n', start) + 1
+        if end <= start:
+            self.offset = max(self.offset, start)
+            return memoryview(b'')
+        self.offset = end
+        return memoryview(mm)[start:end]
+
+    def unfinished(self, buf: memoryview) -> Optional[memoryview]:
+        """
+        After a `final` read returning `buf` failed to parse, assume its trailing line without a newline is still being written after all: move the offset back to the start of that line, so it is returned by a later read once it is complete, and return the complete lines of `buf`.
+        `None` if `buf` ends with a newline, so the failure was not caused by an unfinished line.
+        """
+
+        if len(buf) == 0 or buf[-1] == NEWLINE:
+            return None
+        end = bytes(buf).rfind(b'\n') + 1
+        self.offset -= len(buf) - end
+        return buf[:end]
+
+
+class RollingWindow:
+    """
+    Evaluate a function on a rolling window incrementally, as samples are pushed in time order.
+    Only the samples still inside the window are kept between pushes, so the cost of a push is proportional to the new samples (plus one window of retained samples), not to every sample seen.
+    The windows, and the values returned, match `utils.rolling` over all of the samples pushed so far. With `const_stride_secs`, a window is evaluated once a sample later than its end-time has been pushed.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        fn: Callable[[list[Any]], Any] | str,
+        rate: bool = False,
+        const_stride_secs: float = -1.0,
+        zeroed_times: bool = False,
+    ):
+        """Takes the same arguments as `utils.rolling`."""
+
+        if not (const_stride_secs > 0.0 or const_stride_secs == -1.0):
+            raise Exception('Invalid value for const_stride_steps')
+        self.window = window
+        # Called with each window unless it is a built-in reducer (see `utils.builtin_reducer`).
+        self.fn: Any = fn
+        self.rate = rate
+        self.const_stride_secs = const_stride_secs
+        self.zeroed_times = zeroed_times
+        self._win_ns = math.floor(window * 1_000_000_000)
+        self._stride_ns = int(round(const_stride_secs * 1_000_000_000))
+        self._spec = utils.builtin_reducer(fn)
+        # Samples retained from previous pushes, still inside a future window.
+        self._times = np.empty(0, dtype=np.int64)
+        self._values: Any = None
+        # End-time of the next window to evaluate with a constant stride.
+        self._next_end: Optional[int] = None
+        self._origin: Optional[int] = None
+
+    def push(self, times: Any, values: Any) -> tuple[np.ndarray, Any]:
+        """
+        Add new samples (later than any pushed before) and evaluate every window completed by them.
+        Returns a tuple containing 1. an array of the end-time of every new window (ns), and 2. the values for each new window.
+        """
+
+        new_times = np.asarray(times, dtype=np.int64)
+        all_values: Any
+        if len(new_times) == 0:
+            return np.empty(0, dtype=np.int64), []
+        if self._spec is not None:
+            new_values = np.asarray(values)
+            if self._spec[1] is not None:
+                new_values = self._spec[1](new_values)
+            if self._values is None:
+                all_values = new_values
+            else:
+                all_values = np.concatenate((self._values, new_values))
+        else:
+            all_values = list(self._values or []) + list(values)
+        all_times = np.concatenate((self._times, new_times))
+
+        if self.const_stride_secs > 0.0:
+            if self._next_end is None:
+                self._next_end = int(all_times[0]) + self._stride_ns
+            ends = np.arange(
+                self._next_end, all_times[-1], self._stride_ns, dtype=np.int64
+            )
+            lead = np.searchsorted(all_times, ends, side='right')
+            if len(ends) > 0:
+                self._next_end = int(ends[-1]) + self._stride_ns
+            # The next window ends after the latest sample, so needs nothing earlier than this.
+            keep_from = self._next_end - self._win_ns
+        else:
+            ends = new_times
+            lead = np.arange(len(self._times) + 1, len(all_times) + 1)
+            keep_from = int(all_times[-1]) - self._win_ns
+        trail = np.searchsorted(all_times, ends - self._win_ns, side='left')
+
+        results: Any
+        if self._spec is not None:
+            results = utils.reduce_windows(
+                all_values, trail, lead, self.window, self._spec[0], self.rate
+            )
+        else:
+            results = [self.fn(all_values[lo:hi]) for lo, hi in zip(trail, lead)]
+            if self.rate:
+                results = [r / self.window for r in results]
+
+        keep = np.searchsorted(all_times, keep_from, side='left')
+        self._times = all_times[keep:]
+        self._values = all_values[keep:]
+
+        if self.zeroed_times and len(ends) > 0:
+            if self._origin is None:
+                self._origin = int(ends[0])
+            ends = ends - self._origin
+        return ends, results
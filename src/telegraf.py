@@ -0,0 +1,314 @@
+import json
+import re
+from typing import Any, Iterable, Mapping, Optional
+import numpy as np
+import instrument
+import sidecar
+import stream
+from timeseries import TimeSeries
+import utils
+
+
+def timestamps_ns(timestamps: list[Any]) -> np.ndarray:
+    """Convert decoded telegraf timestamps, which are in seconds, into an int64 array of ns. Integer seconds are converted exactly, fractional seconds are rounded to the nearest ns."""
+
+    seconds = np.array(timestamps)
+    if seconds.dtype.kind == 'i':
+        return seconds * 1_000_000_000
+    return np.round(seconds * 1e9).astype(np.int64)
+
+
+def to_column(values: list[Any]) -> np.ndarray:
+    """
+    Convert the values of one field (`None` where a record is missing the field) into a typed column.
+    Booleans become a bool column, numbers an int64 column (or a float64 column, with `nan` for missing values), and anything else a string column (with '' for missing values).
+    """
+
+    present = [v for v in values if v is not None]
+    missing = len(present) < len(values)
+    if len(present) == 0:
+        return np.full(len(values), np.nan)
+    if all(isinstance(v, bool) for v in present):
+        return np.array([bool(v) for v in values], dtype=np.bool_)
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        if not missing and all(isinstance(v, int) for v in present):
+            return np.array(values, dtype=np.int64)
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.array(['' if v is None else str(v) for v in values], dtype=np.str_)
+
+
+def tag_set_key(tags: dict[str, str]) -> str:
+    """A canonical string identifying a set of tags, e.g. '{"cpu": "cpu-total", "host": "kleene"}'."""
+
+    return json.dumps(tags, sort_keys=True)
+
+
+def matching_lines(
+    buf: bytes | memoryview, streams: Optional[Iterable[str]]
+) -> Iterable[bytes]:
+    """
+    The lines of a 'telegraf' log whose record belongs to one of the `streams` (every non-empty line if `None`).
+    Lines are matched on their raw bytes, so non-matching records are skipped without being decoded.
+    """
+
+    if streams is None:
+        pattern = re.compile(rb'^[^\n]+$', re.M)
+    else:
+        names = b'|'.join(re.escape(name.encode()) for name in streams)
+        pattern = re.compile(rb'^[^\n]*"name":\s*"(?:' + names + rb')"[^\n]*$', re.M)
+    return (m.group() for m in pattern.finditer(buf))
+
+
+def parse_columns(
+    lines: Iterable[str | bytes],
+    streams: Optional[Mapping[str, Optional[list[str]]]] = None,
+) -> dict[str, np.ndarray]:
+    """
+    Parse the JSON lines of a 'telegraf' log into columns, grouped by the name of each record's stream (e.g. 'cpu').
+    `streams` projects the log onto the requested streams, and for each stream the requested fields (or every field if `None`). By default every field of every stream is parsed.
+    The columns for a stream are keyed '<stream>.timestamp' (ns), '<stream>.fields.<field>', '<stream>.tagset' (the index of each record's set of tags) and '<stream>.tagsets' (the `tag_set_key` of every distinct set of tags).
+    String fields are stored as codes (see `utils.intern`) in '<stream>.fields.<field>', into the distinct values in '<stream>.categories.<field>'.
+    """
+
+    records: dict[str, list[dict[str, Any]]] = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        name = record['name']
+        if streams is not None and name not in streams:
+            continue
+        records.setdefault(name, []).append(record)
+
+    columns = {}
+    for name, stream_records in records.items():
+        columns[f'{name}.timestamp'] = timestamps_ns(
+            [r['timestamp'] for r in stream_records]
+        )
+        fields: Optional[Iterable[str]] = None if streams is None else streams[name]
+        if fields is None:
+            fields = dict.fromkeys(k for r in stream_records for k in r['fields'])
+        for field in fields:
+            column = to_column([r['fields'].get(field) for r in stream_records])
+            if column.dtype.kind == 'U':
+                # Strings (e.g. IP addresses) are interned into codes once, at load time.
+                column, categories = utils.intern(column)
+                columns[f'{name}.categories.{field}'] = categories
+            columns[f'{name}.fields.{field}'] = column
+        tag_sets: dict[str, int] = {}
+        codes = [
+            tag_sets.setdefault(tag_set_key(r.get('tags', {})), len(tag_sets))
+            for r in stream_records
+        ]
+        columns[f'{name}.tagset'] = np.array(codes, dtype=np.int32)
+        columns[f'{name}.tagsets'] = np.array(list(tag_sets), dtype=np.str_)
+    return columns
+
+
+def parse_file(
+    log_file_path: str, streams: Optional[Mapping[str, Optional[list[str]]]] = None
+) -> dict[str, np.ndarray]:
+    """Parse a 'telegraf' log file into columns (see `parse_columns`) in a single pass, only decoding the lines of the requested `streams`."""
+
+    with instrument.stage('read'):
+        buf = stream.Tail(log_file_path).read(final=True)
+        instrument.samples(len(buf))
+    with instrument.stage('parse'):
+        columns = parse_columns(matching_lines(buf, streams), streams)
+        instrument.samples(
+            sum(len(v) for k, v in columns.items() if k.endswith('.timestamp'))
+        )
+    return columns
+
+
+class Telegraf:
+    # Increment when the columns returned by `parse_columns` change, to rebuild cached sidecars.
+    PARSER_VERSION = 4
+
+    def __init__(
+        self,
+        log_file_path: str,
+        cache: bool = False,
+        streams: Optional[Mapping[str, Optional[list[str]]]] = None,
+    ):
+        """
+        Load a 'telegraf' log file (JSON lines) into typed columns per stream.
+        `cache` loads the parsed columns from an on-disk sidecar (see `sidecar`), which is written the first time the file is parsed. `False` by default.
+        `streams` maps the name of each stream to load (e.g. 'cpu') to the fields to load from it (or `None` for every field), e.g. {'cpu': ['usage_user'], 'mem': None}. Records of any other stream are skipped without being decoded, so parse time and memory scale with what is loaded. By default every stream is loaded.
+        """
+
+        self.streams = streams
+        if streams is not None:
+            streams = {k: None if v is None else sorted(v) for k, v in streams.items()}
+
+        def parse(path: str) -> dict[str, np.ndarray]:
+            return parse_file(path, streams)
+
+        if cache:
+            kind = 'telegraf'
+            if streams is not None:
+                kind = f'telegraf:{json.dumps(streams, sort_keys=True)}'
+            self._columns = sidecar.load(
+                log_file_path, kind, Telegraf.PARSER_VERSION, parse
+            )
+        else:
+            self._columns = parse(log_file_path)
+
+    def stream_ids(self) -> list[str]:
+        """The names of the loaded streams, e.g. ['cpu', 'mem']."""
+
+        return [k.split('.')[0] for k in self._columns if k.endswith('.timestamp')]
+
+    def tag_sets(self, stream_id: str) -> list[dict[str, str]]:
+        """Every distinct set of tags in a stream, e.g. one per device for the 'disk' stream."""
+
+        return list(map(json.loads, self._columns[f'{stream_id}.tagsets'].tolist()))
+
+    def _mask(
+        self, stream_id: str, tags: Optional[dict[str, str]]
+    ) -> Optional[np.ndarray]:
+        if tags is None:
+            return None
+        matching = [
+            i
+            for i, tag_set in enumerate(self.tag_sets(stream_id))
+            if all(tag_set.get(k) == v for k, v in tags.items())
+        ]
+        return np.isin(self._columns[f'{stream_id}.tagset'], matching)
+
+    def times_ns(
+        self, stream_id: str, tags: Optional[dict[str, str]] = None
+    ) -> np.ndarray:
+        """The logging time (ns) of every record in a stream, optionally only the records whose tags include `tags`."""
+
+        times = self._columns[f'{stream_id}.timestamp']
+        mask = self._mask(stream_id, tags)
+        return times if mask is None else times[mask]
+
+    def field(
+        self, stream_id: str, field: str, tags: Optional[dict[str, str]] = None
+    ) -> np.ndarray:
+        """The values of a field for every record in a stream, optionally only the records whose tags include `tags`."""
+
+        codes, categories = self.codes(stream_id, field, tags)
+        return codes if categories is None else categories[codes]
+
+    def codes(
+        self, stream_id: str, field: str, tags: Optional[dict[str, str]] = None
+    ) -> tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        The values of a field as stored: for a string field (e.g. the netflow 'src'), the code of every value into the distinct values of the field (see `utils.intern`), otherwise the values themselves.
+        Returns a tuple containing 1. the codes (or values), and 2. the distinct values (or `None` if the field is not a string field).
+        """
+
+        values = self._columns[f'{stream_id}.fields.{field}']
+        categories = self._columns.get(f'{stream_id}.categories.{field}')
+        mask = self._mask(stream_id, tags)
+        return (values if mask is None else values[mask]), categories
+
+    def rolling_counts(
+        self,
+        stream_id: str,
+        field: str,
+        window: float,
+        rate: bool = False,
+        const_stride_secs: float = -1.0,
+        zeroed_times: bool = False,
+        tags: Optional[dict[str, str]] = None,
+        use_time: Optional[str] = None,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        top: Optional[int] = utils.TOP_CODES,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Count the records with each value of a string field in a rolling window (e.g. packets per source IP), for every value in a single pass with `utils.rolling_counts`.
+        `tags` and `use_time` select the records and their times as for `series`. Only the `top` most frequent values get a column, and any others are counted together in a last column 'other' (see `utils.top_codes`). The other arguments are as for `utils.rolling`.
+        Returns a tuple containing 1. an array of the end-time of every window (ns), 2. an array with a row for every window and a column of counts (or rates) for every value, and 3. the value of each column.
+        """
+
+        codes, categories = self.codes(stream_id, field, tags)
+        if categories is None:
+            raise Exception(f'Telegraf: {stream_id} {field} is not a string field')
+        times = self._times(stream_id, tags, use_time)
+        order = None if utils.is_sorted(times) else np.argsort(times, kind='stable')
+        if order is not None:
+            times, codes = times[order], codes[order]
+        n_values = len(categories)
+        codes, kept = utils.top_codes(codes, n_values, top)
+        categories = categories[kept]
+        if len(kept) < n_values:
+            categories = np.append(categories, 'other')
+        ends, counts = utils.rolling_counts(
+            times,
+            codes,
+            len(categories),
+            window,
+            rate,
+            const_stride_secs,
+            zeroed_times,
+            start_ns,
+            end_ns,
+        )
+        return ends, counts, categories
+
+    def series(
+        self,
+        stream_id: str,
+        field: str,
+        tags: Optional[dict[str, str]] = None,
+        use_time: Optional[str] = None,
+    ) -> TimeSeries:
+        """
+        The values of a field, indexed by the logging time of each record (optionally only the records whose tags include `tags`).
+        `use_time` names a field holding a time in milli-seconds (e.g. the netflow 'flow_start_ms') to index the values by instead.
+        """
+
+        return TimeSeries(
+            self._times(stream_id, tags, use_time), self.field(stream_id, field, tags)
+        )
+
+    def counter_rate(
+        self,
+        stream_id: str,
+        field: str,
+        tags: Optional[dict[str, str]] = None,
+        max_gap_secs: Optional[float] = None,
+    ) -> TimeSeries:
+        """
+        The per-second rate of a counter field (e.g. the nginx 'requests' total, or the 'bytes_recv' of a 'net' interface), indexed by the logging time of each record, with counter resets and gaps handled as by `utils.counter_rates`.
+        Each set of tags (e.g. each interface) is a separate counter. With `tags`, only the records whose tags include `tags` are used, otherwise the series holds the rates of every set of tags in time order.
+        Records without a rate (e.g. the first record of each counter) are dropped.
+        """
+
+        times = self.times_ns(stream_id, tags)
+        tagset = self._columns[f'{stream_id}.tagset']
+        mask = self._mask(stream_id, tags)
+        if mask is not None:
+            tagset = tagset[mask]
+        values, categories = self.codes(stream_id, field, tags)
+        if categories is not None:
+            raise Exception(f'Telegraf: {stream_id} {field} is not a numeric field')
+        rates = utils.counter_rates(times, values, tagset, max_gap_secs)
+        keep = ~np.isnan(rates)
+        times, rates = times[keep], rates[keep]
+        if not utils.is_sorted(times):
+            order = np.argsort(times, kind='stable')
+            times, rates = times[order], rates[order]
+        return TimeSeries(times, rates)
+
+    def _times(
+        self, stream_id: str, tags: Optional[dict[str, str]], use_time: Optional[str]
+    ) -> np.ndarray:
+        if use_time is None:
+            return self.times_ns(stream_id, tags)
+        # Scale the (ms) times before truncating, to keep any fraction of a ms.
+        return (self.field(stream_id, use_time, tags) * 1_000_000).astype(np.int64)
+
+    def tag(self, stream_id: str, tag: str) -> np.ndarray:
+        """The values of a tag for every record in a stream ('' where a record does not have the tag)."""
+
+        values = np.array(
+            [tag_set.get(tag, '') for tag_set in self.tag_sets(stream_id)],
+            dtype=np.str_,
+        )
+        return values[self._columns[f'{stream_id}.tagset']]
@@ -0,0 +1,74 @@
+from typing import Any, Optional
+import numpy as np
+import utils
+
+
+class TimeSeries:
+    """
+    A column of values indexed by time (nano-seconds since the Unix epoch), sorted by time.
+    The first, minimum and maximum times are computed once, and the times in other units are computed lazily and cached. Slicing by time is a binary search, returning views rather than copies.
+    """
+
+    def __init__(self, times_ns: Any, values: Any = None):
+        self.times_ns = np.asarray(times_ns, dtype=np.int64)
+        self.values = values
+        self._views: dict[tuple[str, bool], np.ndarray] = {}
+        self._sorted: Optional[bool] = None
+
+    def __len__(self):
+        return len(self.times_ns)
+
+    @property
+    def sorted(self) -> bool:
+        if self._sorted is None:
+            self._sorted = not np.any(self.times_ns[1:] < self.times_ns[:-1])
+        return self._sorted
+
+    @property
+    def origin(self) -> int:
+        """The time of the first value (ns)."""
+
+        return int(self.times_ns[0])
+
+    @property
+    def min(self) -> int:
+        """The earliest time (ns)."""
+
+        return self.origin if self.sorted else int(self.times_ns.min())
+
+    @property
+    def max(self) -> int:
+        """The latest time (ns)."""
+
+        return int(self.times_ns[-1]) if self.sorted else int(self.times_ns.max())
+
+    def times(self, unit: str = 'ns', zeroed: bool = False) -> np.ndarray:
+        """The times in the given unit (see `utils.time_units_transform`), optionally translated to start at 0. Computed once per unit and cached."""
+
+        key = (unit, zeroed)
+        if key not in self._views:
+            times = self.times_ns
+            if zeroed and len(times) > 0:
+                times = times - self.min
+            self._views[key] = utils.time_units_transform(unit, times)
+        return self._views[key]
+
+    def slice(
+        self, start_ns: Optional[int] = None, end_ns: Optional[int] = None
+    ) -> 'TimeSeries':
+        """The values with a time in [`start_ns`, `end_ns`], found by binary search. The returned series shares its data with this one."""
+
+        if not self.sorted:
+            raise Exception('TimeSeries: slicing requires sorted times')
+        lo = 0 if start_ns is None else np.searchsorted(self.times_ns, start_ns, 'left')
+        hi = (
+            len(self)
+            if end_ns is None
+            else np.searchsorted(self.times_ns, end_ns, 'right')
+        )
+        values = self.values
+        if values is not None:
+            values = values[lo:hi]
+        series = TimeSeries(self.times_ns[lo:hi], values)
+        series._sorted = True
+        return series
@@ -1,39 +1,641 @@
-from typing import Any, Callable
+import math
+import time
+from typing import Any, Callable, Optional
+import numpy as np
+import instrument
+import memo
 
+# Built-in reducers, evaluated over every window at once by `rolling_reduce`.
+# 'count' is the number of values in the window, 'sum' and 'mean' reduce the values, 'proportion' is the fraction of non-zero values, and 'rate' is the count per second of window.
+REDUCERS = ('count', 'sum', 'mean', 'proportion', 'rate')
 
-def time_units_transform(unit: str, times_ns: list[int]):
-    """Transform a list of times in nano-seconds into the desired units."""
 
-    match unit:
-        case 's':
-            return list(map(lambda x: x / 1_000_000_000, times_ns))
-        case _:
-            raise Exception(f'time unit transform for unit: {unit} unimplemented')
+# Nano-seconds per unit of time.
+TIME_UNITS = {'ns': 1, 'ms': 1_000_000, 's': 1_000_000_000}
+
+
+def time_units_transform(unit: str, times_ns: Any) -> np.ndarray:
+    """Transform a list of times in nano-seconds into the desired units ('ns', 'ms' or 's')."""
+
+    if unit not in TIME_UNITS:
+        raise Exception(f'time unit transform for unit: {unit} unimplemented')
+    with instrument.stage('time units'):
+        if unit == 'ns':
+            return np.asarray(times_ns)
+        return np.asarray(times_ns) / TIME_UNITS[unit]
+
+
+def fn_name(fn: Callable[[list[Any]], Any] | str) -> str:
+    """The name of a rolling function, or of a built-in reducer, e.g. for profiling."""
+
+    return fn if isinstance(fn, str) else getattr(fn, '__name__', repr(fn))
+
+
+def to_ns(unit: str, time: float) -> int:
+    """Transform a time in the given units ('ns', 'ms' or 's') into nano-seconds."""
+
+    if unit not in TIME_UNITS:
+        raise Exception(f'time unit transform for unit: {unit} unimplemented')
+    return int(round(time * TIME_UNITS[unit]))
 
 
 def zero_translation(values):
-    return list(map(lambda x: x - min(values), values))
+    values = np.asarray(values)
+    if len(values) == 0:
+        return values
+    return values - values.min()
+
+
+def reducer(
+    name: str, transform: Optional[Callable[[np.ndarray], np.ndarray]] = None
+) -> Callable[[Callable], Callable]:
+    """
+    Decorator tagging a window function with the built-in reducer (one of `REDUCERS`) that computes the same result, so that `rolling` can evaluate it over every window at once.
+    `transform` maps the array of values onto the numeric column that is reduced, e.g. `np.logical_not` to count failures from a success mask.
+    """
+
+    if name not in REDUCERS:
+        raise Exception(f'reducer: {name} is unimplemented')
+
+    def tag(fn):
+        fn.reducer = (name, transform)
+        return fn
+
+    return tag
+
+
+def quantile(q: float) -> Callable[[Callable], Callable]:
+    """Decorator tagging a window function as computing the `q`-quantile of the values in the window (0 <= `q` <= 1, linearly interpolated as `np.quantile`), so that `rolling` can evaluate it with `rolling_quantiles`."""
+
+    if not 0.0 <= q <= 1.0:
+        raise Exception(f'quantile: {q} is not in [0, 1]')
+
+    def tag(fn):
+        fn.quantile = q
+        return fn
+
+    return tag
+
+
+def builtin_reducer(
+    fn: Callable[[list[Any]], Any] | str,
+) -> Optional[tuple[str, Optional[Callable[[np.ndarray], np.ndarray]]]]:
+    """The built-in reducer and transform for `fn`, which is either the name of a reducer or a function tagged with `reducer`. `None` for any other function."""
+
+    if isinstance(fn, str):
+        if fn not in REDUCERS:
+            raise Exception(f'reducer: {fn} is unimplemented')
+        return (fn, None)
+    return getattr(fn, 'reducer', None)
+
+
+def window_edges(
+    times: np.ndarray,
+    window: float,
+    const_stride_secs: float = -1.0,
+    start_ns: Optional[int] = None,
+    end_ns: Optional[int] = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find the edges of every rolling window with binary searches over the (sorted) `times`, matching the windows evaluated by `rolling`.
+    `start_ns` and `end_ns` restrict the windows to those with an end-time in [`start_ns`, `end_ns`], keeping the same constant-stride grid as the whole series.
+    Returns a tuple containing 1. the end-time of every window (ns), 2. the index of the first value in every window, and 3. the index one past the last value in every window.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    # Times are whole ns, so `(t - time) <= window` is equivalent to `time >= t - floor(window)`.
+    win_ns = math.floor(window * 1_000_000_000)
+    match const_stride_secs:
+        case _ if const_stride_secs > 0.0:
+            const_stride_secs_ns = int(round(const_stride_secs * 1_000_000_000))
+            if len(times) > 0:
+                first = int(times[0]) + const_stride_secs_ns
+                if start_ns is not None and start_ns > first:
+                    strides = -((first - start_ns) // const_stride_secs_ns)
+                    first += strides * const_stride_secs_ns
+                stop = int(times[-1])
+                if end_ns is not None:
+                    stop = min(stop, end_ns + 1)
+                ends = np.arange(first, stop, const_stride_secs_ns, dtype=np.int64)
+            else:
+                ends = np.empty(0, dtype=np.int64)
+            lead = np.searchsorted(times, ends, side='right')
+        case _ if const_stride_secs == -1.0:
+            lo = (
+                0 if start_ns is None else int(np.searchsorted(times, start_ns, 'left'))
+            )
+            hi = len(times)
+            if end_ns is not None:
+                hi = int(np.searchsorted(times, end_ns, 'right'))
+            ends = times[lo:hi]
+            lead = np.arange(lo + 1, hi + 1)
+        case _:
+            raise Exception('Invalid value for const_stride_steps')
+    trail = np.searchsorted(times, ends - win_ns, side='left')
+    return ends, trail, lead
+
+
+def window_bounds(
+    times: np.ndarray, ends: np.ndarray, window: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """The index of the first value, and one past the last value, in the window ending at each of the `ends` (ns), found with binary searches over the (sorted) `times`."""
+
+    times = np.asarray(times, dtype=np.int64)
+    win_ns = math.floor(window * 1_000_000_000)
+    lead = np.searchsorted(times, ends, side='right')
+    trail = np.searchsorted(times, ends - win_ns, side='left')
+    return trail, lead
+
+
+def window_origin(times: np.ndarray, const_stride_secs: float = -1.0) -> int:
+    """The end-time of the first window over the whole of the (sorted) `times`, subtracted from every end-time by `zeroed_times`."""
+
+    origin = int(times[0])
+    if const_stride_secs > 0.0:
+        origin += int(round(const_stride_secs * 1_000_000_000))
+    return origin
+
+
+def prefix_sums(values: np.ndarray, reducer: str) -> np.ndarray:
+    """The prefix sums of the `values` (or, for 'proportion', of the non-zero values) used by `reduce_windows` to evaluate a built-in reducer."""
+
+    column = np.asarray(values)
+    if reducer == 'proportion':
+        column = column != 0
+    if column.dtype.kind == 'b':
+        column = column.astype(np.int64)
+    prefix = np.zeros(len(column) + 1, dtype=column.dtype)
+    np.cumsum(column, out=prefix[1:])
+    return prefix
+
+
+def reduce_windows(
+    values: np.ndarray,
+    trail: np.ndarray,
+    lead: np.ndarray,
+    window: float,
+    reducer: str,
+    rate: bool = False,
+    prefix: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Evaluate a built-in reducer (one of `REDUCERS`) on every window `values[trail:lead]` at once, using prefix sums. `prefix` reuses the sums from `prefix_sums` of the same `values` and `reducer`, e.g. across window sizes."""
+
+    counts = lead - trail
+    match reducer:
+        case 'count':
+            result = counts.astype(np.float64)
+        case 'rate':
+            result = counts / window
+        case 'sum' | 'mean' | 'proportion':
+            if prefix is None:
+                prefix = prefix_sums(values, reducer)
+            result = (prefix[lead] - prefix[trail]).astype(np.float64)
+            if reducer != 'sum':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    result = result / counts
+        case u:
+            raise Exception(f'reducer: {u} is unimplemented')
+    if rate:
+        result = result / window
+    return result
+
+
+def rolling_reduce(
+    times: np.ndarray,
+    values: np.ndarray,
+    window: float,
+    reducer: str,
+    rate: bool = False,
+    const_stride_secs: float = -1.0,
+    zeroed_times: bool = False,
+    start_ns: Optional[int] = None,
+    end_ns: Optional[int] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Evaluate a built-in reducer (one of `REDUCERS`) on a rolling window, in O(n) using prefix sums over the window edges found by `window_edges`.
+    `times` must be sorted, and `values` must be numeric (or boolean).
+    Takes the same arguments as `rolling`. Windows containing no values give `0.0` for 'count', 'sum' and 'rate', and `nan` for 'mean' and 'proportion'.
+    Returns a tuple containing 1. an array of the end-time of every window (ns), and 2. an array of the reduced value for each window.
+    """
+    ends, trail, lead = window_edges(times, window, const_stride_secs, start_ns, end_ns)
+    # Only the values inside the requested windows are touched.
+    lo, hi = (int(trail.min()), int(lead.max())) if len(ends) > 0 else (0, 0)
+    result = reduce_windows(values[lo:hi], trail - lo, lead - lo, window, reducer, rate)
+
+    if zeroed_times and len(ends) > 0:
+        return (ends - window_origin(times, const_stride_secs), result)
+    return (ends, result)
+
+
+def rolling_quantiles(
+    times: np.ndarray,
+    values: np.ndarray,
+    window: float,
+    qs: list[float],
+    const_stride_secs: float = -1.0,
+    zeroed_times: bool = False,
+    start_ns: Optional[int] = None,
+    end_ns: Optional[int] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Evaluate quantiles of the values in a rolling window, linearly interpolated as `np.quantile`.
+    The ranks of the values are indexed once by a wavelet matrix (see `RankIndex`) in O(n log n), then the values either side of each quantile are found for every window at once, in O(log n) vectorized steps rather than a sort of each window. `nan` values are ignored.
+    `times` must be sorted. `qs` are the quantiles to evaluate (0 <= q <= 1), the other arguments are as for `rolling`.
+    Returns a tuple containing 1. an array of the end-time of every window (ns), and 2. an array with a row for every window and a column for every quantile (`nan` for windows without values).
+    """
+
+    ends, trail, lead = window_edges(times, window, const_stride_secs, start_ns, end_ns)
+    results = np.full((len(ends), len(qs)), np.nan)
+    if len(ends) > 0:
+        lo, hi = int(trail.min()), int(lead.max())
+        vals = np.asarray(values[lo:hi], dtype=np.float64)
+        finite = ~np.isnan(vals)
+        # The index of each window's edges among the values that are not `nan`.
+        position = np.zeros(len(vals) + 1, dtype=np.int64)
+        np.cumsum(finite, out=position[1:])
+        first, last = position[trail - lo], position[lead - lo]
+        counts = last - first
+        index = RankIndex(vals[finite])
+        some = counts > 0
+        first, last, k = first[some], last[some], counts[some]
+        for j, q in enumerate(qs):
+            # The (fractional) index of the quantile, computed as `np.quantile` does.
+            pos = (k - 1) * q
+            f = pos.astype(np.int64)
+            a = index.kth(first, last, f)
+            b = index.kth(first, last, np.minimum(f + 1, k - 1))
+            t = pos - f
+            # Interpolate as `np.quantile` does, from the nearer neighbour, so that results match it exactly.
+            results[some, j] = np.where(t < 0.5, a + (b - a) * t, b - (b - a) * (1 - t))
+
+    if zeroed_times and len(ends) > 0:
+        ends = ends - window_origin(times, const_stride_secs)
+    return (ends, results)
+
+
+class RankIndex:
+    def __init__(self, values: np.ndarray):
+        """
+        A wavelet matrix over the ranks of `values`, answering the k-th smallest value in any range of positions in O(log n) steps, for many ranges at once.
+        Each level holds, for every position, the number of values before it with a 0 at one bit of their rank (from the highest bit down), and the values are stably partitioned on that bit for the next level.
+        """
+
+        order = np.argsort(values, kind='stable')
+        self.sorted = values[order]
+        n = len(values)
+        dtype = np.int32 if n < 2**31 else np.int64
+        ranks = np.empty(n, dtype=dtype)
+        ranks[order] = np.arange(n, dtype=dtype)
+        self.bits = max(int(n - 1).bit_length(), 1)
+        self.levels: list[tuple[np.ndarray, int]] = []
+        for bit in range(self.bits - 1, -1, -1):
+            ones = (np.right_shift(ranks, bit) & 1).astype(np.bool_)
+            zeros = np.zeros(n + 1, dtype=dtype)
+            np.cumsum(~ones, out=zeros[1:])
+            self.levels.append((zeros, int(zeros[-1])))
+            ranks = np.concatenate((ranks[~ones], ranks[ones]))
+
+    def kth(self, lo: np.ndarray, hi: np.ndarray, k: np.ndarray) -> np.ndarray:
+        """The `k`-th smallest value (from 0) of the values at positions [`lo`, `hi`), for each of the ranges."""
+
+        rank = np.zeros(len(lo), dtype=np.int64)
+        for (zeros, n_zeros), bit in zip(self.levels, range(self.bits - 1, -1, -1)):
+            zlo, zhi = zeros[lo], zeros[hi]
+            left = k < zhi - zlo
+            rank |= (~left).astype(np.int64) << bit
+            k = np.where(left, k, k - (zhi - zlo))
+            lo = np.where(left, zlo, n_zeros + lo - zlo)
+            hi = np.where(left, zhi, n_zeros + hi - zhi)
+        return self.sorted[rank]
+
+
+# Rolling counts of the values of a field keep a column for at most this many of its most frequent values by default, counting the others together (see `top_codes`).
+TOP_CODES = 32
+# `rolling_counts` accumulates the prefix counts of at most this many (window edge, code) pairs at a time.
+COUNT_CHUNK = 1 << 20
+
+
+def rolling_counts(
+    times: np.ndarray,
+    codes: np.ndarray,
+    n_codes: int,
+    window: float,
+    rate: bool = False,
+    const_stride_secs: float = -1.0,
+    zeroed_times: bool = False,
+    start_ns: Optional[int] = None,
+    end_ns: Optional[int] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Count the values with each code (0 <= code < `n_codes`, e.g. from `intern`) in a rolling window, for every code and every window in a single pass.
+    Each value is binned by the window edges that follow it, so the cost is O(n + windows * n_codes) however many codes there are, rather than a rolling pass per code. Values with a code outside [0, `n_codes`) are not counted. The windows are counted in chunks of about `COUNT_CHUNK` / `n_codes`, so beyond the counts returned the memory is bounded, but the counts themselves are O(windows * n_codes), so codes of a field with many distinct values should first be capped with `top_codes`.
+    `times` must be sorted, the other arguments are as for `rolling`.
+    Returns a tuple containing 1. an array of the end-time of every window (ns), and 2. an array with a row for every window and a column of counts (or rates) for every code.
+    """
+
+    ends, trail, lead = window_edges(times, window, const_stride_secs, start_ns, end_ns)
+    codes = np.asarray(codes, dtype=np.int64)
+    counts = np.zeros((len(ends), n_codes), dtype=np.int64)
+    if n_codes > 0:
+        # Each chunk of windows has at most twice as many distinct edges.
+        chunk = max(1, COUNT_CHUNK // (2 * n_codes))
+        for first in range(0, len(ends), chunk):
+            last = min(first + chunk, len(ends))
+            counts[first:last] = _window_counts(
+                codes, trail[first:last], lead[first:last], n_codes
+            )
+
+    if zeroed_times and len(ends) > 0:
+        ends = ends - window_origin(times, const_stride_secs)
+    return (ends, counts / window if rate else counts)
+
+
+def _window_counts(
+    codes: np.ndarray, trail: np.ndarray, lead: np.ndarray, n_codes: int
+) -> np.ndarray:
+    """The number of values with each code in each of the (non-empty list of) windows [`trail`, `lead`), from prefix counts of every code at every window edge."""
+
+    edges, inverse = np.unique(np.concatenate((trail, lead)), return_inverse=True)
+    lo, hi = int(edges[0]), int(edges[-1])
+    # The value at index i is counted by the prefix at every edge after i.
+    segment = np.searchsorted(edges, np.arange(lo, hi), side='right')
+    in_range = (codes[lo:hi] >= 0) & (codes[lo:hi] < n_codes)
+    prefix = np.bincount(
+        segment[in_range] * n_codes + codes[lo:hi][in_range],
+        minlength=len(edges) * n_codes,
+    ).reshape(len(edges), n_codes)
+    prefix = np.cumsum(prefix, axis=0)
+    return prefix[inverse[len(trail) :]] - prefix[inverse[: len(trail)]]
+
+
+def top_codes(
+    codes: np.ndarray, n_codes: int, top: Optional[int] = TOP_CODES
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Keep the `top` most frequent codes (0 <= code < `n_codes`) and re-code every other code as `top`, so that `rolling_counts` of a high-cardinality field (e.g. source IPs) counts them together in one last column, rather than a column per value. `None` keeps every code.
+    Returns a tuple containing 1. the new codes, and 2. the original code of each kept code, in their original order.
+    """
+
+    codes = np.asarray(codes, dtype=np.int64)
+    if top is None or n_codes <= top:
+        return codes, np.arange(n_codes)
+    in_range = (codes >= 0) & (codes < n_codes)
+    frequency = np.bincount(codes[in_range], minlength=n_codes)
+    kept = np.sort(np.argsort(-frequency, kind='stable')[:top])
+    mapping = np.full(n_codes, top, dtype=np.int64)
+    mapping[kept] = np.arange(len(kept))
+    return np.where(in_range, mapping[np.clip(codes, 0, n_codes - 1)], -1), kept
+
+
+def rolling_histograms(
+    times: np.ndarray,
+    values: np.ndarray,
+    window: float,
+    bins: Any,
+    const_stride_secs: float = -1.0,
+    zeroed_times: bool = False,
+    start_ns: Optional[int] = None,
+    end_ns: Optional[int] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Count the values in a rolling window falling into each of the histogram `bins` (an array of bin edges, as for `np.histogram`), for every window at once with `rolling_counts`. Values outside the bins are not counted.
+    `times` must be sorted, the other arguments are as for `rolling`.
+    Returns a tuple containing 1. an array of the end-time of every window (ns), and 2. an array with a row for every window and a column of counts for every bin.
+    """
+
+    edges = np.asarray(bins, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    n_bins = len(edges) - 1
+    which = np.searchsorted(edges, values, side='right') - 1
+    # The last bin includes its right edge, as with `np.histogram`.
+    which[values == edges[-1]] = n_bins - 1
+    return rolling_counts(
+        times,
+        which,
+        n_bins,
+        window,
+        False,
+        const_stride_secs,
+        zeroed_times,
+        start_ns,
+        end_ns,
+    )
+
+
+def histogram_quantiles(counts: np.ndarray, bins: Any, qs: list[float]) -> np.ndarray:
+    """
+    Approximate quantiles from rows of histogram counts (see `rolling_histograms`), interpolating linearly within the bin containing each quantile. Each estimate is within the width of that bin of the value at rank `q * count` (`np.quantile` with method 'inverted_cdf'), whereas `rolling_quantiles` also interpolates between neighbouring values.
+    Returns an array with a row for every row of `counts` and a column for every quantile (`nan` for empty rows).
+    """
+
+    edges = np.asarray(bins, dtype=np.float64)
+    counts = np.asarray(counts)
+    cumulative = np.cumsum(counts, axis=1)
+    totals = cumulative[:, -1]
+    results = np.full((len(counts), len(qs)), np.nan)
+    rows = np.arange(len(counts))
+    for j, q in enumerate(qs):
+        target = q * totals
+        b = np.minimum((cumulative < target[:, None]).sum(axis=1), len(edges) - 2)
+        before = cumulative[rows, b] - counts[rows, b]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            within = np.clip((target - before) / counts[rows, b], 0.0, 1.0)
+        within = np.nan_to_num(within)
+        results[:, j] = np.where(
+            totals > 0, edges[b] + within * (edges[b + 1] - edges[b]), np.nan
+        )
+    return results
+
+
+def intern(values: Any, categories: Any = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Encode values (e.g. IP addresses or error messages) as small integer codes into a table of their distinct values, so that they can be compared and grouped as integers.
+    Values already in `categories` keep their codes and new values are appended, so that codes stay stable as a log grows.
+    Returns a tuple containing 1. the int32 code of every value, and 2. the table of categories.
+    """
+
+    values = np.asarray(values)
+    distinct, inverse = np.unique(values, return_inverse=True)
+    if categories is None:
+        return inverse.astype(np.int32), distinct
+    table = {c: i for i, c in enumerate(np.asarray(categories).tolist())}
+    for value in distinct.tolist():
+        table.setdefault(value, len(table))
+    mapping = np.array([table[v] for v in distinct.tolist()], dtype=np.int32)
+    return mapping[inverse], np.array(list(table), dtype=distinct.dtype.type)
+
+
+def counter_rates(
+    times: Any,
+    values: Any,
+    groups: Any = None,
+    max_gap_secs: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Convert the samples of monotonic counters (e.g. the nginx 'requests' total) into per-second rates, with one vectorized difference over the samples of every counter at once.
+    `groups` identifies the counter of each sample (e.g. the tag set of a telegraf record, one per device), by default all samples are of one counter. Samples need not be sorted.
+    The rate of a sample is the increase since the previous sample of its counter, divided by the time between them. A decrease is a counter reset, so the increase is the new value (counted up from 0). The first sample of each counter, samples at the same time as the previous one, and samples more than `max_gap_secs` after the previous one (e.g. after the collector was down) have no rate.
+    Returns the rate of every sample (`nan` where it has none), in the order of the `values`.
+    """
+
+    times = np.asarray(times, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if groups is None:
+        order = np.argsort(times, kind='stable')
+    else:
+        groups = np.asarray(groups)
+        order = np.lexsort((times, groups))
+    t, v = times[order], values[order]
+    dt = np.diff(t) / 1_000_000_000
+    dv = np.diff(v)
+    dv = np.where(dv < 0, v[1:], dv)
+    valid = dt > 0
+    if groups is not None:
+        g = groups[order]
+        valid &= g[1:] == g[:-1]
+    if max_gap_secs is not None:
+        valid &= dt <= max_gap_secs
+    rates = np.full(len(values), np.nan)
+    rates[order[1:][valid]] = dv[valid] / dt[valid]
+    return rates
+
+
+def is_sorted(times: Any) -> bool:
+    times = np.asarray(times)
+    return not np.any(times[1:] < times[:-1])
+
+
+def numeric_column(
+    values: Any, transform: Optional[Callable[[np.ndarray], np.ndarray]]
+) -> Optional[np.ndarray]:
+    """`values` as a numeric array for `rolling_reduce` (after applying `transform`), or `None` if the values are not numeric."""
+
+    column = np.asarray(values)
+    if column.dtype.kind == 'O':
+        return None
+    if transform is not None:
+        column = transform(column)
+    if column.dtype.kind not in 'biuf':
+        return None
+    return column
 
 
 def rolling(
-    times: list[int],
-    values: list[Any],
+    times: Any,
+    values: Any,
     window: float,
-    fn: Callable[[list[Any]], Any],
-    rate=False,
-    const_stride_secs=-1.0,
-    zeroed_times=False,
-) -> tuple[list[int], list[Any]]:
+    fn: Callable[[list[Any]], Any] | str,
+    rate: bool = False,
+    const_stride_secs: float = -1.0,
+    zeroed_times: bool = False,
+    start_ns: Optional[int] = None,
+    end_ns: Optional[int] = None,
+    fingerprint: Optional[str] = None,
+    sorted: Optional[bool] = None,
+) -> tuple[np.ndarray, np.ndarray]:
     """
     Evaluate the function on a rolling window.
     `times` is the list of timestamps (nano-seconds since the Unix epoch) at which the `values` occured.
     `values` is the list of data over which the rolling window will be evaluated.
     `window` is measured in seconds.
+    `fn` is either a function called with each window of values, or the name of a built-in reducer (one of `REDUCERS`). Built-in reducers, and functions tagged with `reducer` (such as those in `rolling_funcs`), are evaluated over every window at once with `rolling_reduce` when the `times` are sorted and the `values` are numeric. Functions tagged with `quantile` are evaluated incrementally with `rolling_quantiles`.
     `rate` normalises the value returned by the function by the window length (in seconds) to create a rate with units 's^(-1)'. `False` by default.
     `const_stride_secs` sets the window stride to a constant value (seconds), rather that evaluating a window at each data point (variable stride). `-1.0` by default, which uses variable stride.
     `zeroed_times` subtracts `min(times)` from all times to translate the time axis to start at `0.0`. `False` by default, which allows 'syncing' data that was captured by multiple observers.
-    Returns a tuple containing 1. a list containing the end-time of every window (ns), and 2. a list containing the values return from `fn` for each window.
+    `start_ns` and `end_ns` only evaluate the windows with an end-time in [`start_ns`, `end_ns`] (e.g. to zoom into part of a long log), touching only the values inside those windows. The `times` must be sorted. `None` by default, which evaluates every window.
+    `fingerprint` identifies the contents of `times` and `values` when they are not arrays (see `memo.fingerprint`), e.g. `got.Response`s built from columns.
+    `sorted` is whether the `times` are sorted, if already known (e.g. `TimeSeries.sorted`), to save checking every time on each call. `None` by default, which checks.
+    With `memo.ENABLED`, results are memoized (see `memo`) by the contents of the `times` and `values`, the function (see `memo.fn_key`) and the other arguments, so repeating a call costs a lookup. Memoized results are shared, so must not be modified.
+    Returns a tuple containing 1. an array of the end-time of every window (ns), and 2. an array of the values returned from `fn` for each window.
     """
+    with instrument.stage(f'rolling {fn_name(fn)}'):
+        instrument.samples(len(times))
+        k = memo.key(
+            fingerprint or memo.fingerprint(times, values),
+            memo.fn_key(fn),
+            window,
+            rate,
+            const_stride_secs,
+            zeroed_times,
+            start_ns,
+            end_ns,
+        )
+        return memo.cached(
+            k,
+            lambda: _rolling(
+                times,
+                values,
+                window,
+                fn,
+                rate,
+                const_stride_secs,
+                zeroed_times,
+                start_ns,
+                end_ns,
+                sorted,
+            ),
+        )
+
+
+def _rolling(
+    times: Any,
+    values: Any,
+    window: float,
+    fn: Callable[[list[Any]], Any] | str,
+    rate: bool = False,
+    const_stride_secs: float = -1.0,
+    zeroed_times: bool = False,
+    start_ns: Optional[int] = None,
+    end_ns: Optional[int] = None,
+    sorted: Optional[bool] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    if sorted is None:
+        sorted = is_sorted(times)
+    q = getattr(fn, 'quantile', None)
+    if q is not None and sorted:
+        ends, results = rolling_quantiles(
+            times,
+            values,
+            window,
+            [q],
+            const_stride_secs,
+            zeroed_times,
+            start_ns,
+            end_ns,
+        )
+        results = results[:, 0]
+        return (ends, results / window if rate else results)
+
+    spec = builtin_reducer(fn)
+    if spec is not None and sorted:
+        name, transform = spec
+        ends, starts, stops = window_edges(
+            times, window, const_stride_secs, start_ns, end_ns
+        )
+        lo, hi = (int(starts.min()), int(stops.max())) if len(ends) > 0 else (0, 0)
+        column = numeric_column(values[lo:hi], transform)
+        if column is not None:
+            results = reduce_windows(
+                column, starts - lo, stops - lo, window, name, rate
+            )
+            if zeroed_times and len(ends) > 0:
+                ends = ends - window_origin(times, const_stride_secs)
+            return (ends, results)
+    if isinstance(fn, str):
+        raise Exception(f'reducer: {fn} requires sorted times and numeric values')
+
+    if start_ns is not None or end_ns is not None:
+        if not sorted:
+            raise Exception('rolling: start_ns and end_ns require sorted times')
+        ends, starts, stops = window_edges(
+            times, window, const_stride_secs, start_ns, end_ns
+        )
+        calc_results = [fn(values[lo:hi]) for lo, hi in zip(starts, stops)]
+        if rate:
+            calc_results = [r / window for r in calc_results]
+        if zeroed_times and len(ends) > 0:
+            ends = ends - window_origin(times, const_stride_secs)
+        return (ends, np.asarray(calc_results))
+
     win_ns = window * 1_000_000_000
     const_stride_secs_ns = int(round(const_stride_secs * 1_000_000_000))
     # Cursor for trailing edge of the window.
@@ -76,6 +678,188 @@ def rolling(
             raise Exception('Invalid value for const_stride_steps')
 
     if zeroed_times:
-        return (zero_translation(win_leading_times), calc_results)
+        return (zero_translation(win_leading_times), np.asarray(calc_results))
     else:
-        return (win_leading_times, calc_results)
+        return (np.asarray(win_leading_times), np.asarray(calc_results))
+
+
+def rolling_many(
+    times: Any,
+    values: Any,
+    windows: list[float],
+    fns: list[Callable[[list[Any]], Any] | str],
+    rates: Optional[list[bool]] = None,
+    const_stride_secs: float = -1.0,
+    zeroed_times: bool = False,
+    start_ns: Optional[int] = None,
+    end_ns: Optional[int] = None,
+    numeric: Any = None,
+    fingerprint: Optional[str] = None,
+    sorted: Optional[bool] = None,
+) -> list[list[tuple[np.ndarray, np.ndarray]]]:
+    """
+    Evaluate every function in `fns` on a rolling window of every size in `windows` (seconds), in one pass over the data, e.g. to sweep the window size used for smoothing.
+    The window end-times and leading edges are found once, the trailing edges once per window size, and the prefix sums once per reducer and transform, so adding a built-in reducer or a window size costs one lookup per window. Quantile functions (tagged with `quantile`) share one incremental pass per window size. Other functions are called with each window of `values`, which is sliced once and shared by all of them.
+    `rates` normalises the result of each function by the window length, `False` for every function by default. `numeric` are the values to use for built-in reducers when `values` are not numeric, e.g. the success mask of a list of `got.Response`s. The other arguments are as for `rolling`.
+    Results are memoized per function and window size as by `rolling`, and only the functions with a window size not already known are evaluated.
+    Returns a list with an entry for every function, of a list with an entry for every window size, of the tuple returned by `rolling`.
+    """
+    if rates is None:
+        rates = [False] * len(fns)
+    with instrument.stage('rolling many'):
+        instrument.samples(len(times))
+        if fingerprint is None:
+            columns = (times, values) if numeric is None else (times, values, numeric)
+            fingerprint = memo.fingerprint(*columns)
+        keys = [
+            [
+                memo.key(
+                    fingerprint,
+                    memo.fn_key(fn),
+                    window,
+                    rate,
+                    const_stride_secs,
+                    zeroed_times,
+                    start_ns,
+                    end_ns,
+                )
+                for window in windows
+            ]
+            for fn, rate in zip(fns, rates)
+        ]
+        results: list[list[Any]] = [[memo.lookup(k) for k in row] for row in keys]
+        missing = [i for i, row in enumerate(results) if any(r is None for r in row)]
+        if len(missing) > 0:
+            computed = _rolling_many(
+                times,
+                values,
+                windows,
+                [fns[i] for i in missing],
+                [rates[i] for i in missing],
+                const_stride_secs,
+                zeroed_times,
+                start_ns,
+                end_ns,
+                numeric,
+                sorted,
+            )
+            for i, row in zip(missing, computed):
+                results[i] = row
+                for k, result in zip(keys[i], row):
+                    memo.store(k, result)
+        return results
+
+
+def _rolling_many(
+    times: Any,
+    values: Any,
+    windows: list[float],
+    fns: list[Callable[[list[Any]], Any] | str],
+    rates: list[bool],
+    const_stride_secs: float,
+    zeroed_times: bool,
+    start_ns: Optional[int],
+    end_ns: Optional[int],
+    numeric: Any,
+    sorted: Optional[bool],
+) -> list[list[tuple[np.ndarray, np.ndarray]]]:
+    if sorted is None:
+        sorted = is_sorted(times)
+    if not sorted:
+        return [
+            [
+                rolling(
+                    times,
+                    values
+                    if numeric is None or builtin_reducer(fn) is None
+                    else numeric,
+                    window,
+                    fn,
+                    rate,
+                    const_stride_secs,
+                    zeroed_times,
+                    start_ns,
+                    end_ns,
+                    sorted=False,
+                )
+                for window in windows
+            ]
+            for fn, rate in zip(fns, rates)
+        ]
+
+    times = np.asarray(times, dtype=np.int64)
+    # The end-times and leading edges do not depend on the window size.
+    ends, _, lead = window_edges(times, 0.0, const_stride_secs, start_ns, end_ns)
+    trails = [window_bounds(times, ends, window)[0] for window in windows]
+    out_ends = ends
+    if zeroed_times and len(ends) > 0:
+        out_ends = ends - window_origin(times, const_stride_secs)
+    results: list[list[Any]] = [[None] * len(windows) for _ in fns]
+
+    prefixes: dict[tuple[Any, bool], np.ndarray] = {}
+    quantiles: list[int] = []
+    calls: list[tuple[int, Callable[[list[Any]], Any]]] = []
+    for i, fn in enumerate(fns):
+        if getattr(fn, 'quantile', None) is not None:
+            quantiles.append(i)
+            continue
+        spec = builtin_reducer(fn)
+        column = None
+        if spec is not None:
+            name, transform = spec
+            column = numeric_column(values if numeric is None else numeric, transform)
+        if column is None:
+            if isinstance(fn, str):
+                raise Exception(
+                    f'reducer: {fn} requires sorted times and numeric values'
+                )
+            calls.append((i, fn))
+            continue
+        # 'sum' and 'mean' share the sums of the values, and 'proportion' the sums of the non-zero values.
+        key = (transform, name == 'proportion')
+        with instrument.stage(f'reduce {fn_name(fn)}'):
+            if name in ('sum', 'mean', 'proportion') and key not in prefixes:
+                prefixes[key] = prefix_sums(column, name)
+            for j, (window, trail) in enumerate(zip(windows, trails)):
+                result = reduce_windows(
+                    column, trail, lead, window, name, rates[i], prefixes.get(key)
+                )
+                results[i][j] = (out_ends, result)
+
+    if len(quantiles) > 0:
+        for j, window in enumerate(windows):
+            with instrument.stage('quantiles'):
+                _, qs = rolling_quantiles(
+                    times,
+                    values,
+                    window,
+                    [getattr(fns[i], 'quantile') for i in quantiles],
+                    const_stride_secs,
+                    False,
+                    start_ns,
+                    end_ns,
+                )
+            for k, i in enumerate(quantiles):
+                result = qs[:, k] / window if rates[i] else qs[:, k]
+                results[i][j] = (out_ends, result)
+
+    for j, (window, trail) in enumerate(zip(windows, trails) if calls else ()):
+        calc_results: list[list[Any]] = [[] for _ in calls]
+        # Each function is timed separately when profiling, as the calls are interleaved.
+        timed = instrument.active()
+        elapsed = [0.0] * len(calls)
+        for lo, hi in zip(trail.tolist(), lead.tolist()):
+            win = values[lo:hi]
+            for k, (_, fn) in enumerate(calls):
+                if timed:
+                    start = time.perf_counter()
+                    calc_results[k].append(fn(win))
+                    elapsed[k] += time.perf_counter() - start
+                else:
+                    calc_results[k].append(fn(win))
+        for k, (i, fn) in enumerate(calls):
+            instrument.add(f'call {fn_name(fn)}', elapsed[k], len(lead))
+            if rates[i]:
+                calc_results[k] = [r / window for r in calc_results[k]]
+            results[i][j] = (out_ends, np.asarray(calc_results[k]))
+    return results
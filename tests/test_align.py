@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+import align
+import utils
+from timeseries import TimeSeries
+
+
+def test_merge_orders_by_time_then_source():
+    sources = {
+        'a': TimeSeries(np.array([1, 3, 5]), np.array([10, 30, 50])),
+        'b': TimeSeries(np.array([2, 3])),
+        'empty': TimeSeries(np.empty(0, dtype=np.int64)),
+    }
+    assert list(align.merge(sources)) == [
+        (1, 'a', 10),
+        (2, 'b', None),
+        (3, 'a', 30),
+        (3, 'b', None),
+        (5, 'a', 50),
+    ]
+
+
+def sources(seed: int = 0) -> dict[str, TimeSeries]:
+    rng = np.random.default_rng(seed)
+    dense = np.sort(rng.integers(0, 10_000_000_000, 2_000))
+    sparse = np.sort(rng.integers(2_000_000_000, 8_000_000_000, 20))
+    return {
+        'dense': TimeSeries(dense, rng.normal(size=len(dense))),
+        'sparse': TimeSeries(sparse, rng.integers(0, 5, len(sparse))),
+        'single': TimeSeries(np.array([5_000_000_000]), np.array([7.0])),
+        'empty': TimeSeries(np.empty(0, dtype=np.int64), np.empty(0)),
+    }
+
+
+def reference_window(series, end, window, fn):
+    """`fn` over the values in [end - window, end], found one value at a time."""
+
+    win_ns = int(window * 1_000_000_000)
+    values = [
+        v
+        for t, v in zip(series.times_ns.tolist(), series.values.tolist())
+        if end - win_ns <= t <= end
+    ]
+    return fn(values)
+
+
+def mean_or_nan(values):
+    return float(np.mean(values)) if len(values) > 0 else np.nan
+
+
+TIMES = np.array([-1, 0, 1_999_999_999, 2_000_000_000, 5_000_000_000, 12_000_000_000])
+
+
+@pytest.mark.parametrize('tolerance', [None, 0.5])
+def test_asof_matches_a_scan_per_time(tolerance):
+    frame = align.asof(TIMES, sources(), tolerance)
+    for key, series in sources().items():
+        expected = []
+        for t in TIMES.tolist():
+            before = [
+                (s, v)
+                for s, v in zip(series.times_ns.tolist(), series.values.tolist())
+                if s <= t and (tolerance is None or t - s <= tolerance * 1e9)
+            ]
+            expected.append(before[-1][1] if before else np.nan)
+        np.testing.assert_array_equal(frame[key], expected)
+
+
+def test_asof_of_non_numeric_values():
+    states = TimeSeries(np.array([1, 3]), np.array(['a', 'b'], dtype=object))
+    assert align.asof([0, 1, 2, 5], {'s': states})['s'].tolist() == [
+        None,
+        'a',
+        'a',
+        'b',
+    ]
+
+
+@pytest.mark.parametrize('after', [True, False])
+@pytest.mark.parametrize('fn', ['mean', lambda w: float(np.sum(w))])
+def test_join_matches_a_scan_per_window(after, fn):
+    frame = align.join(TIMES, sources(), 0.5, fn, False, after)
+    reference = mean_or_nan if fn == 'mean' else fn
+    for key, series in sources().items():
+        column = frame[f'{key}.{utils.fn_name(fn)}']
+        if len(series) == 0:
+            assert np.isnan(column).all()
+            continue
+        ends = TIMES + 500_000_000 if after else TIMES
+        expected = [reference_window(series, e, 0.5, reference) for e in ends.tolist()]
+        np.testing.assert_allclose(column, expected)
+
+
+@pytest.mark.parametrize('bounds', [(None, None), (3_000_000_000, 6_000_000_000)])
+def test_resample_matches_a_scan_per_window(bounds):
+    frame = align.resample(
+        sources(),
+        1.0,
+        {'dense': 'mean', 'sparse': 'count', 'single': 'sum', 'empty': 'count'},
+        0.25,
+        False,
+        *bounds,
+    )
+    ends = frame.times_ns
+    # The grid starts one stride after the earliest time of any source.
+    first = min(s.min for s in sources().values() if len(s) > 0) + 250_000_000
+    assert len(ends) > 0 and (ends[0] - first) % 250_000_000 == 0
+    assert np.all(np.diff(ends) == 250_000_000)
+    if bounds[0] is not None:
+        assert bounds[0] <= ends[0] < bounds[0] + 250_000_000 and ends[-1] <= bounds[1]
+    for key, reference in (
+        ('dense', mean_or_nan),
+        ('sparse', len),
+        ('single', np.sum),
+        ('empty', len),
+    ):
+        expected = [
+            reference_window(sources()[key], e, 1.0, reference) for e in ends.tolist()
+        ]
+        np.testing.assert_allclose(frame[key], expected)
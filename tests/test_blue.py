@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+import blue
+
+STATE = '[{}] {{"ok_rate":"0.50","green_blocked":false,"red_blocked":true,"reward":3}}'
+
+
+def test_log_being_written_mid_line(tmp_path):
+    path = tmp_path / 'blue.txt'
+    path.write_text(STATE.format(1000) + '\n[2000] Wait\n' + STATE.format(3000)[:20])
+    b = blue.Blue(str(path))
+    assert b.state_times().tolist() == [1000]
+    assert len(b.action_times()) == 1
+    with open(path, 'a') as f:
+        f.write(STATE.format(3000)[20:] + '\n')
+    assert b.refresh() == 1
+    assert b.state_times().tolist() == [1000, 3000]
+    assert b.state('reward').tolist() == [3, 3]
+
+
+def test_unterminated_last_line_of_a_finished_log(tmp_path):
+    path = tmp_path / 'blue.txt'
+    path.write_text(STATE.format(1000) + '\n[2000] Wait')
+    b = blue.Blue(str(path))
+    assert b.state_times().tolist() == [1000]
+    assert b.action_times().tolist() == [2000]
+
+
+def random_log(n: int, seed: int = 0) -> str:
+    rng = np.random.default_rng(seed)
+    lines = []
+    for i in range(n):
+        time = 1_000 * (i + 1)
+        if rng.random() < 0.5:
+            ok_rate, reward = rng.random(), rng.integers(-5, 6)
+            green, red = rng.random(2) < 0.5
+            lines.append(
+                f'[{time}] {{"ok_rate":"{ok_rate:.2f}","green_blocked":{str(green).lower()},'
+                f'"red_blocked":{str(red).lower()},"reward":{reward}}}'
+            )
+        else:
+            lines.append(f'[{time}] {rng.choice(["ToggleGreen", "ToggleRed", "Wait"])}')
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.mark.parametrize('n', [0, 1, 500])
+def test_bulk_parser_matches_the_line_parser(n):
+    text = random_log(n)
+    columns = blue.parse_columns(text.encode())
+    expected = blue.parse_lines(text.splitlines())
+    assert columns.keys() == expected.keys()
+    for k, column in columns.items():
+        assert column.dtype == expected[k].dtype
+        np.testing.assert_array_equal(column, expected[k])
+
+
+def test_reordered_state_keys_fall_back_to_the_line_parser():
+    text = '[1] {"reward":2,"ok_rate":"0.5","red_blocked":false,"green_blocked":true}\n'
+    assert blue.parse_columns(text.encode())['reward'].tolist() == [2]
+    assert blue.parse_columns(text.encode())['green_blocked'].tolist() == [True]
+
+
+def reference_rewards(b: blue.Blue, end_ns: int) -> dict[str, int]:
+    """The reward of each configuration over the states before `end_ns`, summed one state at a time."""
+
+    rewards = dict.fromkeys(blue.CONFIGURATIONS, 0)
+    for time, state in b.states:
+        if time < end_ns:
+            configuration = state['green_blocked'] + 2 * state['red_blocked']
+            rewards[blue.CONFIGURATIONS[configuration]] += state['reward']
+    return rewards
+
+
+@pytest.mark.parametrize('n', [1, 500])
+def test_stats_match_summing_each_state(tmp_path, n):
+    path = tmp_path / 'blue.txt'
+    path.write_text(random_log(n, seed=1) + STATE.format(10**9))
+    b = blue.Blue(str(path))
+    times = b.state_times()
+    for end_ns in (None, int(times[0]), int(times[0]) + 1, 250_000, 10**9 + 1):
+        middle = round((times[-1] - times[0]) / 2) + times[0]
+        expected = reference_rewards(b, middle if end_ns is None else end_ns)
+        assert dict(b.stats(end_ns=end_ns)) == expected
+    ends = np.array([0, 250_000, 10**9, 10**9 + 1])
+    assert b.cumulative_reward(ends).tolist() == [
+        list(reference_rewards(b, end).values()) for end in ends.tolist()
+    ]
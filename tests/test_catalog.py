@@ -0,0 +1,27 @@
+import catalog
+from telegraf import Telegraf
+
+RECORDS = [
+    '{"fields":{"usage_user":1.5},"name":"cpu","tags":{},"timestamp":1741700000.9999999996}',
+    '{"fields":{"bytes":10},"name":"netflow","tags":{},"timestamp":1741699999.25}',
+    '{"fields":{"usage_user":2.5},"name":"cpu","tags":{},"timestamp":1741700001}',
+]
+
+
+def test_telegraf_span_matches_the_loaded_times(tmp_path):
+    path = tmp_path / 'telegraf.log'
+    path.write_text('\n'.join(RECORDS) + '\n')
+    info = catalog.scan(str(path))
+    log = Telegraf(str(path))
+    times = [t for s in ('cpu', 'netflow') for t in log.times_ns(s).tolist()]
+    assert info['log_type'] == 'TELEGRAF'
+    assert info['streams'] == ['cpu', 'netflow']
+    assert (info['first_ns'], info['last_ns']) == (min(times), max(times))
+
+
+def test_telegraf_log_without_timestamps(tmp_path):
+    path = tmp_path / 'telegraf.log'
+    path.write_text('{"fields":{},"name":"cpu","tags":{}}\n')
+    info = catalog.scan(str(path))
+    assert info['log_type'] == 'TELEGRAF'
+    assert (info['first_ns'], info['last_ns']) == (None, None)
@@ -0,0 +1,108 @@
+import math
+import numpy as np
+import pytest
+import decimation
+
+
+def line(n: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    x = np.sort(rng.integers(0, 1_000_000, n))
+    y = rng.normal(size=n)
+    y[rng.random(n) < 0.05] = np.nan
+    return x, y
+
+
+def reference_min_max(x, y, buckets):
+    """The first and last point, and the first minimum and maximum point of every bucket, found one point at a time."""
+
+    edges = np.linspace(x[0], x[-1], buckets + 1)[:-1]
+    groups: dict[int, list[int]] = {}
+    for i, xi in enumerate(x.tolist()):
+        groups.setdefault(sum(e <= xi for e in edges), []).append(i)
+    keep = {0, len(x) - 1}
+    for indices in groups.values():
+        ys = y[indices]
+        if np.all(np.isnan(ys)):
+            keep.add(indices[0])
+        else:
+            keep.update((indices[np.nanargmin(ys)], indices[np.nanargmax(ys)]))
+    keep = sorted(keep)
+    return x[keep], y[keep]
+
+
+def reference_lttb(x, y, points):
+    """Largest-Triangle-Three-Buckets, one point at a time."""
+
+    n = len(x)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64).tolist()
+    keep, a = [0], 0
+    for i in range(points - 2):
+        following = range(edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else [n - 1]
+        finite = [j for j in following if not math.isnan(y[j])]
+        if i + 2 < len(edges) and len(finite) == 0:
+            mx = my = math.nan
+        elif i + 2 < len(edges):
+            mx = sum(float(x[j]) for j in finite) / len(finite)
+            my = sum(y[j] for j in finite) / len(finite)
+        else:
+            mx, my = float(x[n - 1]), y[n - 1]
+        best, best_area = edges[i], -1.0
+        for j in range(edges[i], edges[i + 1]):
+            area = abs(
+                (x[a] - mx) * (y[j] - y[a]) - (float(x[a]) - float(x[j])) * (my - y[a])
+            )
+            if not math.isnan(area) and area > best_area:
+                best, best_area = j, area
+        a = best
+        keep.append(a)
+    keep.append(n - 1)
+    return x[keep], y[keep]
+
+
+@pytest.mark.parametrize('n', [5, 100, 5_000])
+@pytest.mark.parametrize('buckets', [1, 7, 100])
+def test_min_max_matches_a_pass_per_point(n, buckets):
+    x, y = line(n)
+    actual = decimation.min_max(x, y, buckets)
+    expected = reference_min_max(x, y, buckets) if n > 2 * buckets + 2 else (x, y)
+    for a, e in zip(actual, expected):
+        np.testing.assert_array_equal(a, e)
+
+
+@pytest.mark.parametrize('n', [5, 100, 5_000])
+@pytest.mark.parametrize('points', [3, 10, 200])
+def test_lttb_matches_a_pass_per_point(n, points):
+    x, y = line(n)
+    actual = decimation.lttb(x, y, points)
+    expected = reference_lttb(x, y, points) if n > points else (x, y)
+    for a, e in zip(actual, expected):
+        np.testing.assert_array_equal(a, e)
+
+
+@pytest.mark.parametrize('method', decimation.METHODS)
+@pytest.mark.parametrize('n', [0, 1, 2])
+def test_short_lines_are_unchanged(method, n):
+    x, y = line(n)
+    actual_x, actual_y = decimation.decimate(x, y, method, 1)
+    np.testing.assert_array_equal(actual_x, x)
+    np.testing.assert_array_equal(actual_y, y)
+
+
+@pytest.mark.parametrize('method', decimation.METHODS)
+def test_unsorted_x_is_sorted_first(method):
+    x, y = line(1_000)
+    order = np.random.default_rng(1).permutation(len(x))
+    for a, e in zip(
+        decimation.decimate(x[order], y[order], method, 20),
+        decimation.decimate(x, y, method, 20),
+    ):
+        np.testing.assert_array_equal(np.sort(a), np.sort(e))
+
+
+def test_all_nan_buckets_keep_a_point():
+    x = np.arange(100)
+    y = np.full(100, np.nan)
+    y[:10] = np.arange(10)
+    kept_x, kept_y = decimation.min_max(x, y, 10)
+    assert kept_x.tolist() == [0, 9, *range(10, 100, 10), 99]
+    assert len(decimation.lttb(x, y, 10)[0]) == 10
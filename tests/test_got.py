@@ -0,0 +1,51 @@
+import numpy as np
+import got
+
+
+def test_empty_log_zeroed_times(tmp_path):
+    path = tmp_path / 'empty.txt'
+    path.write_text('')
+    g = got.Got(str(path))
+    assert len(g) == 0
+    assert len(g.times_ns(zeroed=True)) == 0
+    assert len(g.times_s(zeroed=True)) == 0
+    assert g.times_ns(zeroed=True).dtype == np.int64
+
+
+LINES = [
+    '[1000000000] 1',
+    '[2000000000] 0 : Response promise rejected: timeout',
+    '[3000000000] 1',
+]
+
+
+def test_unterminated_last_line_of_a_finished_log(tmp_path):
+    path = tmp_path / 'finished.txt'
+    path.write_text('\n'.join(LINES))
+    g = got.Got(str(path))
+    assert g.times_ns().tolist() == [1000000000, 2000000000, 3000000000]
+    assert g.success().tolist() == [True, False, True]
+
+
+def test_log_being_written_mid_line(tmp_path):
+    path = tmp_path / 'running.txt'
+    path.write_text('\n'.join(LINES[:2]) + '\n[30')
+    g = got.Got(str(path))
+    assert g.times_ns().tolist() == [1000000000, 2000000000]
+    with open(path, 'a') as f:
+        f.write('00000000] 1\n')
+    assert g.refresh() == 1
+    assert g.times_ns().tolist() == [1000000000, 2000000000, 3000000000]
+    assert g.refresh() == 0
+
+
+def test_log_being_written_mid_line_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr('sidecar.CACHE_DIR', str(tmp_path / 'cache'))
+    path = tmp_path / 'running.txt'
+    path.write_text('\n'.join(LINES[:2]) + '\n[30')
+    g = got.Got(str(path), cache=True)
+    assert len(g) == 2
+    with open(path, 'a') as f:
+        f.write('00000000] 1\n')
+    assert g.refresh() == 1
+    assert got.Got(str(path), cache=True).times_ns().tolist() == g.times_ns().tolist()
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+import memo
+import rolling_funcs
+import utils
+
+THRESHOLD = 0.5
+
+
+@pytest.fixture(autouse=True)
+def enabled():
+    memo.clear()
+    enabled, memo.ENABLED = memo.ENABLED, True
+    yield
+    memo.ENABLED = enabled
+
+
+def rolled(fn):
+    times = np.arange(0, 10_000_000_000, 100_000_000, dtype=np.int64)
+    values = np.sin(np.arange(len(times)))
+    return utils.rolling(times, values, 1.0, fn, False, 1.0)[1].tolist()
+
+
+def uncached(fn):
+    memo.ENABLED = False
+    try:
+        return rolled(fn)
+    finally:
+        memo.ENABLED = True
+
+
+class Threshold:
+    def __init__(self, level: float):
+        self.level = level
+
+    def check(self, window):
+        return float(np.mean(np.asarray(window) > self.level))
+
+
+def test_lambdas_with_different_names():
+    rolled(lambda w: np.max(w))
+    assert rolled(lambda w: np.min(w)) == uncached(lambda w: np.min(w))
+
+
+def test_lambdas_with_different_defaults():
+    rolled(lambda w, q=0.1: np.quantile(w, q))
+    assert rolled(lambda w, q=0.9: np.quantile(w, q)) == uncached(
+        lambda w, q=0.9: np.quantile(w, q)
+    )
+
+
+def test_bound_methods_of_different_objects():
+    rolled(Threshold(0.5).check)
+    assert rolled(Threshold(0.9).check) == uncached(Threshold(0.9).check)
+    assert memo.fn_key(Threshold(0.5).check) is None
+
+
+def test_same_function_is_memoized():
+    def peak(w):
+        return np.max(w)
+
+    assert memo.fn_key(peak) == memo.fn_key(peak)
+    assert memo.fn_key(peak) is not None
+
+
+def above_threshold(window):
+    return float(np.mean(np.asarray(window) > THRESHOLD))
+
+
+def test_function_reading_a_global(monkeypatch):
+    rolled(above_threshold)
+    monkeypatch.setattr(__name__ + '.THRESHOLD', 0.9)
+    assert rolled(above_threshold) == uncached(above_threshold)
+
+
+def test_reducer_transform_reading_a_global(monkeypatch):
+    times = np.arange(0, 2_000_000_000, 500_000_000, dtype=np.int64)
+    ips = np.array(['a', 'b', 'a', 'a'])
+    monkeypatch.setattr(rolling_funcs, 'HILBERT_IP', 'a')
+    assert list(
+        utils.rolling(times, ips, 1.0, rolling_funcs.count_hilbert_packets)[1]
+    ) == [1, 1, 2, 2]
+    monkeypatch.setattr(rolling_funcs, 'HILBERT_IP', 'z')
+    assert list(
+        utils.rolling(times, ips, 1.0, rolling_funcs.count_hilbert_packets)[1]
+    ) == [0, 0, 0, 0]
+
+
+def test_function_reading_an_unidentifiable_global():
+    assert memo.fn_key(lambda w: np.mean(w) > MASK) is None
+
+
+MASK = np.zeros(3)
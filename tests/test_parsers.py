@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+import got
+import parsers
+
+LINES = [
+    '[1741700000000000000] 1',
+    '[1741700000000000001] 0 : Request FailedAfterSend with: connection reset',
+    '',
+    '[7] 1: trailing text',
+    '[9223372036854775807] 0',
+]
+
+
+def reference(text: str) -> tuple[np.ndarray, np.ndarray]:
+    return got.parse_lines(text.splitlines())
+
+
+@pytest.mark.parametrize(
+    'text',
+    [
+        '',
+        '\n',
+        LINES[0],
+        LINES[0] + '\n',
+        '\n'.join(LINES) + '\n',
+        # A finished log without a newline after its last line.
+        '\n'.join(LINES),
+        '\n\n'.join(LINES) + '\n\n',
+    ],
+)
+def test_got_bytes_matches_the_line_parser(text):
+    times, success = parsers.got_bytes(text.encode())
+    expected_times, expected_success = reference(text)
+    assert times.dtype == np.int64 and success.dtype == np.bool_
+    assert times.tolist() == expected_times.tolist()
+    assert success.tolist() == expected_success.tolist()
+
+
+def test_got_file_matches_got_bytes(tmp_path):
+    path = tmp_path / 'got.txt'
+    path.write_text('\n'.join(LINES))
+    for actual, expected in zip(
+        parsers.got_file(str(path)), parsers.got_bytes(path.read_bytes())
+    ):
+        assert actual.tolist() == expected.tolist()
+    (tmp_path / 'empty.txt').write_text('')
+    assert [len(c) for c in parsers.got_file(str(tmp_path / 'empty.txt'))] == [0, 0]
+
+
+def test_got_reasons_match_the_line_parser():
+    text = '\n'.join(LINES + [LINES[1]])
+    codes, reasons = parsers.got_reasons(text.encode())
+    expected = [got.Response.parse(line).reason for line in text.splitlines() if line]
+    assert [reasons[c] for c in codes] == expected
+    assert reasons[0] == ''
+    assert len(reasons) == len(set(expected) | {''})
+
+
+@pytest.mark.parametrize(
+    'text',
+    [
+        '[9223372036854775808] 1\n',
+        '[99999999999999999999] 1\n',
+        '1000] 1\n',
+        '[1000 1\n',
+        '[] 1\n',
+        '[10a0] 1\n',
+        '[1000]1\n',
+        '[1000] 2\n',
+        '[1000]\n',
+        '[1000] 1\n[1001]',
+    ],
+)
+def test_got_bytes_rejects_malformed_lines(text):
+    with pytest.raises(parsers.ParseError):
+        parsers.got_bytes(text.encode())
@@ -0,0 +1,45 @@
+import plot_utils
+from plot_utils import LogFile, LogFileType
+
+
+def got_logs(tmp_path, monkeypatch) -> list[LogFile]:
+    monkeypatch.setattr('sidecar.CACHE_DIR', str(tmp_path / 'cache'))
+    paths = [tmp_path / 'a.log', tmp_path / 'b.log']
+    for i, path in enumerate(paths):
+        path.write_text(f'[{i + 1}] 1\n[{i + 2}] 0\n')
+    return [LogFile(LogFileType.GOT, str(p)) for p in paths]
+
+
+class Pool:
+    """Stands in for `ProcessPoolExecutor`, mapping in this process."""
+
+    started = 0
+
+    def __init__(self, max_workers: int):
+        Pool.started += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, *args):
+        return map(fn, *args)
+
+
+def test_small_logs_are_loaded_without_a_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(plot_utils, 'ProcessPoolExecutor', Pool)
+    Pool.started = 0
+    loaded = plot_utils.load_log_files(got_logs(tmp_path, monkeypatch))
+    assert Pool.started == 0
+    assert [log.times_ns().tolist() for log in loaded.values()] == [[1, 2], [2, 3]]
+
+
+def test_large_logs_are_loaded_in_a_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(plot_utils, 'ProcessPoolExecutor', Pool)
+    monkeypatch.setattr(plot_utils, 'POOL_BYTES', 1)
+    Pool.started = 0
+    loaded = plot_utils.load_log_files(got_logs(tmp_path, monkeypatch))
+    assert Pool.started == (1 if plot_utils.os.cpu_count() != 1 else 0)
+    assert [log.times_ns().tolist() for log in loaded.values()] == [[1, 2], [2, 3]]
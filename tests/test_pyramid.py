@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+import got
+import rolling_funcs
+import utils
+from pyramid import BASE_SECS, Pyramid
+from timeseries import TimeSeries
+
+BASE_NS = int(BASE_SECS * 1_000_000_000)
+ORIGIN = 1_741_700_000_000_000_000
+
+
+def series(n: int, sparse: bool = False, seed: int = 0) -> TimeSeries:
+    """A sorted series whose times (after the first) never fall on a bucket edge, where the pyramid and `utils.rolling` count a value on a window's end-time differently."""
+
+    rng = np.random.default_rng(seed)
+    offsets = rng.integers(1, 20_000_000_000, n)
+    if sparse:
+        # Bursts an hour apart.
+        offsets += rng.integers(0, 4, n) * 3_600_000_000_000
+    offsets[offsets % BASE_NS == 0] += 1
+    times = ORIGIN + np.sort(offsets)
+    if n > 0:
+        times[0] = ORIGIN
+    return TimeSeries(times, rng.integers(0, 4, n).astype(np.float64))
+
+
+def first_or_nan(fn):
+    return lambda w: fn(w) if len(w) > 0 else np.nan
+
+
+# A plain function called on each window, for every reducer answered by a pyramid.
+REFERENCES = {
+    'count': len,
+    'sum': np.sum,
+    'mean': first_or_nan(np.mean),
+    'proportion': first_or_nan(lambda w: np.mean(np.asarray(w) != 0)),
+    'min': first_or_nan(np.min),
+    'max': first_or_nan(np.max),
+}
+
+
+def reference(fn: str, window: float):
+    return (lambda w: len(w) / window) if fn == 'rate' else REFERENCES[fn]
+
+
+@pytest.mark.parametrize('fn', [*REFERENCES, 'rate'])
+@pytest.mark.parametrize('n', [1, 2_000])
+@pytest.mark.parametrize('sparse', [False, True])
+@pytest.mark.parametrize(
+    'window, stride',
+    [
+        (1.0, 0.5),
+        (2.0, 1.0),
+        # Not whole buckets, so evaluated exactly.
+        (0.3, 0.1),
+        (1.0, 0.3),
+    ],
+)
+@pytest.mark.parametrize('zeroed', [False, True])
+def test_rolling_matches_a_function_per_window(fn, n, sparse, window, stride, zeroed):
+    s = series(n, sparse)
+    ends, result = Pyramid(s).rolling(window, fn, True, stride, zeroed)
+    expected_ends, expected = utils.rolling(
+        s.times_ns, s.values, window, reference(fn, window), True, stride, zeroed
+    )
+    np.testing.assert_array_equal(ends, expected_ends)
+    np.testing.assert_allclose(result, expected)
+
+
+@pytest.mark.parametrize('fn', ['sum', 'max'])
+@pytest.mark.parametrize('window, stride', [(1.0, 0.5), (0.3, 0.1)])
+def test_rolling_with_bounds(fn, window, stride):
+    s = series(2_000)
+    bounds = (ORIGIN + 3_000_000_000, ORIGIN + 9_000_000_000)
+    ends, result = Pyramid(s).rolling(window, fn, False, stride, False, *bounds)
+    expected_ends, expected = utils.rolling(
+        s.times_ns, s.values, window, REFERENCES[fn], False, stride, False, *bounds
+    )
+    assert len(ends) > 0
+    np.testing.assert_array_equal(ends, expected_ends)
+    np.testing.assert_allclose(result, expected)
+
+
+def test_empty_series():
+    p = Pyramid(TimeSeries(np.empty(0, dtype=np.int64), np.empty(0)))
+    assert [len(x) for x in p.rolling(1.0, 'sum', False, 0.5)] == [0, 0]
+    assert [len(x) for x in p.rolling(0.3, 'max', False, 0.1)] == [0, 0]
+    assert len(p.envelope(10)['times']) <= 1
+
+
+def test_rejects_variable_stride_and_other_transforms():
+    p = Pyramid(series(10))
+    with pytest.raises(Exception):
+        p.rolling(1.0, 'sum', False, -1.0)
+    with pytest.raises(Exception):
+        p.rolling(1.0, rolling_funcs.count_err, False, 0.5)
+
+
+def test_got_pyramid_of_a_transform(tmp_path):
+    s = series(2_000)
+    path = tmp_path / 'got.txt'
+    path.write_text(
+        ''.join(f'[{t}] {int(v > 0)}\n' for t, v in zip(s.times_ns, s.values))
+    )
+    log = got.Got(str(path))
+    pyramid = log.pyramid(transform=np.logical_not)
+    for window, stride in ((1.0, 0.5), (0.3, 0.1)):
+        actual = pyramid.rolling(window, rolling_funcs.count_err, True, stride)
+        expected = utils.rolling(
+            log.times_ns(),
+            log.responses,
+            window,
+            lambda w: rolling_funcs.count_err(w),
+            True,
+            stride,
+        )
+        for a, e in zip(actual, expected):
+            np.testing.assert_allclose(a, e)
+
+
+@pytest.mark.parametrize('points', [3, 50, 10_000])
+@pytest.mark.parametrize('sparse', [False, True])
+def test_envelope_matches_the_values_of_each_bucket(points, sparse):
+    s = series(2_000, sparse)
+    start, end = ORIGIN + 2_000_000_000, ORIGIN + 12_000_000_000
+    envelope = Pyramid(s).envelope(points, start, end)
+    assert 0 < len(envelope['times']) <= points + 1
+    bucket = int(envelope['times'][1] - envelope['times'][0])
+    for i, t in enumerate(envelope['times'].tolist()):
+        values = s.values[(s.times_ns >= t) & (s.times_ns < t + bucket)]
+        assert envelope['count'][i] == len(values)
+        if len(values) > 0:
+            assert envelope['mean'][i] == pytest.approx(np.mean(values))
+            assert (envelope['min'][i], envelope['max'][i]) == (
+                values.min(),
+                values.max(),
+            )
+        else:
+            assert np.isnan(envelope['mean'][i])
@@ -0,0 +1,50 @@
+import numpy as np
+import spectral
+
+
+def burst_train(period=2.0, burst=0.3, secs=180.0, rate=500.0, seed=0):
+    """Responses at `rate` per second, most of them failing during a `burst` at the start of every `period` (s)."""
+
+    rng = np.random.default_rng(seed)
+    times = np.sort(rng.uniform(0.0, secs, int(secs * rate)))
+    ok = ~(((times % period) < burst) & (rng.random(len(times)) < 0.9))
+    return (times * 1_000_000_000).astype(np.int64), ok
+
+
+def test_period_of_a_burst_train():
+    times, ok = burst_train()
+    result = spectral.Detector(60.0, binning='sum', transform=np.logical_not).push(
+        times, ok
+    )
+    assert len(result) > 0
+    np.testing.assert_allclose(result.periods[:, 0], 2.0, atol=0.02)
+    np.testing.assert_allclose(result.period, 2.0, atol=0.02)
+    assert (result.strength > 0.1).all()
+
+
+def test_period_of_a_short_burst_train():
+    times, ok = burst_train(period=0.5, burst=0.05, secs=60.0)
+    result = spectral.Detector(10.0, binning='sum', transform=np.logical_not).push(
+        times, ok
+    )
+    np.testing.assert_allclose(result.period, 0.5, atol=0.01)
+
+
+def test_pushed_in_parts():
+    times, ok = burst_train()
+    whole = spectral.Detector(60.0, binning='sum', transform=np.logical_not)
+    parts = spectral.Detector(60.0, binning='sum', transform=np.logical_not)
+    expected = whole.push(times, ok)
+    split = np.searchsorted(times, [50_000_000_000, 120_000_000_000])
+    pushed = spectral.Periodicity.concat(
+        [parts.push(t, v) for t, v in zip(np.split(times, split), np.split(ok, split))],
+        parts.peaks,
+    )
+    np.testing.assert_array_equal(pushed.times, expected.times)
+    np.testing.assert_allclose(pushed.period, expected.period)
+
+
+def test_no_samples():
+    result = spectral.Detector(60.0).push([])
+    assert len(result) == 0
+    assert result.periods.shape == (0, 3)
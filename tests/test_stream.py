@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import stream
+import utils
+
+
+def samples(n: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    times = np.sort(rng.integers(0, 10_000_000_000, n))
+    return times, rng.normal(size=n)
+
+
+def pushed(roller: stream.RollingWindow, times, values, splits) -> tuple:
+    ends, results = [], []
+    for lo, hi in zip([0, *splits], [*splits, len(times)]):
+        e, r = roller.push(times[lo:hi], values[lo:hi])
+        ends.extend(e.tolist())
+        results.extend(list(r))
+    return ends, results
+
+
+@pytest.mark.parametrize('fn', ['mean', 'count', lambda w: float(np.max(w))])
+@pytest.mark.parametrize('stride', [-1.0, 0.25])
+@pytest.mark.parametrize('zeroed', [False, True])
+@pytest.mark.parametrize('splits', [[], [1], [0, 0, 500, 501, 1500]])
+def test_pushes_match_rolling_over_every_sample(fn, stride, zeroed, splits):
+    times, values = samples(2_000)
+    roller = stream.RollingWindow(1.0, fn, True, stride, zeroed)
+    ends, results = pushed(roller, times, values, splits)
+    expected_ends, expected = utils.rolling(
+        times, values, 1.0, fn, True, stride, zeroed
+    )
+    # With a constant stride, windows ending after the last sample need a later sample.
+    assert ends == expected_ends.tolist()[: len(ends)]
+    assert len(expected_ends) - len(ends) <= (1 if stride > 0.0 else 0)
+    np.testing.assert_allclose(results, expected[: len(results)])
+
+
+def test_single_sample_and_empty_pushes():
+    roller = stream.RollingWindow(1.0, 'count')
+    assert [len(x) for x in roller.push([], [])] == [0, 0]
+    ends, results = roller.push([5], [1.0])
+    assert ends.tolist() == [5] and list(results) == [1.0]
+    assert [len(x) for x in roller.push([], [])] == [0, 0]
+
+
+def test_tail_returns_complete_lines_only(tmp_path):
+    path = tmp_path / 'log.txt'
+    path.write_text('one\ntw')
+    tail = stream.Tail(str(path))
+    assert bytes(tail.read()) == b'one\n'
+    assert bytes(tail.read()) == b''
+    with open(path, 'a') as f:
+        f.write('o\nthree')
+    assert bytes(tail.read()) == b'two\n'
+    assert bytes(tail.read(final=True)) == b'three'
+    assert bytes(tail.read(final=True)) == b''
+
+
+def test_tail_unfinished_rewinds_to_the_unterminated_line(tmp_path):
+    path = tmp_path / 'log.txt'
+    path.write_text('one\ntw')
+    tail = stream.Tail(str(path))
+    buf = tail.read(final=True)
+    assert bytes(tail.unfinished(buf)) == b'one\n'
+    with open(path, 'a') as f:
+        f.write('o\n')
+    assert bytes(tail.read()) == b'two\n'
+    assert tail.unfinished(memoryview(b'two\n')) is None
@@ -0,0 +1,84 @@
+import json
+import numpy as np
+import pytest
+import plot_utils
+import utils
+from telegraf import Telegraf
+
+RECORDS = [
+    {'fields': {'usage_user': 1.5, 'usage_idle': 90}, 'name': 'cpu', 'tags': {'cpu': 'cpu0'}, 'timestamp': 1741700000},
+    {'fields': {'src': '10.0.0.1', 'bytes': 10, 'flow_start_ms': 1741699999500}, 'name': 'netflow', 'tags': {}, 'timestamp': 1741700000},
+    {'fields': {'used': 1024}, 'name': 'mem', 'tags': {}, 'timestamp': 1741700001},
+    {'fields': {'usage_user': 2.5}, 'name': 'cpu', 'tags': {'cpu': 'cpu1'}, 'timestamp': 1741700001.5},
+    {'fields': {'src': '10.0.0.2', 'bytes': 20, 'flow_start_ms': 1741700001000}, 'name': 'netflow', 'tags': {}, 'timestamp': 1741700002},
+    {'fields': {'src': '10.0.0.1', 'bytes': 30, 'flow_start_ms': 1741700002000}, 'name': 'netflow', 'tags': {}, 'timestamp': 1741700003},
+]  # fmt: skip
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'telegraf.log'
+    path.write_text('\n'.join(json.dumps(r) for r in RECORDS) + '\n')
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    'streams',
+    [
+        {'cpu': ['usage_user']},
+        {'cpu': None, 'netflow': ['src', 'flow_start_ms']},
+        {'mem': ['used'], 'netflow': ['src']},
+        {'missing': None},
+    ],
+)
+def test_projection_matches_the_full_log(path, streams):
+    full = Telegraf(path)
+    projected = Telegraf(path, streams=streams)
+    assert projected.stream_ids() == [s for s in full.stream_ids() if s in streams]
+    for stream_id in projected.stream_ids():
+        assert (
+            projected.times_ns(stream_id).tolist() == full.times_ns(stream_id).tolist()
+        )
+        fields = streams[stream_id] or {
+            k for r in RECORDS if r['name'] == stream_id for k in r['fields']
+        }
+        for field in fields:
+            np.testing.assert_array_equal(
+                projected.field(stream_id, field), full.field(stream_id, field)
+            )
+
+
+def test_projection_skips_other_fields(path):
+    projected = Telegraf(path, streams={'cpu': ['usage_user']})
+    with pytest.raises(KeyError):
+        projected.field('cpu', 'usage_idle')
+
+
+def test_projected_rolling_matches_the_full_log(path):
+    full = Telegraf(path).series('netflow', 'bytes', use_time='flow_start_ms')
+    projected = Telegraf(path, streams={'netflow': ['bytes', 'flow_start_ms']}).series(
+        'netflow', 'bytes', use_time='flow_start_ms'
+    )
+    for fn in ('sum', lambda w: float(np.sum(w))):
+        for actual, expected in zip(
+            utils.rolling(projected.times_ns, projected.values, 1.0, fn),
+            utils.rolling(full.times_ns, full.values, 1.0, fn),
+        ):
+            np.testing.assert_array_equal(actual, expected)
+
+
+def test_empty_log(tmp_path):
+    path = tmp_path / 'empty.log'
+    path.write_text('')
+    assert Telegraf(str(path), streams={'cpu': None}).stream_ids() == []
+
+
+def test_telegraf_projection_of_a_spec():
+    spec = {
+        'cpu': ['usage_user', {'usage_idle': {'color': 'k'}}],
+        'netflow': [{'bytes': {'use_time': 'flow_start_ms'}}, 'bytes'],
+    }
+    assert plot_utils.telegraf_projection(spec) == {
+        'cpu': ['usage_idle', 'usage_user'],
+        'netflow': ['bytes', 'flow_start_ms'],
+    }
@@ -0,0 +1,188 @@
+import numpy as np
+import pytest
+import got
+import rolling_funcs
+import utils
+
+
+def samples(n: int, n_codes: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    times = np.sort(rng.integers(0, 10_000_000_000, n))
+    # Codes outside [0, n_codes) are not counted.
+    return times, rng.integers(-1, n_codes + 1, n)
+
+
+@pytest.mark.parametrize('n', [0, 1, 2_000])
+@pytest.mark.parametrize('stride', [-1.0, 0.1])
+@pytest.mark.parametrize('bounds', [(None, None), (2_000_000_000, 7_000_000_000)])
+@pytest.mark.parametrize('chunk', [utils.COUNT_CHUNK, 8])
+def test_rolling_counts_matches_a_rolling_count_per_code(
+    monkeypatch, n, stride, bounds, chunk
+):
+    monkeypatch.setattr(utils, 'COUNT_CHUNK', chunk)
+    times, codes = samples(n, 5)
+    ends, counts = utils.rolling_counts(
+        times, codes, 5, 0.5, True, stride, False, *bounds
+    )
+    assert counts.shape == (len(ends), 5)
+    if n == 0:
+        # The reference loop needs at least one time for a constant stride.
+        assert len(ends) == 0
+        return
+    for code in range(5):
+        expected_ends, expected = utils.rolling(
+            times, codes == code, 0.5, lambda w: np.sum(w), True, stride, False, *bounds
+        )
+        np.testing.assert_array_equal(ends, expected_ends)
+        np.testing.assert_allclose(counts[:, code], expected)
+
+
+def mean_or_nan(window):
+    return np.mean(window) if len(window) > 0 else np.nan
+
+
+# A plain function called on each window, for every built-in reducer.
+REFERENCES = {
+    'count': len,
+    'sum': np.sum,
+    'mean': mean_or_nan,
+    'proportion': lambda w: mean_or_nan(np.asarray(w) != 0),
+    'rate': lambda w: len(w) / 0.5,
+}
+
+
+@pytest.mark.parametrize('reducer', utils.REDUCERS)
+@pytest.mark.parametrize('n', [0, 1, 2_000])
+@pytest.mark.parametrize('stride', [-1.0, 0.1])
+@pytest.mark.parametrize('rate', [False, True])
+@pytest.mark.parametrize('bounds', [(None, None), (2_000_000_000, 7_000_000_000)])
+def test_builtin_reducers_match_a_function_per_window(reducer, n, stride, rate, bounds):
+    times, codes = samples(n, 3)
+    values = codes.astype(np.float64)
+    ends, result = utils.rolling(
+        times, values, 0.5, reducer, rate, stride, True, *bounds
+    )
+    if n == 0:
+        assert len(ends) == len(result) == 0
+        return
+    expected_ends, expected = utils.rolling(
+        times, values, 0.5, REFERENCES[reducer], rate, stride, True, *bounds
+    )
+    np.testing.assert_array_equal(ends, expected_ends)
+    np.testing.assert_allclose(result, expected)
+
+
+@pytest.mark.parametrize(
+    'fn',
+    [
+        rolling_funcs.count_ok,
+        rolling_funcs.count_err,
+        rolling_funcs.proportion_ok,
+    ],
+)
+def test_tagged_functions_match_calling_them_per_window(tmp_path, fn):
+    path = tmp_path / 'got.txt'
+    times, codes = samples(2_000, 2)
+    path.write_text(''.join(f'[{t}] {int(c > 0)}\n' for t, c in zip(times, codes)))
+    log = got.Got(str(path))
+    ends, result = log.rolling(0.5, fn, True)
+    expected_ends, expected = utils.rolling(
+        log.times_ns(), log.responses, 0.5, lambda w: fn(w), True
+    )
+    np.testing.assert_array_equal(ends, expected_ends)
+    np.testing.assert_allclose(result, expected)
+
+
+def quantiles_or_nan(window, qs):
+    finite = np.asarray(window, dtype=np.float64)
+    finite = finite[~np.isnan(finite)]
+    if len(finite) == 0:
+        return [np.nan] * len(qs)
+    return np.quantile(finite, qs).tolist()
+
+
+QS = [0.0, 0.01, 0.5, 0.95, 0.99, 1.0]
+
+
+@pytest.mark.parametrize('n', [0, 1, 2_000])
+@pytest.mark.parametrize('stride', [-1.0, 0.1])
+@pytest.mark.parametrize('bounds', [(None, None), (2_000_000_000, 7_000_000_000)])
+def test_rolling_quantiles_match_np_quantile_per_window(n, stride, bounds):
+    times, codes = samples(n, 20)
+    # Few distinct values, so that windows have ties, and some `nan` values.
+    values = np.where(codes < 0, np.nan, codes * 0.5)
+    ends, result = utils.rolling_quantiles(
+        times, values, 0.5, QS, stride, True, *bounds
+    )
+    assert result.shape == (len(ends), len(QS))
+    if n == 0:
+        assert len(ends) == 0
+        return
+    expected_ends, expected = utils.rolling(
+        times,
+        values,
+        0.5,
+        lambda w: quantiles_or_nan(w, QS),
+        False,
+        stride,
+        True,
+        *bounds,
+    )
+    np.testing.assert_array_equal(ends, expected_ends)
+    np.testing.assert_array_equal(result, np.array(expected).reshape(-1, len(QS)))
+
+
+def test_quantile_functions_match_calling_them_per_window():
+    times, codes = samples(2_000, 50)
+    values = codes.astype(np.float64)
+    for fn in (rolling_funcs.p50, rolling_funcs.p99):
+        _, result = utils.rolling(times, values, 0.5, fn, False, 0.1)
+        _, expected = utils.rolling(times, values, 0.5, lambda w: fn(w), False, 0.1)
+        np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize('n', [0, 1, 2_000])
+@pytest.mark.parametrize('stride', [-1.0, 0.1])
+def test_rolling_histograms_match_np_histogram_per_window(n, stride):
+    times, codes = samples(n, 20)
+    values = codes * 0.5
+    bins = [0.0, 1.0, 2.5, 5.0, 10.0]
+    ends, counts = utils.rolling_histograms(times, values, 0.5, bins, stride)
+    assert counts.shape == (len(ends), len(bins) - 1)
+    if n == 0:
+        return
+    expected_ends, expected = utils.rolling(
+        times, values, 0.5, lambda w: np.histogram(w, bins)[0], False, stride
+    )
+    np.testing.assert_array_equal(ends, expected_ends)
+    np.testing.assert_array_equal(counts, np.array(expected).reshape(counts.shape))
+
+
+def test_histogram_quantiles_are_within_a_bin_of_the_rank():
+    times, _ = samples(2_000, 1)
+    values = np.random.default_rng(1).exponential(size=len(times))
+    bins = np.linspace(0.0, 10.0, 101)
+    _, counts = utils.rolling_histograms(times, values, 0.5, bins)
+    approx = utils.histogram_quantiles(counts, bins, [0.5, 0.9])
+    _, exact = utils.rolling(
+        times,
+        values,
+        0.5,
+        lambda w: np.quantile(w, [0.5, 0.9], method='inverted_cdf'),
+    )
+    assert np.all(np.abs(approx - np.array(exact)) <= bins[1] - bins[0] + 1e-12)
+    assert np.isnan(utils.histogram_quantiles(np.zeros((1, 100)), bins, [0.5])).all()
+
+
+def test_gap_quantiles_match_np_quantile_of_the_gaps(tmp_path):
+    path = tmp_path / 'got.txt'
+    times, _ = samples(500, 1)
+    path.write_text(''.join(f'[{t}] 1\n' for t in times))
+    log = got.Got(str(path))
+    ends, result = log.rolling_gap_quantiles(0.5, QS, 0.1)
+    gaps = log.gaps()
+    expected_ends, expected = utils.rolling(
+        gaps.times_ns, gaps.values, 0.5, lambda w: quantiles_or_nan(w, QS), False, 0.1
+    )
+    np.testing.assert_array_equal(ends, expected_ends)
+    np.testing.assert_array_equal(result, np.array(expected).reshape(-1, len(QS)))